@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import asyncio
+import datetime
+import json
+import logging
+import multiprocessing
+import time
+from typing import Any, Callable, Hashable, Optional
+
+import yt_dlp
+
+from timewindow import in_window, parse_clock
+
+log = logging.getLogger("bandwidth")
+
+# A download using less than this fraction of its share is treated as limited
+# by its server and is offered only a little more than it currently uses.
+_IDLE_FRACTION = 0.8
+_HEADROOM = 1.25
+
+
+def parse_rate(value: Any) -> Optional[float]:
+    """Bytes per second from ``value`` (``"5M"``, ``"500K"``, ``1048576``); None when unlimited."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        rate = float(value)
+    else:
+        rate = yt_dlp.utils.parse_bytes(str(value).strip())
+        if rate is None:
+            raise ValueError(f'"{value}" is not a rate such as 500K or 5M')
+    if rate < 0:
+        raise ValueError(f'rate "{value}" must not be negative')
+    return rate or None
+
+
+def parse_schedule(schedule: Any) -> list[tuple[int, int, Optional[float]]]:
+    """``[{"from": "08:00", "to": "23:00", "limit": "2M"}, ...]`` as ``(start, end, rate)`` minutes of the day."""
+    if isinstance(schedule, str):
+        try:
+            schedule = json.loads(schedule or "[]")
+        except json.JSONDecodeError as exc:
+            raise ValueError(f"bandwidth schedule is not valid JSON: {exc}") from None
+    if not isinstance(schedule, list):
+        raise ValueError("bandwidth schedule must be a JSON list")
+    parsed = []
+    for window in schedule:
+        if not isinstance(window, dict) or not {"from", "to", "limit"} <= window.keys():
+            raise ValueError('every bandwidth schedule entry needs "from", "to" and "limit"')
+        parsed.append((parse_clock(window["from"]), parse_clock(window["to"]), parse_rate(window["limit"])))
+    return parsed
+
+
+def fair_shares(total: float, demands: list[float]) -> list[float]:
+    """Max-min fair split of ``total``: nobody gets more than it demands
+    while others want more, and what one leaves over is shared by the
+    others. If everyone is satisfied, the surplus is spread evenly so the
+    whole budget stays in use."""
+    shares = [0.0] * len(demands)
+    remaining = total
+    order = sorted(range(len(demands)), key=demands.__getitem__)
+    for served, index in enumerate(order):
+        shares[index] = min(demands[index], remaining / (len(order) - served))
+        remaining -= shares[index]
+    if demands and remaining > 0:
+        shares = [share + remaining / len(demands) for share in shares]
+    return shares
+
+
+class _Flow:
+    __slots__ = ("rate", "speed")
+
+    def __init__(self, rate, speed: Callable[[], Optional[float]]):
+        self.rate = rate
+        self.speed = speed
+
+
+class BandwidthBudget:
+    """Split one download rate limit across the running downloads.
+
+    Each download gets a shared ``multiprocessing.Value`` holding its current
+    limit in bytes per second (0 for none), which its worker applies through
+    ``follow_shared_rate_limit``. Shares are recomputed when downloads start
+    and finish and every ``interval`` seconds, so bandwidth a slow download
+    cannot use goes to the others. ``schedule`` overrides ``limit`` during
+    its time-of-day windows (local time; a window may wrap past midnight).
+    """
+
+    def __init__(self, limit: Any = None, schedule: Any = None, interval: float = 5.0):
+        self.limit = parse_rate(limit)
+        self.schedule = parse_schedule(schedule or [])
+        self.interval = interval
+        self._flows: dict[Hashable, _Flow] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.limit is not None or bool(self.schedule)
+
+    def current_limit(self, now: Optional[datetime.datetime] = None) -> Optional[float]:
+        now = now or datetime.datetime.now()
+        minute = now.hour * 60 + now.minute
+        for start, end, rate in self.schedule:
+            if in_window(start, end, minute):
+                return rate
+        return self.limit
+
+    def add(self, key: Hashable, speed: Callable[[], Optional[float]]):
+        """Register a starting download; returns the Value its worker follows."""
+        flow = self._flows[key] = _Flow(multiprocessing.Value("d", 0.0), speed)
+        self.rebalance()
+        return flow.rate
+
+    def remove(self, key: Hashable) -> None:
+        if self._flows.pop(key, None) is not None:
+            self.rebalance()
+
+    def rebalance(self) -> None:
+        limit = self.current_limit()
+        flows = list(self._flows.values())
+        if limit is None:
+            for flow in flows:
+                flow.rate.value = 0.0
+            return
+        demands = []
+        for flow in flows:
+            speed, share = flow.speed() or 0.0, flow.rate.value
+            if share and 0 < speed < share * _IDLE_FRACTION:
+                demands.append(speed * _HEADROOM)
+            else:
+                demands.append(float("inf"))
+        for flow, share in zip(flows, fair_shares(limit, demands)):
+            flow.rate.value = share
+
+    async def run(self) -> None:
+        """Rebalance periodically, also picking up schedule changes."""
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.rebalance()
+            except Exception:
+                log.exception("Rebalancing the bandwidth budget failed")
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "limit_bytes_per_second": self.current_limit(),
+            "downloads": len(self._flows),
+            "shares_bytes_per_second": sorted((round(flow.rate.value) for flow in self._flows.values()), reverse=True),
+        }
+
+
+def follow_shared_rate_limit(rate, static_limit: Optional[float] = None) -> None:
+    """Make yt-dlp's downloaders in this worker process throttle to ``rate.value``.
+
+    yt-dlp averages the speed since a transfer started, so when the limit
+    changes the average restarts from that moment; otherwise lowering the
+    limit would stall the transfer until its whole history fell under it.
+    ``static_limit`` (a ``ratelimit`` from the yt-dlp options) still caps
+    the rate.
+    """
+    from yt_dlp.downloader.common import FileDownloader
+
+    slow_down = FileDownloader.slow_down
+
+    def shared_slow_down(fd, start_time, now, byte_counter):
+        limit = rate.value or None
+        if static_limit:
+            limit = min(limit, static_limit) if limit else static_limit
+        window = getattr(fd, "_shared_rate_window", None)
+        if window is None or window[1] != start_time:
+            window = (limit, start_time, start_time, 0)
+        elif window[0] != limit:
+            window = (limit, start_time, now or time.time(), byte_counter)
+        fd._shared_rate_window = window
+        fd.params["ratelimit"] = limit
+        slow_down(fd, window[2], now, byte_counter - window[3])
+
+    FileDownloader.slow_down = shared_slow_down
@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import asyncio
+import collections
+import logging
+import os
+import time
+from typing import Any, Callable, Optional
+
+log = logging.getLogger("concurrency")
+
+_CONGESTION_MARKERS = ("429", "too many requests")
+
+
+def disk_queue_depth(path: str) -> Optional[int]:
+    """I/O requests in flight on the block device holding ``path`` (Linux only)."""
+    try:
+        dev = os.stat(path).st_dev
+        with open("/proc/diskstats", encoding="ascii") as f:
+            for line in f:
+                fields = line.split()
+                if int(fields[0]) == os.major(dev) and int(fields[1]) == os.minor(dev):
+                    return int(fields[11])
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+class Sample:
+    __slots__ = ("throughput", "active", "waiting", "disk_queue")
+
+    def __init__(self, throughput: float, active: int, waiting: int, disk_queue: Optional[int] = None):
+        self.throughput = throughput
+        self.active = active
+        self.waiting = waiting
+        self.disk_queue = disk_queue
+
+
+class AdaptiveConcurrency:
+    """AIMD control of the scheduler's global slot count.
+
+    Every ``interval`` seconds it takes a ``Sample`` of the running
+    downloads. A congestion signal (too many failed downloads, a 429 from a
+    site, or a deep disk queue) cuts the limit by ``decrease``. Otherwise,
+    while downloads are waiting for a slot, the limit grows by one; an
+    increase that did not raise the aggregate throughput by at least
+    ``min_gain`` is taken back at the next step.
+    """
+
+    def __init__(
+        self,
+        scheduler,
+        sample: Callable[[], Sample],
+        minimum: int,
+        maximum: int,
+        interval: float = 30.0,
+        decrease: float = 0.5,
+        min_gain: float = 0.05,
+        max_error_rate: float = 0.25,
+        max_disk_queue: int = 32,
+    ):
+        self.scheduler = scheduler
+        self.sample = sample
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.interval = interval
+        self.decrease = decrease
+        self.min_gain = min_gain
+        self.max_error_rate = max_error_rate
+        self.max_disk_queue = max_disk_queue
+        self.scheduler.set_limit(min(max(self.scheduler.limit, self.minimum), self.maximum))
+        self._finished = 0
+        self._failed = 0
+        self._throttled = 0
+        self._increased_from: Optional[float] = None
+        self.increases = 0
+        self.decreases = 0
+        self.decisions: collections.deque[dict[str, Any]] = collections.deque(maxlen=20)
+
+    def record_result(self, ok: bool, msg: Optional[str] = None) -> None:
+        """Count a finished download towards the current interval's error rate."""
+        self._finished += 1
+        if not ok:
+            self._failed += 1
+            if msg and any(marker in msg.lower() for marker in _CONGESTION_MARKERS):
+                self._throttled += 1
+
+    def _congestion(self, sample: Sample) -> Optional[str]:
+        if self._throttled:
+            return f"{self._throttled} download(s) were rate limited by the site"
+        if self._finished and self._failed / self._finished > self.max_error_rate:
+            return f"{self._failed} of {self._finished} downloads failed"
+        if sample.disk_queue is not None and sample.disk_queue > self.max_disk_queue:
+            return f"disk queue depth {sample.disk_queue}"
+        return None
+
+    def step(self) -> int:
+        """Take one sample and adjust the limit; returns the new limit."""
+        sample = self.sample()
+        limit = self.scheduler.limit
+        congestion = self._congestion(sample)
+        if congestion is not None:
+            new_limit, reason = max(self.minimum, int(limit * self.decrease)), congestion
+            self._increased_from = None
+        elif not sample.waiting or sample.active < limit:
+            new_limit, reason = limit, "no downloads waiting for a slot"
+            self._increased_from = None
+        elif self._increased_from is not None and sample.throughput < self._increased_from * (1 + self.min_gain):
+            new_limit, reason = max(self.minimum, limit - 1), "the last increase did not raise throughput"
+            self._increased_from = None
+        else:
+            new_limit, reason = min(self.maximum, limit + 1), "downloads are waiting and throughput keeps up"
+            self._increased_from = sample.throughput if new_limit > limit else None
+        self._finished = self._failed = self._throttled = 0
+
+        if new_limit != limit:
+            if new_limit > limit:
+                self.increases += 1
+            else:
+                self.decreases += 1
+            log.info(f"Download concurrency {limit} -> {new_limit}: {reason}")
+            self.scheduler.set_limit(new_limit)
+        self.decisions.append({
+            "at": time.time(),
+            "from": limit,
+            "to": new_limit,
+            "reason": reason,
+            "throughput_bytes_per_second": round(sample.throughput),
+            "active": sample.active,
+            "waiting": sample.waiting,
+            "disk_queue": sample.disk_queue,
+        })
+        return new_limit
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.step()
+            except Exception:
+                log.exception("Adjusting download concurrency failed")
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "limit": self.scheduler.limit,
+            "minimum": self.minimum,
+            "maximum": self.maximum,
+            "increases": self.increases,
+            "decreases": self.decreases,
+            "decisions": list(self.decisions),
+        }
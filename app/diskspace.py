@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import logging
+import os
+import shutil
+from typing import Any, Callable, Hashable, Optional
+
+import yt_dlp.utils
+
+log = logging.getLogger("diskspace")
+
+_MB = 1024 * 1024
+
+# Bytes per second of media when only the duration is known, and sizes to
+# assume when not even that is.
+_RATE_BY_TYPE = {"video": 0.5 * _MB, "audio": 24 * 1024}
+_SIZE_BY_TYPE = {"video": 1024 * _MB, "audio": 100 * _MB, "captions": _MB, "thumbnail": _MB}
+
+HOLD_PREFIX = "Waiting for disk space"
+
+
+def parse_size(value: Any) -> Optional[int]:
+    """Bytes from ``value`` (``"1G"``, ``"500M"``, ``1073741824``); None when empty or zero."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        size = int(value)
+    else:
+        size = yt_dlp.utils.parse_bytes(str(value).strip())
+        if size is None:
+            raise ValueError(f'"{value}" is not a size such as 500M or 1G')
+    if size < 0:
+        raise ValueError(f'size "{value}" must not be negative')
+    return size or None
+
+
+def estimate_size(info: Optional[dict], download_type: str) -> tuple[int, bool]:
+    """Expected size in bytes of a download, and whether it came from the extractor."""
+    info = info or {}
+    for key in ("filesize", "filesize_approx"):
+        if info.get(key):
+            return int(info[key]), True
+    formats = info.get("requested_formats") or ()
+    sizes = [f.get("filesize") or f.get("filesize_approx") for f in formats]
+    if sizes and all(sizes):
+        return int(sum(sizes)), True
+    duration = info.get("duration")
+    rate = _RATE_BY_TYPE.get(download_type)
+    if duration and rate:
+        return int(duration * rate), False
+    return _SIZE_BY_TYPE.get(download_type, _SIZE_BY_TYPE["video"]), False
+
+
+class _Claim:
+    __slots__ = ("devices", "size", "progress")
+
+    def __init__(self, devices: dict[int, str], size: int, progress: Callable[[], Optional[int]]):
+        self.devices = devices
+        self.size = size
+        self.progress = progress
+
+    def remaining(self) -> int:
+        return max(0, self.size - (self.progress() or 0))
+
+
+class DiskAdmission:
+    """Admit a download only if it fits on disk next to the running ones.
+
+    Every admitted download claims its estimated size on the filesystems of
+    its download and temporary directories until it finishes; what it has
+    already written is subtracted from the claim as it progresses. A new
+    download is held while the free space minus the open claims minus its
+    own estimate would drop below ``reserve`` bytes. With nothing else
+    running on a filesystem only the reserve itself is checked, since the
+    estimate may be a guess and holding the last download would stall the
+    queue for good.
+
+    Claims made in one dispatch pass share a ``snapshot``: free space is read
+    once per filesystem, and once a download is held on a filesystem the
+    ones after it are held there too without another look, so a long line
+    of held downloads costs one ``disk_usage`` per filesystem per pass.
+    """
+
+    def __init__(self, reserve: Optional[int]):
+        self.reserve = reserve
+        self._claims: dict[Hashable, _Claim] = {}
+        self.held: set[Hashable] = set()
+        self.admitted = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.reserve is not None
+
+    @staticmethod
+    def _devices(paths: list[str], snapshot: dict[str, Any]) -> dict[int, str]:
+        known = snapshot.setdefault("devices", {})
+        devices = {}
+        for path in paths:
+            if path not in known:
+                try:
+                    known[path] = os.stat(path).st_dev
+                except OSError:
+                    known[path] = None
+            if known[path] is not None:
+                devices.setdefault(known[path], path)
+        return devices
+
+    @staticmethod
+    def _free(device: int, path: str, snapshot: dict[str, Any]) -> Optional[int]:
+        free = snapshot.setdefault("free", {})
+        if device not in free:
+            try:
+                free[device] = shutil.disk_usage(path).free
+            except OSError:
+                free[device] = None
+        return free[device]
+
+    def claim(
+        self,
+        key: Hashable,
+        paths: list[str],
+        size: int,
+        progress: Callable[[], Optional[int]],
+        snapshot: Optional[dict[str, Any]] = None,
+    ) -> Optional[str]:
+        """Claim ``size`` bytes on the filesystems of ``paths`` for ``key``.
+        Returns why not, without claiming anything, if it would not fit."""
+        if not self.enabled:
+            return None
+        snapshot = {} if snapshot is None else snapshot
+        full = snapshot.setdefault("full", set())
+        devices = self._devices(paths, snapshot)
+        for device, path in devices.items():
+            if device not in full:
+                free = self._free(device, path, snapshot)
+                if free is None:
+                    continue
+                claimed = sum(c.remaining() for c in self._claims.values() if device in c.devices)
+                if free >= self.reserve + (size + claimed if claimed else 0):
+                    continue
+                full.add(device)
+            self.held.add(key)
+            # Kept free of live figures so that it only changes when the hold does.
+            return (
+                f"{HOLD_PREFIX} in {path}: about {size // _MB} MiB needed "
+                f"on top of the {int(self.reserve) // _MB} MiB reserve"
+            )
+        self.held.discard(key)
+        self._claims[key] = _Claim(devices, size, progress)
+        self.admitted += 1
+        return None
+
+    def release(self, key: Hashable) -> None:
+        self._claims.pop(key, None)
+        self.held.discard(key)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "reserve_bytes": self.reserve,
+            "admitted": self.admitted,
+            "held": len(self.held),
+            "claimed_bytes": sum(c.remaining() for c in self._claims.values()),
+        }
@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import asyncio
+import collections
+import contextvars
+import logging
+import time
+from typing import Any, Awaitable, Callable, Hashable, Iterable, Optional
+
+log = logging.getLogger("event_bus")
+
+Handler = Callable[[str, Any], Awaitable[None]]
+
+
+class _Entry:
+    __slots__ = ("event", "payload", "key", "context", "published_at")
+
+    def __init__(self, event: str, payload: Any, key: Optional[Hashable], context: contextvars.Context):
+        self.event = event
+        self.payload = payload
+        self.key = key
+        self.context = context
+        self.published_at = time.monotonic()
+
+
+class Consumer:
+    """A subscriber with its own bounded queue and worker task.
+
+    Events listed in ``coalesce`` replace a still-queued event of the same
+    type and key instead of queueing behind it (e.g. progress updates for one
+    download). Events listed in ``droppable`` are discarded when the queue is
+    full; every other event is always queued so lifecycle changes are never
+    lost. ``events`` restricts the consumer to the listed event types.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        handler: Handler,
+        maxsize: int = 1000,
+        coalesce: Iterable[str] = (),
+        droppable: Iterable[str] = (),
+        events: Optional[Iterable[str]] = None,
+    ):
+        self.name = name
+        self.handler = handler
+        self.maxsize = max(1, maxsize)
+        self.coalesce = frozenset(coalesce)
+        self.droppable = frozenset(droppable)
+        self.events = frozenset(events) if events is not None else None
+        self._queue: collections.deque[_Entry] = collections.deque()
+        self._pending: dict[tuple[str, Hashable], _Entry] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self.delivered = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.errors = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+
+    def put(self, entry: _Entry) -> None:
+        if self.events is not None and entry.event not in self.events:
+            return
+        pending_key = (entry.event, entry.key)
+        if entry.key is not None and entry.event in self.coalesce:
+            queued = self._pending.get(pending_key)
+            if queued is not None:
+                queued.payload = entry.payload
+                queued.context = entry.context
+                self.coalesced += 1
+                return
+        if len(self._queue) >= self.maxsize and entry.event in self.droppable:
+            self.dropped += 1
+            return
+        if entry.key is not None:
+            # A newer event for this key must not be overtaken by a coalesced older one.
+            for event in self.coalesce:
+                self._pending.pop((event, entry.key), None)
+            if entry.event in self.coalesce:
+                self._pending[pending_key] = entry
+        self._queue.append(entry)
+        self._wakeup.set()
+
+    async def _run(self) -> None:
+        while True:
+            while self._queue:
+                await self._deliver(self._queue.popleft())
+            if self._closing:
+                return
+            await self._wakeup.wait()
+            self._wakeup.clear()
+
+    async def _deliver(self, entry: _Entry) -> None:
+        if self._pending.get((entry.event, entry.key)) is entry:
+            del self._pending[(entry.event, entry.key)]
+        self.last_lag = time.monotonic() - entry.published_at
+        self.max_lag = max(self.max_lag, self.last_lag)
+        try:
+            # Run in the publisher's context so context variables set around
+            # the publishing call (e.g. the Telegram chat id) remain visible.
+            await asyncio.create_task(self.handler(entry.event, entry.payload), context=entry.context)
+            self.delivered += 1
+        except Exception:
+            self.errors += 1
+            log.exception("Event consumer %s failed to handle %s", self.name, entry.event)
+
+    async def drain(self) -> None:
+        """Deliver everything queued so far (used on shutdown and in tests)."""
+        while self._queue:
+            await self._deliver(self._queue.popleft())
+
+    def stats(self) -> dict[str, Any]:
+        oldest = self._queue[0].published_at if self._queue else None
+        return {
+            "queued": len(self._queue),
+            "maxsize": self.maxsize,
+            "delivered": self.delivered,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "lag_seconds": round(time.monotonic() - oldest, 3) if oldest is not None else 0.0,
+            "last_lag_seconds": round(self.last_lag, 3),
+            "max_lag_seconds": round(self.max_lag, 3),
+        }
+
+
+class EventBus:
+    """Fan notifier events out to independent consumers without awaiting them.
+
+    ``publish`` only enqueues, so a slow consumer (a Telegram API call, a
+    webhook) delays its own queue rather than the download status loop that
+    produced the event.
+    """
+
+    def __init__(self):
+        self._consumers: dict[str, Consumer] = {}
+        self._running = False
+
+    def subscribe(self, name: str, handler: Handler, **options: Any) -> Consumer:
+        consumer = Consumer(name, handler, **options)
+        self._consumers[name] = consumer
+        if self._running:
+            consumer._task = asyncio.create_task(consumer._run())
+        return consumer
+
+    def publish(self, event: str, payload: Any, key: Optional[Hashable] = None) -> None:
+        context = contextvars.copy_context()
+        for consumer in self._consumers.values():
+            consumer.put(_Entry(event, payload, key, context))
+
+    async def start(self) -> None:
+        self._running = True
+        for consumer in self._consumers.values():
+            if consumer._task is None:
+                consumer._task = asyncio.create_task(consumer._run())
+
+    async def stop(self, timeout: float = 5.0) -> None:
+        """Let every consumer finish its queue, cancelling those that take longer than ``timeout``."""
+        self._running = False
+        tasks = {}
+        for consumer in self._consumers.values():
+            if consumer._task is not None:
+                consumer._closing = True
+                consumer._wakeup.set()
+                tasks[consumer._task] = consumer
+        if tasks:
+            _, pending = await asyncio.wait(tasks, timeout=timeout)
+            for task in pending:
+                log.warning("Event consumer %s did not drain in time; dropping %d event(s)",
+                            tasks[task].name, len(tasks[task]._queue))
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        for consumer in tasks.values():
+            consumer._task = None
+            consumer._closing = False
+
+    async def drain(self) -> None:
+        for consumer in self._consumers.values():
+            await consumer.drain()
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        return {name: consumer.stats() for name, consumer in self._consumers.items()}
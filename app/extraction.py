@@ -0,0 +1,712 @@
+from __future__ import annotations
+
+import asyncio
+import collections
+import contextlib
+import copy
+import hashlib
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Hashable, Iterator, Optional
+
+import yt_dlp
+
+log = logging.getLogger("extraction")
+
+
+class ExtractionTimeout(Exception):
+    def __init__(self, timeout: float):
+        super().__init__(f"Extraction timed out after {timeout:g} seconds")
+        self.timeout = timeout
+
+
+def normalize_url(url: str) -> str:
+    """Canonical form of ``url`` for cache keys.
+
+    Lowercases the scheme and host, and drops the fragment and ``utm_*``
+    tracking parameters so links shared through different channels match.
+    """
+    parts = urllib.parse.urlsplit((url or "").strip())
+    query = [
+        (name, value)
+        for name, value in urllib.parse.parse_qsl(parts.query, keep_blank_values=True)
+        if not name.lower().startswith("utm_")
+    ]
+    return urllib.parse.urlunsplit((
+        parts.scheme.lower(),
+        parts.netloc.lower(),
+        parts.path,
+        urllib.parse.urlencode(query),
+        "",
+    ))
+
+
+def _has_media_urls(info: Any, _depth: int = 0) -> bool:
+    """Whether ``info`` carries resolved (usually signed, expiring) media URLs."""
+    if isinstance(info, (list, tuple)):
+        return any(_has_media_urls(item, _depth) for item in info)
+    if not isinstance(info, dict):
+        return False
+    if info.get("formats") or info.get("requested_formats") or info.get("requested_downloads"):
+        return True
+    if info.get("_type", "video") == "video" and info.get("url") and info.get("protocol"):
+        return True
+    entries = info.get("entries")
+    return _depth < 2 and isinstance(entries, list) and _has_media_urls(entries, _depth + 1)
+
+
+class ExtractionCache:
+    """Bounded LRU cache of extraction results that expire after ``ttl`` seconds.
+
+    Keys are tuples starting with the normalized URL (see :func:`normalize_url`)
+    so :meth:`invalidate` can drop every option variant of one URL. Results carrying resolved media URLs are not
+    stored since those links expire independently of the cache.
+    """
+
+    def __init__(self, maxsize: int = 128, ttl: float = 600.0):
+        self.maxsize = max(0, maxsize)
+        self.ttl = ttl
+        self._entries: collections.OrderedDict[Hashable, tuple[float, Any]] = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.skipped = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0 and self.ttl > 0
+
+    def lookup(self, key: Hashable) -> tuple[bool, Any]:
+        """Return ``(found, copy_of_value)``."""
+        cached = self._entries.get(key)
+        if cached is not None and cached[0] <= time.monotonic():
+            del self._entries[key]
+            cached = None
+        if cached is None:
+            self.misses += 1
+            return False, None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return True, copy.deepcopy(cached[1])
+
+    def store(self, key: Hashable, value: Any) -> bool:
+        if not self.enabled or value is None:
+            return False
+        if _has_media_urls(value):
+            self.skipped += 1
+            return False
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return True
+
+    def invalidate(self, url: Optional[str] = None) -> int:
+        """Drop cached results for ``url`` (any options), or everything when None."""
+        if url is None:
+            count = len(self._entries)
+            self._entries.clear()
+            return count
+        url = normalize_url(url)
+        stale = [key for key in self._entries if isinstance(key, tuple) and key[0] == url]
+        for key in stale:
+            del self._entries[key]
+        return len(stale)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "skipped": self.skipped,
+        }
+
+
+class YoutubeDLPool:
+    """Reuse ``YoutubeDL`` instances across extractions with identical options.
+
+    Building a ``YoutubeDL`` loads every extractor class, the cookie jar and
+    the network handlers, which costs more than many flat extractions. Idle
+    instances are kept per hash of the effective params; the hash includes the
+    cookie file's modification time, so changing ``YTDL_OPTIONS``, a preset
+    or the cookies simply produces a new key. Keys unused for longest are
+    closed once more than ``max_keys`` are held.
+
+    Each instance is checked out by one caller at a time and returns to the
+    pool only if the call succeeded or failed with a regular yt-dlp error;
+    anything else may have left it half way through a playlist, so it is
+    discarded. On its way back the per-call counters yt-dlp keeps on the
+    instance are zeroed and its params restored to what they were when it
+    was built, so nothing one caller changed is seen by the next.
+    ``max_uses`` bounds how long extractor caches can grow.
+    """
+
+    # Attributes YoutubeDL.__init__ sets up for one run, with their initial values.
+    _PER_CALL_STATE = (
+        ("_playlist_level", int),
+        ("_playlist_urls", set),
+        ("_num_downloads", int),
+        ("_num_videos", int),
+        ("_download_retcode", int),
+    )
+
+    def __init__(self, max_idle: int = 4, max_keys: int = 8, max_uses: int = 100):
+        self.max_idle = max(0, max_idle)
+        self.max_keys = max(1, max_keys)
+        self.max_uses = max(1, max_uses)
+        self._idle: collections.OrderedDict[str, list[tuple[Any, int, dict]]] = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+        self.discarded = 0
+
+    @staticmethod
+    def options_key(params: dict) -> str:
+        cookiefile = params.get("cookiefile")
+        try:
+            cookies_mtime = os.stat(cookiefile).st_mtime_ns if cookiefile else None
+        except OSError:
+            cookies_mtime = None
+        blob = json.dumps([params, cookies_mtime], sort_keys=True, default=str)
+        return hashlib.sha1(blob.encode("utf-8")).hexdigest()
+
+    @contextlib.contextmanager
+    def acquire(self, params: dict) -> Iterator[Any]:
+        key = self.options_key(params)
+        ydl, uses, built_params = self._checkout(key)
+        if ydl is None:
+            ydl = yt_dlp.YoutubeDL(params=dict(params))
+            built_params = dict(ydl.params)
+            self.created += 1
+        reusable = False
+        try:
+            yield ydl
+            reusable = True
+        except yt_dlp.utils.YoutubeDLError:
+            reusable = True
+            raise
+        finally:
+            if reusable and uses + 1 < self.max_uses:
+                self._reset(ydl, built_params)
+                self._checkin(key, ydl, uses + 1, built_params)
+            else:
+                self._close(ydl)
+
+    @classmethod
+    def _reset(cls, ydl: Any, built_params: dict) -> None:
+        for name, initial in cls._PER_CALL_STATE:
+            if hasattr(ydl, name):
+                setattr(ydl, name, initial())
+        ydl.params.clear()
+        ydl.params.update(built_params)
+
+    def _checkout(self, key: str) -> tuple[Any, int, Optional[dict]]:
+        with self._lock:
+            idle = self._idle.get(key)
+            if not idle:
+                return None, 0, None
+            self._idle.move_to_end(key)
+            self.reused += 1
+            return idle.pop()
+
+    def _checkin(self, key: str, ydl: Any, uses: int, built_params: dict) -> None:
+        evicted = []
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            self._idle.move_to_end(key)
+            if len(idle) < self.max_idle:
+                idle.append((ydl, uses, built_params))
+            else:
+                evicted.append(ydl)
+            while len(self._idle) > self.max_keys:
+                _, stale = self._idle.popitem(last=False)
+                evicted.extend(instance for instance, _, _ in stale)
+        for instance in evicted:
+            self._close(instance)
+
+    def _close(self, ydl: Any) -> None:
+        self.discarded += 1
+        close = getattr(ydl, "close", None)
+        if close is None:
+            return
+        try:
+            close()
+        except Exception:
+            log.debug("Failed to close pooled YoutubeDL", exc_info=True)
+
+    def clear(self) -> None:
+        with self._lock:
+            stale = [ydl for idle in self._idle.values() for ydl, _, _ in idle]
+            self._idle.clear()
+        for ydl in stale:
+            self._close(ydl)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            idle = sum(len(instances) for instances in self._idle.values())
+            keys = len(self._idle)
+        return {
+            "keys": keys,
+            "idle": idle,
+            "created": self.created,
+            "reused": self.reused,
+            "discarded": self.discarded,
+        }
+
+
+class TokenBucket:
+    """Admit callers at ``per_minute`` on average with bursts of up to ``burst``.
+
+    Waiters are served strictly in arrival order, so a steady stream of
+    requests from one source cannot starve another.
+    """
+
+    def __init__(self, per_minute: float, burst: int = 1):
+        self.rate = per_minute / 60.0
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._waiters: collections.deque[asyncio.Future] = collections.deque()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.granted = 0
+        self.waited_seconds = 0.0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        started = time.monotonic()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._wake()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.tokens += 1  # granted just as we were cancelled; hand it on
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            self._wake()
+            raise
+        self.waited_seconds += time.monotonic() - started
+
+    def _wake(self) -> None:
+        self._refill()
+        while self._waiters and self.tokens >= 1:
+            waiter = self._waiters.popleft()
+            if waiter.done():
+                continue  # cancelled, its task has not run its cleanup yet
+            self.tokens -= 1
+            self.granted += 1
+            waiter.set_result(None)
+        if self._waiters and self._timer is None:
+            delay = (1 - self.tokens) / self.rate
+            self._timer = asyncio.get_running_loop().call_later(delay, self._on_timer)
+
+    def _on_timer(self) -> None:
+        self._timer = None
+        self._wake()
+
+    def would_wait(self) -> bool:
+        """Whether an ``acquire`` now would have to queue for a token."""
+        if self.rate <= 0:
+            return False
+        self._refill()
+        return bool(self._waiters) or self.tokens < 1
+
+    def stats(self) -> dict[str, Any]:
+        self._refill()
+        return {
+            "per_minute": round(self.rate * 60, 3),
+            "burst": self.burst,
+            "tokens": round(self.tokens, 3),
+            "waiting": len(self._waiters),
+            "granted": self.granted,
+            "waited_seconds": round(self.waited_seconds, 3),
+        }
+
+
+class RateLimiter:
+    """Per-host token buckets for outbound extraction requests.
+
+    ``rules`` maps a host to ``{"per_minute": n, "burst": m}``. A rule also
+    covers subdomains (``youtube.com`` applies to ``www.youtube.com`` and
+    ``music.youtube.com``) and all hosts it covers share one bucket. The
+    optional ``default`` rule gives every other host a bucket of its own;
+    without it, other hosts are not limited.
+    """
+
+    def __init__(self, rules: Optional[dict[str, dict[str, Any]]] = None):
+        self.rules = self.parse_rules(rules or {})
+        self._buckets: dict[str, TokenBucket] = {}
+
+    @staticmethod
+    def parse_rules(rules: Any) -> dict[str, tuple[float, int]]:
+        if isinstance(rules, str):
+            try:
+                rules = json.loads(rules or "{}")
+            except json.JSONDecodeError as exc:
+                raise ValueError(f"rate limits are not valid JSON: {exc}") from None
+        if not isinstance(rules, dict):
+            raise ValueError("rate limits must be a JSON object keyed by host")
+        parsed = {}
+        for host, rule in rules.items():
+            if not isinstance(rule, dict):
+                raise ValueError(f'rate limit for "{host}" must be an object')
+            try:
+                per_minute = float(rule.get("per_minute", 0))
+                burst = int(rule.get("burst", 1))
+            except (TypeError, ValueError):
+                raise ValueError(f'rate limit for "{host}" needs numeric per_minute and burst') from None
+            if per_minute <= 0 or burst < 1:
+                raise ValueError(f'rate limit for "{host}" needs a positive per_minute and burst')
+            parsed[host.lower().lstrip(".")] = (per_minute, burst)
+        return parsed
+
+    def _bucket_name(self, url: str) -> Optional[str]:
+        host = (urllib.parse.urlsplit(url).hostname or "").lower()
+        labels = host.split(".")
+        for i in range(len(labels)):
+            candidate = ".".join(labels[i:])
+            if candidate in self.rules and candidate != "default":
+                return candidate
+        return host if "default" in self.rules and host else None
+
+    def bucket_for(self, url: str) -> Optional[TokenBucket]:
+        name = self._bucket_name(url)
+        if name is None:
+            return None
+        bucket = self._buckets.get(name)
+        if bucket is None:
+            bucket = self._buckets[name] = TokenBucket(*self.rules.get(name, self.rules.get("default")))
+        return bucket
+
+    async def acquire(self, url: str) -> None:
+        bucket = self.bucket_for(url)
+        if bucket is not None:
+            await bucket.acquire()
+
+    def would_wait(self, url: str) -> bool:
+        bucket = self.bucket_for(url)
+        return bucket is not None and bucket.would_wait()
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        return {name: bucket.stats() for name, bucket in sorted(self._buckets.items())}
+
+
+def _process_main(conn, func: Callable[..., Any], args: tuple, kwargs: dict, page_size: Optional[int]) -> None:
+    """Worker process entry point: send the result of ``func`` back over ``conn``.
+
+    With a ``page_size`` the result is an ``(entry, items)`` pair; ``entry`` is
+    sent first and the lazy ``items`` follow in pages as yt-dlp produces them.
+    """
+    try:
+        result = func(*args, **kwargs)
+        if page_size is None:
+            conn.send(("result", result))
+            return
+        entry, items = result
+        conn.send(("result", (entry, items is not None)))
+        if items is not None:
+            for page in iter(lambda: list(itertools.islice(items, page_size)), []):
+                conn.send(("page", page))
+            conn.send(("end", None))
+    except BaseException as exc:
+        # yt-dlp exceptions carry tracebacks and do not pickle reliably, so
+        # only their kind and message cross the process boundary.
+        conn.send(("error", (isinstance(exc, yt_dlp.utils.YoutubeDLError), str(exc))))
+    finally:
+        conn.close()
+
+
+def _recv(conn, proc: multiprocessing.Process) -> tuple[str, Any]:
+    try:
+        return conn.recv()
+    except EOFError:
+        proc.join(1)
+        raise RuntimeError(f"Extraction worker exited unexpectedly (exit code {proc.exitcode})") from None
+
+
+def _raise_worker_error(payload: tuple[bool, str]) -> None:
+    is_ytdl_error, msg = payload
+    raise yt_dlp.utils.DownloadError(msg) if is_ytdl_error else RuntimeError(msg)
+
+
+class _InFlight:
+    __slots__ = ("future", "waiters", "active", "cached", "started")
+
+    def __init__(self):
+        self.future: Optional[asyncio.Future] = None
+        self.waiters = 0
+        self.active = 0
+        self.cached = False
+        # Resolved once the extraction got past the rate limiter and runs.
+        self.started: asyncio.Future = asyncio.get_running_loop().create_future()
+
+    @property
+    def running(self) -> bool:
+        return self.started.done()
+
+    def start(self) -> None:
+        if not self.started.done():
+            self.started.set_result(None)
+
+
+class ExtractionPool:
+    """Run metadata extraction on dedicated workers.
+
+    Extraction is slow and network bound, so it gets its own workers instead
+    of competing with status readers and other housekeeping on the loop's
+    default executor. Concurrent calls sharing a ``key`` (same URL and
+    effective options) collapse into one in-flight extraction; when more than
+    one caller waited, each receives its own deep copy of the result because
+    callers stamp playlist fields into the entries they get back.
+
+    In ``thread`` mode the workers are threads. ``timeout`` bounds how long a
+    single caller waits once the extraction has started (time queued for a
+    rate limit token does not count), but a worker thread cannot be
+    interrupted, so a timed-out or cancelled extraction keeps running and
+    its result is still delivered to any caller willing to wait longer.
+
+    In ``process`` mode each extraction runs in its own child process, so
+    JSON parsing and challenge solving use every core instead of contending
+    for the GIL. Once every caller of an extraction has timed out or been
+    cancelled, its process is killed. Functions and arguments must be
+    module level and picklable.
+
+    With a ``cache``, keyed results are also kept for reuse by later calls.
+    With a ``rate_limiter``, calls that pass ``url`` wait for a token for its
+    host before they start (deduplicated and cached calls take none).
+    """
+
+    MODES = ("thread", "process")
+
+    def __init__(
+        self,
+        max_workers: int = 4,
+        timeout: Optional[float] = None,
+        cache: Optional[ExtractionCache] = None,
+        mode: str = "thread",
+        page_size: int = 50,
+        rate_limiter: Optional[RateLimiter] = None,
+    ):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown extraction mode {mode!r}; expected one of {', '.join(self.MODES)}")
+        self.max_workers = max(1, max_workers)
+        self.timeout = timeout if timeout and timeout > 0 else None
+        self.cache = cache
+        self.mode = mode
+        self.page_size = max(1, page_size)
+        self.rate_limiter = rate_limiter
+        # In process mode these threads only wait on worker pipes.
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="extract")
+        self._slots = asyncio.Semaphore(self.max_workers)
+        self._inflight: dict[Hashable, _InFlight] = {}
+        self.started = 0
+        self.deduplicated = 0
+        self.timeouts = 0
+        self.failures = 0
+        self.killed = 0
+
+    def _submit(self, func: Callable[..., Any], args: tuple, kwargs: dict, streaming: bool) -> asyncio.Future:
+        self.started += 1
+        if self.mode == "process":
+            return asyncio.ensure_future(self._run_in_process(func, args, kwargs, streaming))
+        return asyncio.get_running_loop().run_in_executor(self._executor, partial(func, *args, **kwargs))
+
+    async def run(
+        self,
+        key: Optional[Hashable],
+        func: Callable[..., Any],
+        *args: Any,
+        url: Optional[str] = None,
+        timeout: Optional[float] = None,
+        fresh: bool = False,
+        on_start: Optional[Callable[[], None]] = None,
+        **kwargs: Any,
+    ) -> Any:
+        """Return ``func(*args, **kwargs)`` computed on the pool.
+
+        A ``key`` of None opts out of deduplication and caching. ``fresh``
+        skips the cache lookup but still stores the new result. ``url``
+        selects the rate limit bucket. ``on_start`` is called once the
+        extraction got its rate limit token and runs.
+        """
+        if key is not None and self.cache is not None and not fresh:
+            found, value = self.cache.lookup(key)
+            if found:
+                return value
+        return await self._await(key, url, partial(self._submit, func, args, kwargs, False), timeout, on_start)
+
+    async def run_streaming(
+        self,
+        func: Callable[..., Any],
+        *args: Any,
+        url: Optional[str] = None,
+        timeout: Optional[float] = None,
+        **kwargs: Any,
+    ):
+        """Run ``func`` returning ``(entry, items)`` where ``items`` is a lazy iterator or None.
+
+        Never deduplicated or cached. In process mode ``items`` receives the
+        entries page by page from the worker, which is killed if the iterator
+        is closed before it is exhausted.
+        """
+        return await self._await(None, url, partial(self._submit, func, args, kwargs, True), timeout)
+
+    def _launch(self, inflight: _InFlight, url: Optional[str], submit: Callable[[], asyncio.Future]) -> asyncio.Future:
+        if self.rate_limiter is None or url is None:
+            inflight.start()
+            return submit()
+
+        async def limited():
+            await self.rate_limiter.acquire(url)
+            inflight.start()
+            return await submit()
+
+        return asyncio.ensure_future(limited())
+
+    async def _await(
+        self,
+        key: Optional[Hashable],
+        url: Optional[str],
+        submit: Callable[[], asyncio.Future],
+        timeout: Optional[float],
+        on_start: Optional[Callable[[], None]] = None,
+    ) -> Any:
+        timeout = self.timeout if timeout is None else timeout
+        inflight = self._inflight.get(key) if key is not None else None
+        if inflight is None:
+            inflight = _InFlight()
+            inflight.future = self._launch(inflight, url, submit)
+            inflight.future.add_done_callback(partial(self._finished, key, inflight))
+            if key is not None:
+                self._inflight[key] = inflight
+        else:
+            self.deduplicated += 1
+        if on_start is not None:
+            inflight.started.add_done_callback(lambda _: on_start())
+        inflight.waiters += 1
+        inflight.active += 1
+        try:
+            if not inflight.running:
+                # Queueing for a rate limit token is not extraction time.
+                await asyncio.wait({inflight.future, inflight.started}, return_when=asyncio.FIRST_COMPLETED)
+            result = await asyncio.wait_for(asyncio.shield(inflight.future), timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            log.warning("Extraction %r timed out after %ss", key, timeout)
+            raise ExtractionTimeout(timeout) from None
+        finally:
+            inflight.active -= 1
+            if inflight.active == 0 and not inflight.future.done() and (self.mode == "process" or not inflight.running):
+                # Nobody is waiting any more: leave the rate limit queue, or kill the worker.
+                inflight.future.cancel()
+        return copy.deepcopy(result) if inflight.waiters > 1 or inflight.cached else result
+
+    def _finished(self, key: Hashable, inflight: _InFlight, future: asyncio.Future) -> None:
+        if key is not None and self._inflight.get(key) is inflight:
+            del self._inflight[key]
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            self.failures += 1
+        elif key is not None and self.cache is not None:
+            inflight.cached = self.cache.store(key, future.result())
+
+    async def _run_in_process(self, func: Callable[..., Any], args: tuple, kwargs: dict, streaming: bool) -> Any:
+        loop = asyncio.get_running_loop()
+        await self._slots.acquire()
+        reader, writer = multiprocessing.Pipe(duplex=False)
+        proc = multiprocessing.Process(
+            target=_process_main,
+            args=(writer, func, args, kwargs, self.page_size if streaming else None),
+            daemon=True,
+        )
+        received = handed_off = False
+        recv = None
+        try:
+            proc.start()
+            writer.close()
+            recv = self._executor.submit(_recv, reader, proc)
+            kind, result = await asyncio.wrap_future(recv, loop=loop)
+            received = True
+            if kind == "error":
+                _raise_worker_error(result)
+            if not streaming:
+                return result
+            entry, has_items = result
+            if not has_items:
+                return entry, None
+            handed_off = True
+            return entry, self._iter_pages(loop, proc, reader)
+        finally:
+            if not handed_off:
+                writer.close()
+                if not received:
+                    self._kill(proc)
+                if recv is None or recv.done():
+                    reader.close()
+                else:
+                    # The executor thread is still reading; the killed worker ends that read.
+                    recv.add_done_callback(lambda _: reader.close())
+                self._slots.release()
+
+    def _iter_pages(self, loop: asyncio.AbstractEventLoop, proc: multiprocessing.Process, reader):
+        finished = False
+        try:
+            while True:
+                kind, page = _recv(reader, proc)
+                if kind != "page":
+                    finished = True
+                    if kind == "error":
+                        _raise_worker_error(page)
+                    return
+                yield from page
+        finally:
+            if not finished:
+                self._kill(proc)
+            reader.close()
+            try:
+                loop.call_soon_threadsafe(self._slots.release)
+            except RuntimeError:
+                pass  # loop already closed during shutdown
+
+    def _kill(self, proc: multiprocessing.Process) -> None:
+        # Workers that delivered their result exit on their own and are
+        # reaped by multiprocessing; only abandoned ones are killed.
+        if proc.pid is None or not proc.is_alive():
+            return
+        self.killed += 1
+        proc.kill()
+        proc.join(1)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "workers": self.max_workers,
+            "timeout_seconds": self.timeout,
+            "in_flight": len(self._inflight),
+            "started": self.started,
+            "deduplicated": self.deduplicated,
+            "timeouts": self.timeouts,
+            "failures": self.failures,
+            "killed": self.killed,
+            "cache": self.cache.stats() if self.cache is not None else None,
+        }
@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import asyncio
+import collections
+import contextlib
+import logging
+import time
+from typing import Any, Callable, Optional
+
+from retry import host_of
+
+log = logging.getLogger("health")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class _Breaker:
+    __slots__ = ("results", "state", "opened_at", "probing", "waiting", "changed", "successes", "failures", "trips")
+
+    def __init__(self, window: int):
+        self.results: collections.deque[bool] = collections.deque(maxlen=window)
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.probing = False
+        self.waiting = 0
+        self.changed = asyncio.Event()
+        self.successes = 0
+        self.failures = 0
+        self.trips = 0
+
+
+class HealthTracker:
+    """Rolling success/failure stats per extractor, each with a circuit breaker.
+
+    A breaker opens when at least ``failure_ratio`` of the last ``window``
+    results (and no fewer than a quarter of the window) were failures.
+    Downloads for an open extractor wait in ``admit`` instead of spending a
+    slot on a near-certain failure. After ``open_seconds`` one of them is let
+    through as a probe: its success closes the breaker and releases the
+    rest, its failure opens it again.
+    """
+
+    def __init__(
+        self,
+        window: int = 20,
+        failure_ratio: float = 0.5,
+        open_seconds: float = 300.0,
+        on_change: Optional[Callable[[str, str], None]] = None,
+    ):
+        self.window = max(1, int(window))
+        self.min_samples = max(1, self.window // 4)
+        self.failure_ratio = failure_ratio
+        self.open_seconds = open_seconds
+        self.on_change = on_change
+        self._breakers: dict[str, _Breaker] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.failure_ratio > 0
+
+    @staticmethod
+    def key_for(url: str, extractor: Optional[str] = None) -> str:
+        """``youtube`` for the extractor ``youtube:tab``; the host for the generic extractor."""
+        name = str(extractor or "").lower().split(":", 1)[0]
+        if name and name != "generic":
+            return name
+        return host_of(url) or "generic"
+
+    def _breaker(self, key: str) -> _Breaker:
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            breaker = self._breakers[key] = _Breaker(self.window)
+        return breaker
+
+    def _set_state(self, key: str, breaker: _Breaker, state: str) -> None:
+        previous, breaker.state = breaker.state, state
+        breaker.probing = False
+        if state == OPEN:
+            breaker.opened_at = time.monotonic()
+            if previous == CLOSED:
+                breaker.trips += 1
+        elif state == CLOSED:
+            breaker.results.clear()
+        log.info(f"Circuit breaker for {key}: {previous} -> {state}")
+        self._wake(breaker)
+        if self.on_change is not None:
+            self.on_change(key, state)
+
+    def _wake(self, breaker: _Breaker) -> None:
+        breaker.changed.set()
+        breaker.changed = asyncio.Event()
+
+    def blocked(self, key: str) -> bool:
+        breaker = self._breakers.get(key)
+        return breaker is not None and breaker.state != CLOSED
+
+    def record(self, key: str, ok: bool, probe: bool = False) -> None:
+        if not self.enabled:
+            return
+        breaker = self._breaker(key)
+        breaker.results.append(ok)
+        if ok:
+            breaker.successes += 1
+        else:
+            breaker.failures += 1
+        if probe and breaker.state == HALF_OPEN:
+            self._set_state(key, breaker, CLOSED if ok else OPEN)
+        elif breaker.state == CLOSED and len(breaker.results) >= self.min_samples:
+            failed = breaker.results.count(False)
+            if failed / len(breaker.results) >= self.failure_ratio:
+                self._set_state(key, breaker, OPEN)
+
+    async def admit(self, key: str) -> bool:
+        """Wait until a download for ``key`` may start. Returns True if it
+        goes as the probe, which must then be ``record``-ed or ``abandon``-ed."""
+        breaker = self._breakers.get(key)
+        if breaker is None or breaker.state == CLOSED:
+            return False
+        breaker.waiting += 1
+        try:
+            while True:
+                now = time.monotonic()
+                if breaker.state == CLOSED:
+                    return False
+                if breaker.state == OPEN and now >= breaker.opened_at + self.open_seconds:
+                    self._set_state(key, breaker, HALF_OPEN)
+                if breaker.state == HALF_OPEN and not breaker.probing:
+                    breaker.probing = True
+                    return True
+                timeout = breaker.opened_at + self.open_seconds - now if breaker.state == OPEN else None
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(breaker.changed.wait(), timeout)
+        finally:
+            breaker.waiting -= 1
+
+    def abandon(self, key: str) -> None:
+        """A probe ended without a verdict (canceled, or an error that says nothing
+        about the extractor); let the next waiting download probe instead."""
+        breaker = self._breakers.get(key)
+        if breaker is not None and breaker.state == HALF_OPEN and breaker.probing:
+            breaker.probing = False
+            self._wake(breaker)
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        """Breakers that are not closed, for the UI."""
+        now = time.monotonic()
+        return {
+            key: {
+                "state": breaker.state,
+                "waiting": breaker.waiting,
+                "retry_in_seconds": round(max(0.0, breaker.opened_at + self.open_seconds - now))
+                if breaker.state == OPEN else 0,
+            }
+            for key, breaker in sorted(self._breakers.items())
+            if breaker.state != CLOSED
+        }
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "window": self.window,
+            "failure_ratio": self.failure_ratio,
+            "extractors": {
+                key: {
+                    "state": breaker.state,
+                    "recent_failure_ratio": round(breaker.results.count(False) / len(breaker.results), 3)
+                    if breaker.results else 0.0,
+                    "successes": breaker.successes,
+                    "failures": breaker.failures,
+                    "trips": breaker.trips,
+                    "waiting": breaker.waiting,
+                }
+                for key, breaker in sorted(self._breakers.items())
+            },
+        }
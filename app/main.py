@@ -4,6 +4,7 @@
 import os
 import sys
 import asyncio
+import collections
 from pathlib import Path
 from aiohttp import web
 from aiohttp.log import access_logger
@@ -14,8 +15,17 @@ import logging
 import json
 import pathlib
 import re
+import time
+import uuid
+import zlib
 from watchfiles import DefaultFilter, Change, awatch
 
+from event_bus import EventBus
+from bandwidth import parse_rate, parse_schedule
+from diskspace import parse_size
+from extraction import RateLimiter
+from scheduler import SOURCES, DownloadScheduler
+from timewindow import parse_start_at, parse_windows
 from ytdl import DownloadQueueNotifier, DownloadQueue, Download
 from subscriptions import SubscriptionManager, SubscriptionNotifier, SubscriptionInfo
 from telegram_bot import TelegramBot
@@ -76,6 +86,38 @@ class Config:
         'SC_THREAD_COUNT': '16',
         'SC_USE_FFMPEG': 'false',
         'SC_MAX_CONCURRENT_DOWNLOADS': '1',
+        'DOWNLOAD_POOLS': '{}',
+        'DOWNLOAD_STALL_TIMEOUT_SECONDS': '0',
+        'DOWNLOAD_HARD_TIMEOUT_SECONDS': '0',
+        'DOWNLOAD_MAX_RESTARTS': '3',
+        'DOWNLOAD_RESTART_BACKOFF_SECONDS': '30',
+        'DOWNLOAD_RETRY_ATTEMPTS': '3',
+        'DOWNLOAD_RETRY_BACKOFF_SECONDS': '30',
+        'DOWNLOAD_RETRY_MAX_BACKOFF_SECONDS': '1800',
+        'HOST_COOLDOWN_SECONDS': '300',
+        'CIRCUIT_BREAKER_FAILURE_RATIO': '0.5',
+        'CIRCUIT_BREAKER_WINDOW': '20',
+        'CIRCUIT_BREAKER_OPEN_SECONDS': '300',
+        'DISK_SPACE_RESERVE': '',
+        'MAX_QUEUED_ITEMS': '10000',
+        'QUEUE_SOURCE_LIMITS': '{}',
+        'ADAPTIVE_CONCURRENCY': 'false',
+        'ADAPTIVE_CONCURRENCY_MIN': '1',
+        'ADAPTIVE_CONCURRENCY_MAX': '8',
+        'ADAPTIVE_CONCURRENCY_INTERVAL_SECONDS': '30',
+        'BANDWIDTH_LIMIT': '',
+        'BANDWIDTH_SCHEDULE': '[]',
+        'DOWNLOAD_SOURCE_WEIGHTS': '{"ui": 8, "api": 4, "telegram": 4, "subscription": 1}',
+        'STREAM_PLAYLIST_EXPANSION': 'false',
+        'PLAYLIST_STREAM_CHUNK_SIZE': '50',
+        'EXTRACTION_WORKERS': '4',
+        'EXTRACTION_TIMEOUT_SECONDS': '300',
+        'EXTRACTION_CACHE_SIZE': '128',
+        'EXTRACTION_CACHE_TTL_SECONDS': '600',
+        'EXTRACTION_MODE': 'thread',
+        'EXTRACTION_RATE_LIMITS': '{}',
+        'PRERESOLVE_AHEAD': '0',
+        'PRERESOLVE_TTL_SECONDS': '1800',
         'JELLYFIN_SYNC_ENABLED': 'false',
         'JELLYFIN_URL': '',
         'JELLYFIN_API_KEY': '',
@@ -87,9 +129,12 @@ class Config:
         'TELEGRAM_STALL_TIMEOUT_SECONDS': '180',
         'TELEGRAM_HARD_TIMEOUT_SECONDS': '7200',
         'TELEGRAM_MAX_URLS_PER_MESSAGE': '10',
+        'EVENT_REPLAY_BUFFER_SIZE': '1000',
+        'SOCKET_DEFLATE_MIN_BYTES': '4096',
+        'EVENT_CONSUMER_QUEUE_SIZE': '1000',
     }
 
-    _BOOLEAN = ('DOWNLOAD_DIRS_INDEXABLE', 'CUSTOM_DIRS', 'CREATE_CUSTOM_DIRS', 'DELETE_FILE_ON_TRASHCAN', 'HTTPS', 'ENABLE_ACCESSLOG', 'ALLOW_YTDL_OPTIONS_OVERRIDES', 'SC_USE_FFMPEG', 'JELLYFIN_SYNC_ENABLED', 'TELEGRAM_BOT_ENABLED')
+    _BOOLEAN = ('DOWNLOAD_DIRS_INDEXABLE', 'CUSTOM_DIRS', 'CREATE_CUSTOM_DIRS', 'DELETE_FILE_ON_TRASHCAN', 'HTTPS', 'ENABLE_ACCESSLOG', 'ALLOW_YTDL_OPTIONS_OVERRIDES', 'SC_USE_FFMPEG', 'JELLYFIN_SYNC_ENABLED', 'TELEGRAM_BOT_ENABLED', 'STREAM_PLAYLIST_EXPANSION', 'ADAPTIVE_CONCURRENCY')
 
     def __init__(self):
         for k, v in self._DEFAULTS.items():
@@ -107,6 +152,36 @@ class Config:
         if not self.URL_PREFIX.endswith('/'):
             self.URL_PREFIX += '/'
 
+        if self.EXTRACTION_MODE not in ('thread', 'process'):
+            log.error(f'Environment variable "EXTRACTION_MODE" must be "thread" or "process", not "{self.EXTRACTION_MODE}"')
+            sys.exit(1)
+        try:
+            RateLimiter.parse_rules(self.EXTRACTION_RATE_LIMITS)
+        except ValueError as exc:
+            log.error(f'Environment variable "EXTRACTION_RATE_LIMITS" is invalid: {exc}')
+            sys.exit(1)
+        try:
+            DownloadScheduler.parse_pools(self.DOWNLOAD_POOLS)
+        except ValueError as exc:
+            log.error(f'Environment variable "DOWNLOAD_POOLS" is invalid: {exc}')
+            sys.exit(1)
+        try:
+            DownloadScheduler.parse_weights(self.DOWNLOAD_SOURCE_WEIGHTS)
+        except ValueError as exc:
+            log.error(f'Environment variable "DOWNLOAD_SOURCE_WEIGHTS" is invalid: {exc}')
+            sys.exit(1)
+        try:
+            DownloadScheduler.parse_source_limits(self.QUEUE_SOURCE_LIMITS)
+        except ValueError as exc:
+            log.error(f'Environment variable "QUEUE_SOURCE_LIMITS" is invalid: {exc}')
+            sys.exit(1)
+        for name, parse in (('BANDWIDTH_LIMIT', parse_rate), ('BANDWIDTH_SCHEDULE', parse_schedule), ('DISK_SPACE_RESERVE', parse_size)):
+            try:
+                parse(getattr(self, name))
+            except ValueError as exc:
+                log.error(f'Environment variable "{name}" is invalid: {exc}')
+                sys.exit(1)
+
         for attr in ('PUBLIC_HOST_URL', 'PUBLIC_HOST_AUDIO_URL'):
             val = getattr(self, attr)
             if val and not val.endswith('/'):
@@ -243,6 +318,136 @@ class ObjectSerializer(json.JSONEncoder):
         return json.JSONEncoder.default(self, obj)
 
 serializer = ObjectSerializer()
+
+
+class StateSnapshot:
+    """Versioned cache of the encoded payloads sent on connect and ``/history``.
+
+    Every notifier event bumps the version and drops the cached state, so a
+    payload is serialized at most once per state change no matter how many
+    clients reconnect at the same time. Entries stored with a ``ttl`` track
+    the filesystem rather than queue state and expire on time instead.
+    """
+
+    def __init__(self):
+        self.epoch = uuid.uuid4().hex[:12]
+        self.version = 0
+        self._cache = {}
+
+    def invalidate(self):
+        self.version += 1
+        self._cache = {k: v for k, v in self._cache.items() if v[2] is not None}
+
+    def get(self, key, build, ttl=None):
+        now = time.monotonic()
+        cached = self._cache.get(key)
+        if cached is not None and (cached[2] is None or now - cached[1] < cached[2]):
+            return cached[0]
+        value = build()
+        self._cache[key] = (value, now, ttl)
+        return value
+
+    @property
+    def etag(self):
+        return f'"{self.epoch}-{self.version}"'
+
+
+class EventJournal:
+    """Bounded ring buffer of sequenced socket events for cheap client resync.
+
+    A reconnecting client sends the epoch and the last sequence number it saw;
+    if every later event is still buffered it only receives those, otherwise
+    it falls back to the full snapshot.
+    """
+
+    def __init__(self, epoch, size):
+        self.epoch = epoch
+        self.seq = 0
+        self._events = collections.deque(maxlen=max(0, size))
+
+    def record(self, event, data):
+        self.seq += 1
+        self._events.append((self.seq, event, data))
+        return self.seq
+
+    def since(self, epoch, last_seq):
+        """Return the events after ``last_seq``, or None when they cannot be replayed."""
+        if epoch != self.epoch or not isinstance(last_seq, int) or last_seq < 0 or last_seq > self.seq:
+            return None
+        if last_seq == self.seq:
+            return []
+        if not self._events or self._events[0][0] > last_seq + 1:
+            return None
+        return [e for e in self._events if e[0] > last_seq]
+
+
+state_snapshot = StateSnapshot()
+event_journal = EventJournal(state_snapshot.epoch, int(config.EVENT_REPLAY_BUFFER_SIZE))
+
+
+# Socket.io rooms ("views") a client can join so it only receives the lists it
+# displays. Clients that do not ask for specific views join all of them.
+VIEWS = ('queue', 'done', 'subscriptions')
+EVENT_VIEWS = {
+    'added': ('queue',),
+    'added_batch': ('queue',),
+    'add_job_progress': ('queue',),
+    'updated': ('queue',),
+    'completed': ('queue', 'done'),
+    'canceled': ('queue',),
+    'cleared': ('done',),
+    'subscription_added': ('subscriptions',),
+    'subscription_updated': ('subscriptions',),
+    'subscription_removed': ('subscriptions',),
+    'subscriptions_all': ('subscriptions',),
+}
+
+
+# Payload encodings a client can negotiate through ``auth.encodings``. Plain
+# clients get JSON text; ``deflate`` clients get payloads of at least
+# SOCKET_DEFLATE_MIN_BYTES as zlib-compressed JSON in a binary attachment,
+# which also shrinks the long-polling transport and proxies that strip the
+# websocket compression extension. Each encoding has its own set of rooms.
+ENCODINGS = ('json', 'deflate')
+SOCKET_DEFLATE_MIN_BYTES = int(config.SOCKET_DEFLATE_MIN_BYTES)
+
+
+def _view_room(view, encoding='json'):
+    return f'view:{view}' if encoding == 'json' else f'view:{view}:{encoding}'
+
+
+def _parse_encoding(auth):
+    offered = auth.get('encodings') if isinstance(auth, dict) else None
+    if isinstance(offered, (list, tuple)) and 'deflate' in offered:
+        return 'deflate'
+    return 'json'
+
+
+def _wire(data, encoding):
+    """Return the serialized ``data`` as it is sent to a client using ``encoding``."""
+    if encoding == 'deflate' and len(data) >= SOCKET_DEFLATE_MIN_BYTES:
+        return zlib.compress(data.encode('utf-8'))
+    return data
+
+
+def _parse_views(value):
+    if not isinstance(value, (list, tuple)):
+        return set(VIEWS)
+    return {v for v in value if v in VIEWS}
+
+
+async def _emit_event(event, data):
+    """Send a state event, tagged with its sequence number, to the rooms interested in it."""
+    seq = event_journal.record(event, data)
+    views = EVENT_VIEWS[event]
+    deflated = _wire(data, 'deflate')
+    if deflated is data:
+        await sio.emit(event, (data, seq), to=[_view_room(v, e) for e in ENCODINGS for v in views])
+        return
+    await sio.emit(event, (data, seq), to=[_view_room(v) for v in views])
+    await sio.emit(event, (deflated, seq), to=[_view_room(v, 'deflate') for v in views])
+
+
 app = web.Application()
 _cors_origins = [o.strip() for o in config.CORS_ALLOWED_ORIGINS.split(',') if o.strip()] if config.CORS_ALLOWED_ORIGINS else []
 sio = socketio.AsyncServer(cors_allowed_origins=_cors_origins if _cors_origins else [])
@@ -348,38 +553,93 @@ def _migrate_legacy_request(post: dict) -> dict:
 
     return post
 
+# Notifier events go through the bus so the download status loop never waits
+# on socket.io or Telegram; each consumer drains its own bounded queue.
+# Progress updates for the same download coalesce while they wait.
+event_bus = EventBus()
+EVENT_CONSUMER_QUEUE_SIZE = int(config.EVENT_CONSUMER_QUEUE_SIZE)
+TELEGRAM_EVENT_HANDLERS = {
+    'added': 'on_added',
+    'added_batch': 'on_added',
+    'updated': 'on_updated',
+    'completed': 'on_completed',
+    'canceled': 'on_canceled',
+}
+
+
+async def _socket_consumer(event, payload):
+    await _emit_event(event, serializer.encode(payload))
+
+
+async def _telegram_consumer(event, payload):
+    if telegram_bot is None:
+        return
+    handler = getattr(telegram_bot, TELEGRAM_EVENT_HANDLERS[event])
+    for item in payload if event == 'added_batch' else (payload,):
+        await handler(item)
+
+
+event_bus.subscribe(
+    'socketio', _socket_consumer,
+    maxsize=EVENT_CONSUMER_QUEUE_SIZE,
+    coalesce=('updated', 'subscription_updated', 'add_job_progress'),
+    droppable=('updated', 'add_job_progress'),
+)
+event_bus.subscribe(
+    'telegram', _telegram_consumer,
+    maxsize=EVENT_CONSUMER_QUEUE_SIZE, coalesce=('updated',), droppable=('updated',),
+    events=TELEGRAM_EVENT_HANDLERS,
+)
+
+
+def _publish(event, payload, key=None):
+    state_snapshot.invalidate()
+    event_bus.publish(event, payload, key)
+
+
 class Notifier(DownloadQueueNotifier):
     async def added(self, dl):
         log.info(f"Notifier: Download added - {dl.title}")
-        await sio.emit('added', serializer.encode(dl))
-        if telegram_bot is not None:
-            await telegram_bot.on_added(dl)
+        _publish('added', dl, dl.url)
+
+    async def added_batch(self, dls):
+        log.info(f"Notifier: {len(dls)} downloads added")
+        _publish('added_batch', dls)
 
     async def updated(self, dl):
         log.debug(f"Notifier: Download updated - {dl.title}")
-        await sio.emit('updated', serializer.encode(dl))
-        if telegram_bot is not None:
-            await telegram_bot.on_updated(dl)
+        _publish('updated', dl, dl.url)
 
     async def completed(self, dl):
         log.info(f"Notifier: Download completed - {dl.title}")
-        await sio.emit('completed', serializer.encode(dl))
-        if telegram_bot is not None:
-            await telegram_bot.on_completed(dl)
+        _publish('completed', dl, dl.url)
 
     async def canceled(self, id):
         log.info(f"Notifier: Download canceled - {id}")
-        await sio.emit('canceled', serializer.encode(id))
-        if telegram_bot is not None:
-            await telegram_bot.on_canceled(id)
+        _publish('canceled', id, id)
 
     async def cleared(self, id):
         log.info(f"Notifier: Download cleared - {id}")
-        await sio.emit('cleared', serializer.encode(id))
+        _publish('cleared', id, id)
+
+    async def add_job_progress(self, job):
+        # Job progress is not part of the queue snapshot, so nothing to invalidate.
+        event_bus.publish('add_job_progress', job.to_dict(), job.id)
+
+    async def health_changed(self, breakers):
+        await sio.emit('configuration', serializer.encode(_configuration_payload()))
 
 dqueue = DownloadQueue(config, Notifier())
 app.on_startup.append(lambda app: dqueue.initialize())
 app.on_cleanup.append(lambda app: Download.shutdown_manager())
+
+async def shutdown_extraction(app):
+    dqueue.extraction.shutdown()
+    dqueue.ydl_pool.clear()
+
+app.on_cleanup.append(shutdown_extraction)
+app.on_startup.append(lambda app: event_bus.start())
+app.on_cleanup.append(lambda app: event_bus.stop())
 telegram_bot = None
 
 
@@ -456,17 +716,17 @@ app.on_cleanup.append(stop_telegram_bot)
 class MetubeSubscriptionNotifier(SubscriptionNotifier):
     async def subscription_added(self, sub: SubscriptionInfo):
         log.info("Subscription added: %s", sub.name)
-        await sio.emit('subscription_added', serializer.encode(sub.to_public_dict()))
+        _publish('subscription_added', sub.to_public_dict(), sub.id)
 
     async def subscription_updated(self, sub: SubscriptionInfo):
-        await sio.emit('subscription_updated', serializer.encode(sub.to_public_dict()))
+        _publish('subscription_updated', sub.to_public_dict(), sub.id)
 
     async def subscription_removed(self, sub_id: str):
         log.info("Subscription removed: %s", sub_id)
-        await sio.emit('subscription_removed', serializer.encode(sub_id))
+        _publish('subscription_removed', sub_id, sub_id)
 
     async def subscriptions_all(self, subs: list[SubscriptionInfo]):
-        await sio.emit('subscriptions_all', serializer.encode([s.to_public_dict() for s in subs]))
+        _publish('subscriptions_all', [s.to_public_dict() for s in subs])
 
 
 submgr = SubscriptionManager(config, dqueue, MetubeSubscriptionNotifier())
@@ -520,6 +780,9 @@ async def watch_files():
     async def _watch_files():
         async for changes in awatch(config.YTDL_OPTIONS_FILE, watch_filter=FileOpsFilter()):
             success, msg = config.load_ytdl_options()
+            if success:
+                # New options hash to new pool keys anyway; close the old instances now.
+                dqueue.ydl_pool.clear()
             result = get_options_update_time(success, msg)
             await sio.emit('ytdl_options_changed', serializer.encode(result))
 
@@ -540,6 +803,52 @@ async def _read_json_request(request: web.Request) -> dict:
     return post
 
 
+PLAYLIST_ITEMS_RE = re.compile(r'^-?\d*([-:]-?\d*){0,2}(,-?\d*([-:]-?\d*){0,2})*$')
+PLAYLIST_DATE_RE = re.compile(r'^(\d{8}|(now|today|yesterday)([+-]\d+(day|week|month|year)s?)?)$')
+
+
+def _parse_playlist_range(post: dict) -> dict | None:
+    """Item range and upload-date window applied while extracting a playlist."""
+    playlist_range = {}
+    for key, name in (('playlist_start', 'start'), ('playlist_end', 'end'), ('playlist_step', 'step')):
+        value = post.get(key)
+        if value in (None, ''):
+            continue
+        try:
+            value = int(value)
+        except (TypeError, ValueError) as exc:
+            raise web.HTTPBadRequest(reason=f'{key} must be an integer') from exc
+        if value < 1:
+            raise web.HTTPBadRequest(reason=f'{key} must be at least 1')
+        playlist_range[name] = value
+    if playlist_range.get('end') and playlist_range.get('start', 1) > playlist_range['end']:
+        raise web.HTTPBadRequest(reason='playlist_start must not be greater than playlist_end')
+    items = str(post.get('playlist_items') or '').replace(' ', '')
+    if items:
+        if not PLAYLIST_ITEMS_RE.fullmatch(items):
+            raise web.HTTPBadRequest(reason='playlist_items must be a yt-dlp item spec such as "1,3,5:10" or "1::2"')
+        playlist_range['items'] = items
+    for key, name in (('date_after', 'dateafter'), ('date_before', 'datebefore')):
+        value = str(post.get(key) or '').strip().lower()
+        if not value:
+            continue
+        if not PLAYLIST_DATE_RE.fullmatch(value):
+            raise web.HTTPBadRequest(reason=f'{key} must be YYYYMMDD or a relative date such as "today-2weeks"')
+        playlist_range[name] = value
+    return playlist_range or None
+
+
+def _parse_priority(value) -> int:
+    if value is None:
+        return 0
+    if isinstance(value, bool):
+        raise web.HTTPBadRequest(reason='priority must be an integer')
+    try:
+        return int(value)
+    except (TypeError, ValueError) as exc:
+        raise web.HTTPBadRequest(reason='priority must be an integer') from exc
+
+
 def parse_download_options(post: dict) -> dict:
     """Validate add/subscribe body; raise HTTPBadRequest on invalid input."""
     post = _migrate_legacy_request(dict(post))
@@ -639,6 +948,16 @@ def parse_download_options(post: dict) -> dict:
     except (TypeError, ValueError) as exc:
         raise web.HTTPBadRequest(reason='playlist_item_limit must be an integer') from exc
 
+    source = post.get('source') or 'api'
+    if source not in SOURCES:
+        raise web.HTTPBadRequest(reason=f'source must be one of {list(SOURCES)}')
+    priority = _parse_priority(post.get('priority'))
+    try:
+        window = parse_windows(post.get('window')) or None
+        start_at = parse_start_at(post.get('start_at'))
+    except ValueError as exc:
+        raise web.HTTPBadRequest(reason=str(exc)) from exc
+
     return {
         'url': url,
         'download_type': download_type,
@@ -655,9 +974,22 @@ def parse_download_options(post: dict) -> dict:
         'subtitle_mode': subtitle_mode,
         'ytdl_options_presets': ytdl_options_presets,
         'ytdl_options_overrides': ytdl_options_overrides,
+        'playlist_range': _parse_playlist_range(post),
+        'source': source,
+        'priority': priority,
+        'window': window,
+        'start_at': start_at,
     }
 
 
+def _queue_full_response(status):
+    return web.Response(
+        status=429,
+        headers={'Retry-After': str(status['retry_after'])},
+        text=serializer.encode(status),
+    )
+
+
 @routes.post(config.URL_PREFIX + 'add')
 async def add(request):
     log.info("Received request to add download")
@@ -691,10 +1023,70 @@ async def add(request):
         o['subtitle_mode'],
         o['ytdl_options_presets'],
         o['ytdl_options_overrides'],
+        playlist_range=o['playlist_range'],
+        source=o['source'],
+        priority=o['priority'],
+        window=o['window'],
+        start_at=o['start_at'],
     )
+    if status.get('retry_after') is not None:
+        return _queue_full_response(status)
     return web.Response(text=serializer.encode(status))
 
 
+@routes.post(config.URL_PREFIX + 'add-jobs')
+async def add_job(request):
+    """Start an add in the background; progress is reported via ``add_job_progress``."""
+    post = await _read_json_request(request)
+    try:
+        o = parse_download_options(post)
+    except web.HTTPBadRequest as e:
+        log.error("Bad request: %s", e.reason)
+        raise
+    full = dqueue.queue_full(o['source'])
+    if full is not None:
+        return _queue_full_response(full)
+    job = dqueue.start_add_job(
+        o['url'],
+        o['download_type'],
+        o['codec'],
+        o['format'],
+        o['quality'],
+        o['folder'],
+        o['custom_name_prefix'],
+        o['playlist_item_limit'],
+        o['auto_start'],
+        o['split_by_chapters'],
+        o['chapter_template'],
+        o['subtitle_language'],
+        o['subtitle_mode'],
+        o['ytdl_options_presets'],
+        o['ytdl_options_overrides'],
+        playlist_range=o['playlist_range'],
+        source=o['source'],
+        priority=o['priority'],
+        window=o['window'],
+        start_at=o['start_at'],
+    )
+    log.info("Started add job %s", job.id)
+    return web.json_response({'status': 'ok', 'job': job.to_dict()}, status=202)
+
+
+@routes.get(config.URL_PREFIX + 'add-jobs/{job_id}')
+async def get_add_job(request):
+    job = dqueue.get_add_job(request.match_info['job_id'])
+    if job is None:
+        raise web.HTTPNotFound(reason='Unknown add job')
+    return web.json_response(job.to_dict())
+
+
+@routes.post(config.URL_PREFIX + 'add-jobs/{job_id}/cancel')
+async def cancel_add_job(request):
+    if not dqueue.cancel_add_job(request.match_info['job_id']):
+        raise web.HTTPNotFound(reason='Unknown add job')
+    return web.json_response({'status': 'ok'})
+
+
 @routes.get(config.URL_PREFIX + 'presets')
 async def presets(request):
     return web.Response(
@@ -708,6 +1100,16 @@ async def cancel_add(request):
     return web.Response(text=serializer.encode({'status': 'ok'}), content_type='application/json')
 
 
+@routes.post(config.URL_PREFIX + 'extraction-cache/invalidate')
+async def invalidate_extraction_cache(request):
+    post = await _read_json_request(request) if request.can_read_body else {}
+    url = post.get('url')
+    if url is not None and not isinstance(url, str):
+        raise web.HTTPBadRequest(reason='url must be a string')
+    count = dqueue.extraction.cache.invalidate(url)
+    return web.Response(text=serializer.encode({'status': 'ok', 'invalidated': count}), content_type='application/json')
+
+
 @routes.post(config.URL_PREFIX + 'subscribe')
 async def subscribe(request):
     post = await _read_json_request(request)
@@ -742,6 +1144,7 @@ async def subscribe(request):
         subtitle_mode=o['subtitle_mode'],
         ytdl_options_presets=o['ytdl_options_presets'],
         ytdl_options_overrides=o['ytdl_options_overrides'],
+        download_window=o['window'],
     )
     return web.Response(text=serializer.encode(result))
 
@@ -757,7 +1160,7 @@ async def subscriptions_update(request):
     sub_id = post.get('id')
     if not sub_id:
         raise web.HTTPBadRequest(reason='missing subscription id')
-    changes = {k: v for k, v in post.items() if k != 'id' and k in ('enabled', 'check_interval_minutes', 'name')}
+    changes = {k: v for k, v in post.items() if k != 'id' and k in ('enabled', 'check_interval_minutes', 'name', 'download_window')}
     if not changes:
         raise web.HTTPBadRequest(reason='no valid fields to update')
     log.info("Subscription update requested for %s: %s", sub_id, sorted(changes.keys()))
@@ -803,6 +1206,23 @@ async def start(request):
     ids = post.get('ids')
     log.info(f"Received request to start pending downloads for ids: {ids}")
     status = await dqueue.start_pending(ids)
+    # Moving items from pending to queue emits no event of its own.
+    state_snapshot.invalidate()
+    return web.Response(text=serializer.encode(status))
+
+@routes.post(config.URL_PREFIX + 'reorder')
+async def reorder(request):
+    post = await _read_json_request(request)
+    ids = post.get('ids')
+    position = post.get('position')
+    if not ids or position not in (None, 'front', 'back') or (position is None and post.get('priority') is None):
+        log.error("Bad request: missing 'ids', or neither a valid 'position' nor a 'priority'")
+        raise web.HTTPBadRequest()
+    priority = _parse_priority(post['priority']) if post.get('priority') is not None else None
+    status = await dqueue.reorder(ids, priority=priority, position=position)
+    log.info(f"Reorder request processed for ids: {ids}, priority: {priority}, position: {position}")
+    if status['status'] == 'error':
+        return web.Response(status=409, text=serializer.encode(status))
     return web.Response(text=serializer.encode(status))
 
 
@@ -870,8 +1290,9 @@ async def cookie_status(request):
     exists = has_uploaded_cookies or has_configured_cookies
     return web.Response(text=serializer.encode({'status': 'ok', 'has_cookies': exists}))
 
-@routes.get(config.URL_PREFIX + 'history')
-async def history(request):
+CUSTOM_DIRS_CACHE_TTL_SECONDS = 5
+
+def _build_history():
     history = { 'done': [], 'queue': [], 'pending': []}
 
     for _, v in dqueue.queue.items():
@@ -880,23 +1301,118 @@ async def history(request):
         history['done'].append(v.info)
     for _, v in dqueue.pending.items():
         history['pending'].append(v.info)
+    return serializer.encode(history)
+
+def _etag_matches(header, etag):
+    if not isinstance(header, str):
+        return False
+    return any(tag.strip() in (etag, f'W/{etag}', '*') for tag in header.split(','))
+
+@routes.get(config.URL_PREFIX + 'history')
+async def history(request):
+    etag = state_snapshot.etag
+    if _etag_matches(request.headers.get('If-None-Match'), etag):
+        return web.Response(status=304, headers={'ETag': etag})
 
     log.info("Sending download history")
-    return web.Response(text=serializer.encode(history))
+    return web.Response(
+        text=state_snapshot.get('history', _build_history),
+        headers={'ETag': etag},
+    )
+
+def _encoded_all(views, encoding='json'):
+    include_queue = 'queue' in views
+    include_done = 'done' in views
+    key = f'all:{int(include_queue)}{int(include_done)}'
+
+    def build():
+        queue, done = dqueue.get()
+        return serializer.encode((queue if include_queue else [], done if include_done else []))
+    if encoding != 'json':
+        return state_snapshot.get(f'{key}:{encoding}', lambda: _wire(_encoded_all(views), encoding))
+    return state_snapshot.get(key, build)
+
+def _encoded_subscriptions_all(encoding='json'):
+    if encoding != 'json':
+        return state_snapshot.get(
+            f'subscriptions_all:{encoding}',
+            lambda: _wire(_encoded_subscriptions_all(), encoding),
+        )
+    return state_snapshot.get(
+        'subscriptions_all',
+        lambda: serializer.encode([s.to_public_dict() for s in submgr.list_all()]),
+    )
+
+def _encoded_custom_dirs():
+    return state_snapshot.get(
+        'custom_dirs',
+        lambda: serializer.encode(get_custom_dirs()),
+        ttl=CUSTOM_DIRS_CACHE_TTL_SECONDS,
+    )
+
+def _configuration_payload():
+    # Circuit breakers that are open or probing, so the UI can explain held downloads.
+    return {**config.frontend_safe(), 'CIRCUIT_BREAKERS': dqueue.health.snapshot()}
+
+def _resume_events(auth, views):
+    if not isinstance(auth, dict):
+        return None
+    missed = event_journal.since(auth.get('epoch'), auth.get('last_seq'))
+    if missed is None:
+        return None
+    return [e for e in missed if views.intersection(EVENT_VIEWS[e[1]])]
+
+async def _join_views(sid, views, encoding='json'):
+    for view in VIEWS:
+        if view in views:
+            await sio.enter_room(sid, _view_room(view, encoding))
+        else:
+            await sio.leave_room(sid, _view_room(view, encoding))
+    await sio.save_session(sid, {'views': views, 'encoding': encoding})
+
+async def _send_view_state(sid, views, encoding='json', refresh=None):
+    """Send the initial lists for ``views``; ``refresh`` limits it to newly joined views."""
+    refresh = views if refresh is None else refresh
+    seq = event_journal.seq
+    if 'queue' in refresh or 'done' in refresh:
+        # ``all`` replaces both lists on the client, so it always covers every joined list view.
+        await sio.emit('all', (_encoded_all(views, encoding), seq), to=sid)
+    if 'subscriptions' in refresh:
+        await sio.emit('subscriptions_all', (_encoded_subscriptions_all(encoding), seq), to=sid)
 
 @sio.event
-async def connect(sid, environ):
+async def connect(sid, environ, auth=None):
     log.info(f"Client connected: {sid}")
-    await sio.emit('all', serializer.encode(dqueue.get()), to=sid)
-    await sio.emit('subscriptions_all', serializer.encode([s.to_public_dict() for s in submgr.list_all()]), to=sid)
-    await sio.emit('configuration', serializer.encode(config.frontend_safe()), to=sid)
+    views = _parse_views(auth.get('views') if isinstance(auth, dict) else None)
+    encoding = _parse_encoding(auth)
+    await _join_views(sid, views, encoding)
+    missed = _resume_events(auth, views)
+    if missed is None:
+        await _send_view_state(sid, views, encoding)
+    else:
+        log.info(f"Client {sid} resumed with {len(missed)} missed event(s)")
+        for seq, event, data in missed:
+            await sio.emit(event, (_wire(data, encoding), seq), to=sid)
+    await sio.emit('sync', serializer.encode({'epoch': event_journal.epoch, 'seq': event_journal.seq}), to=sid)
+    await sio.emit('configuration', serializer.encode(_configuration_payload()), to=sid)
     if config.CUSTOM_DIRS:
-        await sio.emit('custom_dirs', serializer.encode(get_custom_dirs()), to=sid)
+        await sio.emit('custom_dirs', _encoded_custom_dirs(), to=sid)
     if config.YTDL_OPTIONS_FILE:
         await sio.emit('ytdl_options_changed', serializer.encode(get_options_update_time()), to=sid)
 
+@sio.event
+async def set_views(sid, data):
+    views = _parse_views(data)
+    session = await sio.get_session(sid)
+    encoding = session.get('encoding', 'json')
+    joined = views - set(session.get('views', ()))
+    await _join_views(sid, views, encoding)
+    # Lists the client already followed are current; only newly joined ones need a snapshot.
+    await _send_view_state(sid, views, encoding, joined)
+
+
 def get_custom_dirs():
-    cache_ttl_seconds = 5
+    cache_ttl_seconds = CUSTOM_DIRS_CACHE_TTL_SECONDS
     now = asyncio.get_running_loop().time()
     cache_key = (
         config.DOWNLOAD_DIR,
@@ -981,6 +1497,25 @@ async def version(request):
         "version": os.getenv("METUBE_VERSION", "dev")
     })
 
+@routes.get(config.URL_PREFIX + 'stats')
+async def stats(request):
+    return web.json_response({
+        "event_bus": event_bus.stats(),
+        "extraction": dqueue.extraction.stats(),
+        "ydl_pool": dqueue.ydl_pool.stats(),
+        "rate_limits": dqueue.extraction.rate_limiter.stats(),
+        "scheduler": dqueue.scheduler.stats(),
+        "bandwidth": dqueue.bandwidth.stats(),
+        "concurrency": dqueue.concurrency.stats() if dqueue.concurrency is not None else None,
+        "preresolve": dqueue.preresolve_stats(),
+        "watchdog": dqueue.watchdog_stats(),
+        "retries": dqueue.retry_stats(),
+        "health": dqueue.health.stats(),
+        "disk": dqueue.disk.stats(),
+        "queue_limits": dqueue.queue_limit_stats(),
+        "scheduled": dqueue.scheduled.stats(),
+    })
+
 if config.URL_PREFIX != '/':
     @routes.get('/')
     async def index_redirect_root(request):
@@ -1007,6 +1542,7 @@ async def add_cors(request):
 
 app.router.add_route('OPTIONS', config.URL_PREFIX + 'add', add_cors)
 app.router.add_route('OPTIONS', config.URL_PREFIX + 'cancel-add', add_cors)
+app.router.add_route('OPTIONS', config.URL_PREFIX + 'add-jobs', add_cors)
 app.router.add_route('OPTIONS', config.URL_PREFIX + 'subscribe', add_cors)
 app.router.add_route('OPTIONS', config.URL_PREFIX + 'subscriptions', add_cors)
 app.router.add_route('OPTIONS', config.URL_PREFIX + 'subscriptions/update', add_cors)
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import random
+import re
+import time
+import urllib.parse
+from typing import Any, Optional
+
+PERMANENT = "permanent"
+TRANSIENT = "transient"
+THROTTLED = "throttled"
+
+# Checked in order; the first match wins. Anything unmatched is permanent, so
+# an unknown error is reported at once instead of being retried blindly.
+_RULES = (
+    (PERMANENT, re.compile(
+        r"private video|video unavailable|has been removed|account .* terminated|copyright"
+        r"|not available in your country|members[- ]only|join this channel|sign in to confirm your age"
+        r"|unsupported url|requested format is not available|premieres in|this live event will begin"
+        r"|http error 40[014]|http error 410|no space left on device",
+        re.IGNORECASE)),
+    (THROTTLED, re.compile(
+        r"http error 429|too many requests|sign in to confirm you.?re not a bot|rate[- ]limit",
+        re.IGNORECASE)),
+    (TRANSIENT, re.compile(
+        r"http error 5\d\d|http error 403|connection (?:reset|refused|aborted)|remote end closed"
+        r"|timed out|incompleteread|temporary failure in name resolution|name or service not known"
+        r"|fragment|did not get any data blocks|unable to download video data|errno 10[34]",
+        re.IGNORECASE)),
+)
+
+
+def classify(msg: Optional[str]) -> str:
+    """``PERMANENT``, ``TRANSIENT`` or ``THROTTLED`` (transient, and the site asked us to back off)."""
+    for kind, pattern in _RULES:
+        if msg and pattern.search(msg):
+            return kind
+    return PERMANENT
+
+
+def host_of(url: str) -> str:
+    host = (urllib.parse.urlsplit(url or "").hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+class RetryPolicy:
+    """Decide whether and when a failed download is tried again.
+
+    Transient failures are retried up to ``max_attempts`` times after an
+    exponential backoff (``base_delay`` doubling per attempt, capped at
+    ``max_delay``, with ``jitter`` spreading retries of a batch apart). A
+    throttled failure also puts its host on a ``cooldown`` that delays every
+    download from that host, not only the one that failed.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        base_delay: float = 30.0,
+        max_delay: float = 1800.0,
+        cooldown: float = 300.0,
+        jitter: float = 0.2,
+    ):
+        self.max_attempts = max(0, int(max_attempts))
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.cooldown = cooldown
+        self.jitter = jitter
+        self._cooldowns: dict[str, float] = {}
+        self.classified = {PERMANENT: 0, TRANSIENT: 0, THROTTLED: 0}
+        self.retried = 0
+        self.gave_up = 0
+
+    def backoff(self, attempt: int) -> float:
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter) if self.jitter else delay
+
+    def cooldown_remaining(self, host: str) -> float:
+        until = self._cooldowns.get(host)
+        if until is None:
+            return 0.0
+        remaining = until - time.monotonic()
+        if remaining <= 0:
+            del self._cooldowns[host]
+            return 0.0
+        return remaining
+
+    def decide(self, msg: Optional[str], attempt: int, host: str) -> Optional[float]:
+        """Seconds to wait before ``attempt`` (1 for the first retry), or None to give up."""
+        kind = classify(msg)
+        self.classified[kind] += 1
+        if kind == THROTTLED and self.cooldown > 0 and host:
+            self._cooldowns[host] = max(self._cooldowns.get(host, 0.0), time.monotonic() + self.cooldown)
+        if kind == PERMANENT:
+            return None
+        if attempt > self.max_attempts:
+            self.gave_up += 1
+            return None
+        self.retried += 1
+        return max(self.backoff(attempt), self.cooldown_remaining(host))
+
+    def stats(self) -> dict[str, Any]:
+        cooldowns = {}
+        for host in list(self._cooldowns):
+            remaining = self.cooldown_remaining(host)
+            if remaining:
+                cooldowns[host] = round(remaining, 1)
+        return {
+            "max_attempts": self.max_attempts,
+            "classified": dict(self.classified),
+            "retried": self.retried,
+            "gave_up": self.gave_up,
+            "cooldowns": cooldowns,
+        }
@@ -0,0 +1,315 @@
+from __future__ import annotations
+
+import asyncio
+import collections
+import contextlib
+import heapq
+import itertools
+import json
+import time
+import urllib.parse
+from typing import Any, AsyncIterator, Callable, Hashable, Iterable, Iterator, Optional
+
+DEFAULT_POOL = "default"
+
+# Where a download was requested from; each source is a flow of its own in
+# the weighted-fair queue.
+SOURCES = ("ui", "api", "telegram", "subscription")
+
+
+class _Pool:
+    __slots__ = ("limit", "active", "granted", "wait_total", "wait_max")
+
+    def __init__(self, limit: Optional[int]):
+        self.limit = limit
+        self.active = 0
+        self.granted = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def has_room(self) -> bool:
+        return self.limit is None or self.active < self.limit
+
+
+class _Waiter:
+    __slots__ = ("item", "pool", "source", "priority", "seq", "future", "enqueued_at")
+
+    def __init__(self, item: Hashable, pool: str, source: str, priority: int, seq: int, future: asyncio.Future):
+        self.item = item
+        self.pool = pool
+        self.source = source
+        self.priority = priority
+        self.seq = seq
+        self.future = future
+        self.enqueued_at = time.monotonic()
+
+
+class DownloadScheduler:
+    """Hand out download slots under a global limit and per-pool limits.
+
+    A download belongs to the pool named after its extractor (``youtube``)
+    or its host (``vimeo.com``, also covering subdomains), falling back to
+    ``default``. Waiting downloads hold nothing: each is granted a global
+    slot and a pool slot together, in the order given by ``_candidates``,
+    skipping over downloads whose pool is full so they do not block the
+    others.
+
+    Higher priorities always go first. Within a priority, sources share the
+    slots in proportion to ``weights`` (start-time fair queueing), so a
+    download requested from the UI does not wait behind hundreds queued by
+    a subscription check.
+
+    ``admission``, if given, is asked about each download about to be granted
+    a slot. A download it rejects is set aside, so that new arrivals do not
+    ask about it again, until a slot is released or ``kick`` says something
+    it depends on may have changed. It is called with the item and a dict
+    shared by every call of one dispatch pass, where it can cache what is
+    costly to look up, since a pass may ask about every held download.
+    """
+
+    def __init__(
+        self,
+        limit: int,
+        pools: Optional[dict[str, int]] = None,
+        weights: Optional[dict[str, float]] = None,
+        admission: Optional[Callable[[Hashable, dict[str, Any]], bool]] = None,
+    ):
+        self.limit = max(1, int(limit))
+        self._pools: dict[str, _Pool] = {name: _Pool(n) for name, n in self.parse_pools(pools or {}).items()}
+        self._pools.setdefault(DEFAULT_POOL, _Pool(None))
+        self.weights = self.parse_weights(weights or {})
+        self.admission = admission
+        self.rejected = 0
+        self._sources: dict[str, _Pool] = {source: _Pool(None) for source in SOURCES}
+        self._waiters: collections.deque[_Waiter] = collections.deque()
+        # Waiters rejected by admission, left out of dispatch until rechecked.
+        self._held: list[_Waiter] = []
+        self._back = itertools.count()
+        self._front = itertools.count(-1, -1)
+        # Virtual time of the fair queue and, per source, the virtual finish
+        # time of the last download it was granted.
+        self._vtime = 0.0
+        self._finish: dict[str, float] = {}
+        self.active = 0
+
+    @staticmethod
+    def parse_pools(pools: Any) -> dict[str, int]:
+        if isinstance(pools, str):
+            try:
+                pools = json.loads(pools or "{}")
+            except json.JSONDecodeError as exc:
+                raise ValueError(f"download pools are not valid JSON: {exc}") from None
+        if not isinstance(pools, dict):
+            raise ValueError("download pools must be a JSON object keyed by extractor or host")
+        parsed = {}
+        for name, limit in pools.items():
+            if isinstance(limit, bool) or not isinstance(limit, int) or limit < 1:
+                raise ValueError(f'download pool "{name}" needs a positive integer limit')
+            parsed[name.lower().lstrip(".")] = limit
+        return parsed
+
+    @staticmethod
+    def parse_weights(weights: Any) -> dict[str, float]:
+        if isinstance(weights, str):
+            try:
+                weights = json.loads(weights or "{}")
+            except json.JSONDecodeError as exc:
+                raise ValueError(f"source weights are not valid JSON: {exc}") from None
+        if not isinstance(weights, dict):
+            raise ValueError("source weights must be a JSON object keyed by source")
+        parsed = {}
+        for source, weight in weights.items():
+            if source not in SOURCES:
+                raise ValueError(f'unknown source "{source}", expected one of {", ".join(SOURCES)}')
+            if isinstance(weight, bool) or not isinstance(weight, (int, float)) or weight <= 0:
+                raise ValueError(f'weight of source "{source}" must be a positive number')
+            parsed[source] = float(weight)
+        return parsed
+
+    @staticmethod
+    def parse_source_limits(limits: Any) -> dict[str, int]:
+        if isinstance(limits, str):
+            try:
+                limits = json.loads(limits or "{}")
+            except json.JSONDecodeError as exc:
+                raise ValueError(f"source limits are not valid JSON: {exc}") from None
+        if not isinstance(limits, dict):
+            raise ValueError("source limits must be a JSON object keyed by source")
+        parsed = {}
+        for source, limit in limits.items():
+            if source not in SOURCES:
+                raise ValueError(f'unknown source "{source}", expected one of {", ".join(SOURCES)}')
+            if isinstance(limit, bool) or not isinstance(limit, int) or limit < 1:
+                raise ValueError(f'limit of source "{source}" must be a positive integer')
+            parsed[source] = limit
+        return parsed
+
+    def pool_for(self, url: str, extractor: Optional[str] = None) -> str:
+        """Name of the pool a download of ``url`` found by ``extractor`` belongs to."""
+        if extractor:
+            name = str(extractor).lower().split(":", 1)[0]
+            if name in self._pools and name != DEFAULT_POOL:
+                return name
+        labels = (urllib.parse.urlsplit(url or "").hostname or "").lower().split(".")
+        for i in range(len(labels) - 1):
+            candidate = ".".join(labels[i:])
+            if candidate in self._pools:
+                return candidate
+        return DEFAULT_POOL
+
+    @contextlib.asynccontextmanager
+    async def slot(self, item: Hashable, pool: str, source: str = "ui", priority: int = 0) -> AsyncIterator[None]:
+        await self.acquire(item, pool, source, priority)
+        try:
+            yield
+        finally:
+            self.release(pool)
+
+    async def acquire(self, item: Hashable, pool: str, source: str = "ui", priority: int = 0) -> None:
+        waiter = _Waiter(item, pool, source, priority, next(self._back), asyncio.get_running_loop().create_future())
+        self._waiters.append(waiter)
+        self._dispatch()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Granted just as the caller gave up; pass the slot on.
+                self.release(pool)
+            else:
+                with contextlib.suppress(ValueError):
+                    self._waiters.remove(waiter)
+                with contextlib.suppress(ValueError):
+                    self._held.remove(waiter)
+            raise
+
+    def set_limit(self, limit: int) -> None:
+        """Change the global slot count; running downloads above a lower limit finish normally."""
+        self.limit = max(1, int(limit))
+        self._dispatch()
+
+    def kick(self) -> None:
+        """Dispatch again after something ``admission`` depends on may have changed."""
+        self._recheck()
+        self._dispatch()
+
+    def release(self, pool: str) -> None:
+        self.active -= 1
+        self._pools[pool].active -= 1
+        # A finished download may have been what held the others back.
+        self._recheck()
+        self._dispatch()
+
+    def _recheck(self) -> None:
+        self._waiters.extend(self._held)
+        self._held.clear()
+
+    def reorder(self, item: Hashable, priority: Optional[int] = None, position: Optional[str] = None) -> bool:
+        """Change the priority of a waiting ``item`` and/or move it to the
+        ``"front"`` or ``"back"`` of its source's downloads.
+
+        Returns False if ``item`` is not waiting.
+        """
+        for waiter in itertools.chain(self._waiters, self._held):
+            if waiter.item == item and not waiter.future.done():
+                break
+        else:
+            return False
+        if priority is not None:
+            waiter.priority = priority
+        if position == "front":
+            waiter.seq = next(self._front)
+        elif position == "back":
+            waiter.seq = next(self._back)
+        self._dispatch()
+        return True
+
+    def _weight(self, source: str) -> float:
+        return self.weights.get(source, 1.0)
+
+    def _candidates(self, waiters: Iterable[_Waiter]) -> Iterator[_Waiter]:
+        """``waiters`` in the order they should be considered for a slot."""
+        classes: dict[int, dict[str, list[_Waiter]]] = {}
+        for waiter in waiters:
+            classes.setdefault(waiter.priority, {}).setdefault(waiter.source, []).append(waiter)
+        for priority in sorted(classes, reverse=True):
+            flows = classes[priority]
+            heap = []
+            for source, waiters in flows.items():
+                waiters.sort(key=lambda w: w.seq)
+                heap.append((max(self._finish.get(source, 0.0), self._vtime), source, 0))
+            heapq.heapify(heap)
+            while heap:
+                start, source, index = heapq.heappop(heap)
+                yield flows[source][index]
+                if index + 1 < len(flows[source]):
+                    heapq.heappush(heap, (start + 1 / self._weight(source), source, index + 1))
+
+    def _dispatch(self) -> None:
+        if self.active >= self.limit:
+            return
+        context: dict[str, Any] = {}
+        held = []
+        for waiter in self._candidates(self._waiters):
+            if self.active >= self.limit:
+                break
+            if waiter.future.done():
+                self._waiters.remove(waiter)
+                continue
+            pool = self._pools[waiter.pool]
+            if not pool.has_room():
+                continue
+            if self.admission is not None and not self.admission(waiter.item, context):
+                self.rejected += 1
+                held.append(waiter)
+                continue
+            self._waiters.remove(waiter)
+            waited = time.monotonic() - waiter.enqueued_at
+            pool.active += 1
+            for counts in (pool, self._sources.setdefault(waiter.source, _Pool(None))):
+                counts.granted += 1
+                counts.wait_total += waited
+                counts.wait_max = max(counts.wait_max, waited)
+            start = max(self._finish.get(waiter.source, 0.0), self._vtime)
+            self._finish[waiter.source] = start + 1 / self._weight(waiter.source)
+            self._vtime = start
+            self.active += 1
+            waiter.future.set_result(None)
+        if held:
+            set_aside = set(map(id, held))
+            self._waiters = collections.deque(w for w in self._waiters if id(w) not in set_aside)
+            self._held.extend(held)
+
+    def waiting(self) -> list[Hashable]:
+        """Items still waiting for a slot, next in line first."""
+        waiters = itertools.chain(self._waiters, self._held)
+        return [waiter.item for waiter in self._candidates(waiters) if not waiter.future.done()]
+
+    def stats(self) -> dict[str, Any]:
+        now = time.monotonic()
+        waiters = [w for w in itertools.chain(self._waiters, self._held) if not w.future.done()]
+
+        def waits(counts: _Pool, waiting: list[_Waiter]) -> dict[str, Any]:
+            return {
+                "waiting": len(waiting),
+                "granted": counts.granted,
+                "wait_avg_seconds": round(counts.wait_total / counts.granted, 3) if counts.granted else 0.0,
+                "wait_max_seconds": round(counts.wait_max, 3),
+                "oldest_wait_seconds": round(max((now - w.enqueued_at for w in waiting), default=0.0), 3),
+            }
+
+        pools = {
+            name: {"limit": pool.limit, "active": pool.active, **waits(pool, [w for w in waiters if w.pool == name])}
+            for name, pool in sorted(self._pools.items())
+        }
+        sources = {
+            source: {"weight": self._weight(source), **waits(counts, [w for w in waiters if w.source == source])}
+            for source, counts in self._sources.items()
+        }
+        return {
+            "limit": self.limit,
+            "active": self.active,
+            "waiting": len(waiters),
+            "rejected": self.rejected,
+            "pools": pools,
+            "sources": sources,
+        }
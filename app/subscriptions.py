@@ -4,6 +4,7 @@ from __future__ import annotations
 
 import asyncio
 import copy
+import json
 import logging
 import os
 import time
@@ -14,7 +15,10 @@ from typing import Any, Optional
 
 import yt_dlp
 import yt_dlp.networking.impersonate
+from extraction import ExtractionTimeout, normalize_url
 from state_store import AtomicJsonStore, read_legacy_shelf
+from timewindow import parse_windows
+from ytdl import entry_id, entry_video_url
 
 log = logging.getLogger("subscriptions")
 
@@ -66,7 +70,7 @@ def _is_media_entry(entry: Any) -> bool:
         return False
     if entry.get("entries"):
         return False
-    url = _entry_video_url(entry)
+    url = entry_video_url(entry)
     if not url:
         return False
     ie_key = str(entry.get("ie_key") or entry.get("extractor_key") or "").lower()
@@ -75,10 +79,15 @@ def _is_media_entry(entry: Any) -> bool:
     return True
 
 
-def extract_flat_playlist(config, url: str, playlistend: int, *, _depth: int = 0):
-    """Return (info_dict, entries_list) for playlist/channel URLs."""
+def extract_flat_playlist(config, url: str, playlistend: int, *, ydl_pool=None, _depth: int = 0):
+    """Return (info_dict, entries_list) for playlist/channel URLs.
+
+    ``ydl_pool`` (an ``extraction.YoutubeDLPool``) lets repeated checks reuse
+    YoutubeDL instances instead of building one per call.
+    """
     params = _build_ydl_params(config, playlistend=playlistend)
-    with yt_dlp.YoutubeDL(params=params) as ydl:
+    ydl_context = ydl_pool.acquire(params) if ydl_pool is not None else yt_dlp.YoutubeDL(params=params)
+    with ydl_context as ydl:
         info = ydl.extract_info(url, download=False)
     if not info:
         return None, []
@@ -96,13 +105,14 @@ def extract_flat_playlist(config, url: str, playlistend: int, *, _depth: int = 0
             return info, media_entries
         if _depth < 1:
             for ent in entries[:5]:
-                nested_url = _entry_video_url(ent)
+                nested_url = entry_video_url(ent)
                 if not nested_url:
                     continue
                 nested_info, nested_entries = extract_flat_playlist(
                     config,
                     nested_url,
                     playlistend,
+                    ydl_pool=ydl_pool,
                     _depth=_depth + 1,
                 )
                 if nested_entries:
@@ -114,18 +124,6 @@ def extract_flat_playlist(config, url: str, playlistend: int, *, _depth: int = 0
     return info, []
 
 
-def _entry_video_url(entry: dict) -> Optional[str]:
-    return entry.get("webpage_url") or entry.get("url")
-
-
-def _entry_id(entry: dict) -> Optional[str]:
-    eid = entry.get("id")
-    if eid is not None:
-        return str(eid)
-    url = _entry_video_url(entry)
-    return url
-
-
 @dataclass
 class SubscriptionInfo:
     id: str
@@ -147,6 +145,8 @@ class SubscriptionInfo:
     subtitle_mode: str = "prefer_manual"
     ytdl_options_presets: list[str] = field(default_factory=list)
     ytdl_options_overrides: dict[str, Any] = field(default_factory=dict)
+    # Time windows (timewindow.parse_windows) new entries may download in.
+    download_window: Optional[list[dict[str, Any]]] = None
     last_checked: Optional[float] = None
     seen_ids: list[str] = field(default_factory=list)
     error: Optional[str] = None
@@ -167,6 +167,7 @@ class SubscriptionInfo:
             "format": self.format,
             "quality": self.quality,
             "folder": self.folder,
+            "download_window": self.download_window,
             "last_checked": self.last_checked,
             "seen_count": len(self.seen_ids),
             "error": self.error,
@@ -194,6 +195,7 @@ def _subscription_to_record(sub: SubscriptionInfo) -> dict[str, Any]:
         "subtitle_mode": sub.subtitle_mode,
         "ytdl_options_presets": list(sub.ytdl_options_presets),
         "ytdl_options_overrides": sub.ytdl_options_overrides,
+        "download_window": sub.download_window,
         "last_checked": sub.last_checked,
         "seen_ids": list(sub.seen_ids),
         "error": sub.error,
@@ -282,6 +284,25 @@ class SubscriptionManager:
         # No persistent shelf handle to close.
         return
 
+    async def _extract_flat(self, url: str, playlistend: int, fresh: bool = False):
+        # Share the download queue's extraction pool so checks neither block
+        # the event loop nor duplicate an identical extraction already running.
+        # Periodic checks pass ``fresh`` so new uploads are never hidden by the
+        # cache; their result still refreshes it.
+        pool = getattr(self.dqueue, "extraction", None)
+        if pool is None:
+            return extract_flat_playlist(self.config, url, playlistend)
+        options = json.dumps(getattr(self.config, "YTDL_OPTIONS", {}), sort_keys=True, default=str)
+        # YoutubeDL instances cannot be handed to worker processes.
+        ydl_pool = getattr(self.dqueue, "ydl_pool", None) if pool.mode == "thread" else None
+        return await pool.run(
+            (normalize_url(url), "flat_playlist", playlistend, options),
+            extract_flat_playlist, self.config, url, playlistend,
+            url=url,
+            fresh=fresh,
+            ydl_pool=ydl_pool,
+        )
+
     def _normalize_url(self, url: str) -> str:
         return (url or "").strip()
 
@@ -349,13 +370,15 @@ class SubscriptionManager:
         subtitle_mode: str,
         ytdl_options_presets: Optional[list[str]] = None,
         ytdl_options_overrides: Optional[dict[str, Any]] = None,
+        download_window: Optional[list[dict[str, Any]]] = None,
     ) -> tuple[list[str], list[str]]:
         queued_ids: list[str] = []
         queue_errors: list[str] = []
         presets = list(ytdl_options_presets or [])
+        batch: list[dict] = []
         for ent in entries:
-            eid = _entry_id(ent)
-            vurl = _entry_video_url(ent)
+            eid = entry_id(ent)
+            vurl = entry_video_url(ent)
             if not eid or not vurl:
                 continue
             queue_entry = dict(ent)
@@ -363,29 +386,43 @@ class SubscriptionManager:
                 queue_entry["id"] = eid
             queue_entry["_type"] = "video"
             queue_entry["webpage_url"] = vurl
-            result = await self.dqueue.add_entry(
-                queue_entry,
-                download_type,
-                codec,
-                format,
-                quality,
-                folder or None,
-                custom_name_prefix,
-                playlist_item_limit,
-                auto_start,
-                split_by_chapters,
-                chapter_template or None,
-                subtitle_language,
-                subtitle_mode,
-                presets,
-                ytdl_options_overrides,
-            )
-            if isinstance(result, dict) and result.get("status") == "error":
-                msg = str(result.get("msg") or f"Queueing failed for {vurl}")
-                queue_errors.append(msg)
-                log.warning("Subscription queueing failed for %s: %s", vurl, msg)
-                continue
-            queued_ids.append(eid)
+            batch.append(queue_entry)
+        room = self.dqueue.queue_room("subscription")
+        if room is not None and len(batch) > room:
+            # Left unseen, so the next check picks them up once the queue drains.
+            deferred = len(batch) - room
+            batch = batch[:room]
+            queue_errors.append(f"Download queue is full; {deferred} new entries deferred to the next check")
+            log.info("Subscription queueing deferred %d entries: download queue is full", deferred)
+        if not batch:
+            return queued_ids, queue_errors
+        # Queue every new entry of this check as one batch (one state write, one UI event).
+        result = await self.dqueue.add_entries(
+            batch,
+            download_type,
+            codec,
+            format,
+            quality,
+            folder or None,
+            custom_name_prefix,
+            playlist_item_limit,
+            auto_start,
+            split_by_chapters,
+            chapter_template or None,
+            subtitle_language,
+            subtitle_mode,
+            presets,
+            ytdl_options_overrides,
+            source="subscription",
+            window=download_window,
+        )
+        # Only the entries that made it are marked seen; the rest are retried next check.
+        added = set(result.get("added") or ()) if isinstance(result, dict) else set()
+        queued_ids.extend(entry["id"] for entry in batch if entry["id"] in added)
+        if isinstance(result, dict) and result.get("status") == "error":
+            msg = str(result.get("msg") or f"Queueing failed for {len(batch)} entries")
+            queue_errors.append(msg)
+            log.warning("Subscription queueing failed for %d of %d entries: %s", len(batch) - len(queued_ids), len(batch), msg)
         return queued_ids, queue_errors
 
     def list_all(self) -> list[SubscriptionInfo]:
@@ -448,6 +485,7 @@ class SubscriptionManager:
         subtitle_mode: str,
         ytdl_options_presets: Optional[list[str]] = None,
         ytdl_options_overrides: Optional[dict[str, Any]] = None,
+        download_window: Optional[list[dict[str, Any]]] = None,
     ) -> dict:
         url = self._normalize_url(url)
         if not url:
@@ -461,8 +499,8 @@ class SubscriptionManager:
         try:
             scan_first = max(int(getattr(self.config, "SUBSCRIPTION_SCAN_PLAYLIST_END", 50)), 1)
             try:
-                info, entries = extract_flat_playlist(self.config, url, scan_first)
-            except yt_dlp.utils.YoutubeDLError as exc:
+                info, entries = await self._extract_flat(url, scan_first)
+            except (yt_dlp.utils.YoutubeDLError, ExtractionTimeout) as exc:
                 return {"status": "error", "msg": str(exc)}
 
             if not info:
@@ -485,7 +523,7 @@ class SubscriptionManager:
             for ent in seen_entries:
                 if ent.get("live_status") == "is_upcoming":
                     continue  # Don't mark scheduled streams as seen; queue them when they go live
-                eid = _entry_id(ent)
+                eid = entry_id(ent)
                 if eid:
                     all_ids.append(eid)
 
@@ -509,6 +547,7 @@ class SubscriptionManager:
                 subtitle_mode=subtitle_mode,
                 ytdl_options_presets=list(ytdl_options_presets or []),
                 ytdl_options_overrides=dict(ytdl_options_overrides or {}),
+                download_window=download_window or None,
                 last_checked=time.time(),
                 seen_ids=list(dict.fromkeys(all_ids)),
                 error=None,
@@ -561,6 +600,10 @@ class SubscriptionManager:
                 return {"status": "error", "msg": "Subscription not found"}
             previous = copy.deepcopy(sub)
             old_enabled = sub.enabled
+            try:
+                window = parse_windows(changes.get("download_window")) or None
+            except ValueError as exc:
+                return {"status": "error", "msg": str(exc)}
 
             if "enabled" in changes:
                 sub.enabled = _coerce_bool(changes["enabled"])
@@ -568,6 +611,8 @@ class SubscriptionManager:
                 sub.check_interval_minutes = max(1, int(changes["check_interval_minutes"]))
             if "name" in changes and changes["name"]:
                 sub.name = str(changes["name"])
+            if "download_window" in changes:
+                sub.download_window = window
 
             try:
                 self._save_locked()
@@ -604,8 +649,8 @@ class SubscriptionManager:
         scan = int(getattr(self.config, "SUBSCRIPTION_SCAN_PLAYLIST_END", 50))
         log.info("Checking subscription: %s", sub.name)
         try:
-            info, entries = extract_flat_playlist(self.config, sub.url, scan)
-        except yt_dlp.utils.YoutubeDLError as exc:
+            info, entries = await self._extract_flat(sub.url, scan, fresh=True)
+        except (yt_dlp.utils.YoutubeDLError, ExtractionTimeout) as exc:
             async with self._lock:
                 cur = self._subs.get(sid)
                 if cur:
@@ -659,11 +704,12 @@ class SubscriptionManager:
             dl_submode = cur.subtitle_mode
             dl_ytdl_presets = list(cur.ytdl_options_presets)
             dl_ytdl_overrides = dict(cur.ytdl_options_overrides)
+            dl_window = cur.download_window
 
         new_entries: list[dict] = []
         new_ids: list[str] = []
         for ent in entries:
-            eid = _entry_id(ent)
+            eid = entry_id(ent)
             if not eid:
                 continue
             if eid in seen and ent.get("live_status") != "is_live":
@@ -687,6 +733,7 @@ class SubscriptionManager:
             subtitle_mode=dl_submode,
             ytdl_options_presets=dl_ytdl_presets,
             ytdl_options_overrides=dl_ytdl_overrides,
+            download_window=dl_window,
         )
         log.info(
             "Subscription check finished for %s: %d new, %d queued, %d failed",
@@ -509,7 +509,8 @@ class TelegramBot:
         selection = self._normalize_download_selection(config)
         queued_count = 0
         errors = []
-        for url in valid_urls:
+        deferred = []
+        for index, url in enumerate(valid_urls):
             token = self._current_chat_id.set(chat_id)
             try:
                 status = await self.dqueue.add(
@@ -528,10 +529,16 @@ class TelegramBot:
                     config.get("subtitle_mode", "prefer_manual"),
                     [],
                     {},
+                    source="telegram",
                 )
             finally:
                 self._current_chat_id.reset(token)
 
+            if status.get("retry_after") is not None:
+                # The queue is full; the remaining links would be rejected too.
+                deferred = valid_urls[index:]
+                retry_after = status["retry_after"]
+                break
             if status.get("status") == "error":
                 errors.append(f"- {url}: {status.get('msg', 'unknown error')}")
             else:
@@ -544,6 +551,12 @@ class TelegramBot:
         if errors:
             error_text = "\n".join(errors)
             await self._send_message(chat_id, f"Some links failed:\n{error_text}")
+        if deferred:
+            await self._send_message(
+                chat_id,
+                f"The download queue is full, so {len(deferred)} link(s) were not queued. "
+                f"Please send them again in about {retry_after} seconds.",
+            )
 
     def _get_authorized_chat_id(self, update: Update) -> int | None:
         chat = update.effective_chat
@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 import json
+import zlib
 from unittest.mock import AsyncMock, MagicMock
 
 import pytest
@@ -25,11 +26,14 @@ def mock_dqueue(monkeypatch):
     d.queue.saved_items = MagicMock(return_value=[])
     d.done.saved_items = MagicMock(return_value=[])
     d.pending.saved_items = MagicMock(return_value=[])
+    d.health.snapshot = MagicMock(return_value={})
+    d.queue_full = MagicMock(return_value=None)
     d.queue.items = MagicMock(return_value=[])
     d.done.items = MagicMock(return_value=[])
     d.pending.items = MagicMock(return_value=[])
     d.get = MagicMock(return_value=([], []))
     monkeypatch.setattr(main, "dqueue", d)
+    main.state_snapshot.invalidate()
     return d
 
 
@@ -82,6 +86,26 @@ async def test_add_passes_preset_and_overrides(mock_dqueue, monkeypatch):
     assert call.args[14] == {"writesubtitles": True}
 
 
+@pytest.mark.asyncio
+async def test_add_passes_time_window_and_start_time(mock_dqueue):
+    body = _valid_video_add_body(window={"from": "1:00", "to": "6:00"}, start_at=1700000000)
+    resp = await main.add(_json_request(body))
+    assert resp.status == 200
+    call = mock_dqueue.add.await_args
+    assert call.kwargs["window"] == [{"from": "01:00", "to": "06:00"}]
+    assert call.kwargs["start_at"] == 1700000000.0
+    with pytest.raises(web.HTTPBadRequest):
+        await main.add(_json_request(_valid_video_add_body(window={"from": "1:00"})))
+
+
+@pytest.mark.asyncio
+async def test_add_source_defaults_to_api(mock_dqueue):
+    await main.add(_json_request(_valid_video_add_body()))
+    assert mock_dqueue.add.await_args.kwargs["source"] == "api"
+    await main.add(_json_request(_valid_video_add_body(source="ui")))
+    assert mock_dqueue.add.await_args.kwargs["source"] == "ui"
+
+
 @pytest.mark.asyncio
 async def test_add_legacy_string_preset_normalized(mock_dqueue, monkeypatch):
     monkeypatch.setattr(main.config, "YTDL_OPTIONS_PRESETS", {"Legacy": {}})
@@ -207,6 +231,19 @@ async def test_delete_queue_calls_cancel(mock_dqueue):
     mock_dqueue.cancel.assert_awaited_once_with(["http://x"])
 
 
+@pytest.mark.asyncio
+async def test_reorder_passes_priority_and_position(mock_dqueue):
+    mock_dqueue.reorder = AsyncMock(return_value={"status": "ok", "updated": 1})
+    resp = await main.reorder(_json_request({"ids": ["a"], "priority": "3", "position": "front"}))
+    assert resp.status == 200
+    mock_dqueue.reorder.assert_awaited_once_with(["a"], priority=3, position="front")
+    with pytest.raises(web.HTTPBadRequest):
+        await main.reorder(_json_request({"ids": ["a"]}))
+    mock_dqueue.reorder = AsyncMock(return_value={"status": "error", "updated": 1, "unmoved": ["a"], "msg": "x"})
+    resp = await main.reorder(_json_request({"ids": ["a"], "position": "front"}))
+    assert resp.status == 409
+
+
 @pytest.mark.asyncio
 async def test_start_pending(mock_dqueue):
     req = _json_request({"ids": ["a"]})
@@ -227,6 +264,32 @@ async def test_history_shape(mock_dqueue):
     assert set(data.keys()) == {"done", "queue", "pending"}
 
 
+@pytest.mark.asyncio
+async def test_history_reuses_snapshot_until_state_changes(mock_dqueue):
+    req = MagicMock(spec=web.Request)
+    req.headers = {}
+    first = await main.history(req)
+    second = await main.history(req)
+    assert first.headers["ETag"] == second.headers["ETag"]
+    assert mock_dqueue.queue.items.call_count == 1
+
+    main.state_snapshot.invalidate()
+    third = await main.history(req)
+    assert third.headers["ETag"] != first.headers["ETag"]
+    assert mock_dqueue.queue.items.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_history_if_none_match_returns_304(mock_dqueue):
+    req = MagicMock(spec=web.Request)
+    req.headers = {}
+    first = await main.history(req)
+    req.headers = {"If-None-Match": first.headers["ETag"]}
+    resp = await main.history(req)
+    assert resp.status == 304
+    assert resp.headers["ETag"] == first.headers["ETag"]
+
+
 @pytest.mark.asyncio
 async def test_version_json(mock_dqueue):
     req = MagicMock(spec=web.Request)
@@ -282,3 +345,177 @@ async def test_add_legacy_format_migrated(mock_dqueue):
     call = mock_dqueue.add.await_args
     assert call is not None
     assert call.args[1] == "audio"
+
+
+@pytest.fixture
+def mock_sio(monkeypatch):
+    s = MagicMock()
+    s.emit = AsyncMock()
+    s.enter_room = AsyncMock()
+    s.leave_room = AsyncMock()
+    s.save_session = AsyncMock()
+    s.get_session = AsyncMock(return_value={})
+    monkeypatch.setattr(main, "sio", s)
+    return s
+
+
+def _emitted(mock_sio, event):
+    return [c for c in mock_sio.emit.await_args_list if c.args[0] == event]
+
+
+@pytest.mark.asyncio
+async def test_connect_joins_only_requested_views(mock_dqueue, mock_sio):
+    mock_dqueue.get.return_value = ([("q", {"url": "q"})], [("d", {"url": "d"})])
+    await main.connect("sid1", {}, {"views": ["queue"]})
+    rooms = [c.args[1] for c in mock_sio.enter_room.await_args_list]
+    assert rooms == ["view:queue"]
+    (all_call,) = _emitted(mock_sio, "all")
+    queue, done = json.loads(all_call.args[1][0])
+    assert queue == [["q", {"url": "q"}]] and done == []
+    assert _emitted(mock_sio, "subscriptions_all") == []
+
+
+@pytest.mark.asyncio
+async def test_connect_resumes_with_missed_events_only(mock_dqueue, mock_sio):
+    await main._emit_event("added", '"a"')
+    seq = main.event_journal.seq
+    await main._emit_event("updated", '"b"')
+    await main._emit_event("subscription_added", '"c"')
+    mock_sio.emit.reset_mock()
+
+    await main.connect("sid2", {}, {"epoch": main.event_journal.epoch, "last_seq": seq, "views": ["queue", "done"]})
+
+    assert _emitted(mock_sio, "all") == []
+    replayed = [c.args[0] for c in mock_sio.emit.await_args_list if c.kwargs.get("to") == "sid2" and c.args[0] in main.EVENT_VIEWS]
+    assert replayed == ["updated"]
+
+
+@pytest.mark.asyncio
+async def test_events_are_emitted_to_interested_rooms(mock_dqueue, mock_sio):
+    await main._emit_event("completed", '"x"')
+    call = mock_sio.emit.await_args
+    assert call.args[1] == ('"x"', main.event_journal.seq)
+    assert set(call.kwargs["to"]) == {"view:queue", "view:done", "view:queue:deflate", "view:done:deflate"}
+
+
+@pytest.mark.asyncio
+async def test_large_events_are_deflated_for_negotiating_clients(mock_dqueue, mock_sio):
+    data = json.dumps({"title": "x" * main.SOCKET_DEFLATE_MIN_BYTES})
+    await main._emit_event("added", data)
+    plain, deflated = mock_sio.emit.await_args_list
+    assert plain.args[1][0] == data and plain.kwargs["to"] == ["view:queue"]
+    assert deflated.kwargs["to"] == ["view:queue:deflate"]
+    assert zlib.decompress(deflated.args[1][0]).decode() == data
+
+
+@pytest.mark.asyncio
+async def test_connect_negotiates_deflate_snapshot(mock_dqueue, mock_sio):
+    mock_dqueue.get.return_value = ([("q", {"title": "x" * main.SOCKET_DEFLATE_MIN_BYTES})], [])
+    await main.connect("sid3", {}, {"views": ["queue"], "encodings": ["deflate"]})
+    assert [c.args[1] for c in mock_sio.enter_room.await_args_list] == ["view:queue:deflate"]
+    (all_call,) = _emitted(mock_sio, "all")
+    queue, done = json.loads(zlib.decompress(all_call.args[1][0]))
+    assert queue[0][0] == "q" and done == []
+
+
+@pytest.mark.asyncio
+async def test_notifier_publishes_without_emitting_inline(mock_dqueue, mock_sio):
+    dl = MagicMock(title="t", url="u")
+    await main.Notifier().added(dl)
+    mock_sio.emit.assert_not_awaited()
+    await main.event_bus.drain()
+    (call,) = _emitted(mock_sio, "added")
+    assert call.kwargs["to"] == ["view:queue", "view:queue:deflate"]
+
+
+@pytest.mark.asyncio
+async def test_stats_reports_event_bus_consumers(mock_dqueue):
+    mock_dqueue.extraction.stats.return_value = {"in_flight": 0}
+    mock_dqueue.ydl_pool.stats.return_value = {"idle": 1}
+    mock_dqueue.extraction.rate_limiter.stats.return_value = {"youtube.com": {"waiting": 0}}
+    mock_dqueue.scheduler.stats.return_value = {"active": 0, "pools": {}}
+    mock_dqueue.bandwidth.stats.return_value = {"limit_bytes_per_second": None}
+    mock_dqueue.concurrency.stats.return_value = {"limit": 3}
+    mock_dqueue.preresolve_stats.return_value = {"ahead": 0}
+    mock_dqueue.watchdog_stats.return_value = {"restarted": 0}
+    mock_dqueue.retry_stats.return_value = {"retried": 0}
+    mock_dqueue.health.stats.return_value = {"extractors": {}}
+    mock_dqueue.disk.stats.return_value = {"held": 0}
+    mock_dqueue.queue_limit_stats.return_value = {"items": 0}
+    mock_dqueue.scheduled.stats.return_value = {"held": 0}
+    resp = await main.stats(MagicMock())
+    body = json.loads(resp.text)
+    assert set(body["event_bus"]) == {"socketio", "telegram"}
+    assert "lag_seconds" in body["event_bus"]["socketio"]
+    assert body["extraction"] == {"in_flight": 0}
+    assert body["ydl_pool"] == {"idle": 1}
+    assert body["rate_limits"] == {"youtube.com": {"waiting": 0}}
+
+
+def test_configuration_payload_includes_open_circuit_breakers(mock_dqueue):
+    mock_dqueue.health.snapshot.return_value = {"youtube": {"state": "open", "waiting": 2, "retry_in_seconds": 120}}
+    payload = main._configuration_payload()
+    assert payload["CIRCUIT_BREAKERS"]["youtube"]["state"] == "open"
+    assert "CUSTOM_DIRS" in payload and "YTDL_OPTIONS" not in payload
+
+
+@pytest.mark.asyncio
+async def test_add_job_returns_job_immediately(mock_dqueue):
+    job = MagicMock()
+    job.id = "job1"
+    job.to_dict.return_value = {"id": "job1", "status": "running"}
+    mock_dqueue.start_add_job = MagicMock(return_value=job)
+    resp = await main.add_job(_json_request(_valid_video_add_body()))
+    assert resp.status == 202
+    assert json.loads(resp.text)["job"] == {"id": "job1", "status": "running"}
+    assert mock_dqueue.start_add_job.call_args.args[0] == "https://example.com/watch?v=1"
+    mock_dqueue.add.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_add_returns_429_with_retry_after_when_queue_is_full(mock_dqueue):
+    full = {"status": "error", "msg": "The download queue is full", "retry_after": 60}
+    mock_dqueue.add = AsyncMock(return_value=full)
+    resp = await main.add(_json_request(_valid_video_add_body()))
+    assert resp.status == 429 and resp.headers["Retry-After"] == "60"
+
+    mock_dqueue.queue_full = MagicMock(return_value=full)
+    mock_dqueue.start_add_job = MagicMock()
+    resp = await main.add_job(_json_request(_valid_video_add_body()))
+    assert resp.status == 429
+    mock_dqueue.start_add_job.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_unknown_add_job_returns_404(mock_dqueue):
+    mock_dqueue.get_add_job = MagicMock(return_value=None)
+    mock_dqueue.cancel_add_job = MagicMock(return_value=False)
+    req = MagicMock()
+    req.match_info = {"job_id": "missing"}
+    with pytest.raises(web.HTTPNotFound):
+        await main.get_add_job(req)
+    with pytest.raises(web.HTTPNotFound):
+        await main.cancel_add_job(req)
+
+
+@pytest.mark.asyncio
+async def test_add_passes_playlist_range(mock_dqueue):
+    body = _valid_video_add_body(playlist_start="5", playlist_step=2, date_after="20240101")
+    await main.add(_json_request(body))
+    assert mock_dqueue.add.await_args.kwargs["playlist_range"] == {"start": 5, "step": 2, "dateafter": "20240101"}
+
+
+@pytest.mark.asyncio
+async def test_add_rejects_invalid_playlist_range(mock_dqueue):
+    for bad in ({"playlist_end": "0"}, {"playlist_items": "1;2"}, {"date_before": "last week"}):
+        with pytest.raises(web.HTTPBadRequest):
+            await main.add(_json_request(_valid_video_add_body(**bad)))
+    mock_dqueue.add.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_invalidate_extraction_cache_by_url(mock_dqueue):
+    mock_dqueue.extraction.cache.invalidate.return_value = 2
+    resp = await main.invalidate_extraction_cache(_json_request({"url": "https://example.com/pl"}))
+    assert json.loads(resp.text) == {"status": "ok", "invalidated": 2}
+    mock_dqueue.extraction.cache.invalidate.assert_called_once_with("https://example.com/pl")
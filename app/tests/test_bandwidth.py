@@ -0,0 +1,57 @@
+"""Tests for ``bandwidth`` budget splitting and the worker-side throttle."""
+
+from __future__ import annotations
+
+import datetime
+import multiprocessing
+
+import pytest
+from yt_dlp.downloader import common as fd_common
+
+from bandwidth import BandwidthBudget, fair_shares, follow_shared_rate_limit, parse_rate
+
+
+def test_schedule_windows_override_the_limit_and_may_wrap_midnight():
+    budget = BandwidthBudget("4M", [{"from": "23:00", "to": "07:00", "limit": "0"}])
+
+    assert budget.current_limit(datetime.datetime(2026, 1, 1, 12, 0)) == 4 * 1024 * 1024
+    assert budget.current_limit(datetime.datetime(2026, 1, 1, 2, 30)) is None
+    assert parse_rate("") is None
+    with pytest.raises(ValueError):
+        BandwidthBudget(None, [{"from": "25:00", "to": "07:00", "limit": "1M"}])
+
+
+def test_budget_is_split_and_slow_downloads_leave_room_for_others():
+    speeds = {"a": None, "b": None}
+    budget = BandwidthBudget(900)
+    a = budget.add("a", lambda: speeds["a"])
+    assert a.value == 900
+    b = budget.add("b", lambda: speeds["b"])
+    assert a.value == b.value == 450
+
+    speeds.update(a=100, b=450)
+    budget.rebalance()
+    assert a.value == 125 and b.value == 775
+    budget.remove("b")
+    budget.rebalance()
+    assert a.value == 900
+    assert fair_shares(10, [1, float("inf"), float("inf")]) == [1, 4.5, 4.5]
+    assert fair_shares(10, [1, 3]) == [4, 6]
+
+
+def test_worker_throttle_restarts_its_average_when_the_limit_changes(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(fd_common.FileDownloader, "slow_down", fd_common.FileDownloader.slow_down)
+    monkeypatch.setattr(fd_common.time, "sleep", sleeps.append)
+    rate = multiprocessing.Value("d", 0.0)
+    follow_shared_rate_limit(rate)
+    fd = fd_common.FileDownloader.__new__(fd_common.FileDownloader)
+    fd.params = {}
+
+    fd.slow_down(0.0, 10.0, 10_000)  # unlimited: 1000 B/s for 10 s
+    rate.value = 500
+    fd.slow_down(0.0, 10.0, 10_000)
+    fd.slow_down(0.0, 11.0, 11_000)  # 1000 B in the second since the change
+
+    assert fd.params["ratelimit"] == 500
+    assert sleeps == [pytest.approx(1.0)]
@@ -0,0 +1,36 @@
+"""Tests for ``concurrency.AdaptiveConcurrency`` decisions."""
+
+from __future__ import annotations
+
+from concurrency import AdaptiveConcurrency, Sample
+from scheduler import DownloadScheduler
+
+
+def _controller(samples, limit=2):
+    scheduler = DownloadScheduler(limit)
+    feed = iter(samples)
+    return scheduler, AdaptiveConcurrency(scheduler, lambda: next(feed), minimum=1, maximum=4)
+
+
+def test_limit_grows_while_it_pays_off_and_backs_off_when_it_does_not():
+    scheduler, controller = _controller([
+        Sample(throughput=100, active=2, waiting=5),
+        Sample(throughput=150, active=3, waiting=5),
+        Sample(throughput=152, active=4, waiting=5),
+        Sample(throughput=150, active=3, waiting=0),
+    ])
+
+    assert [controller.step() for _ in range(4)] == [3, 4, 3, 3]
+    assert controller.stats()["increases"] == 2 and controller.stats()["decreases"] == 1
+    assert controller.decisions[-1]["reason"] == "no downloads waiting for a slot"
+
+
+def test_rate_limited_or_failing_downloads_halve_the_limit():
+    scheduler, controller = _controller([Sample(500, 4, 5), Sample(500, 2, 5), Sample(500, 1, 5, disk_queue=80)], limit=4)
+
+    controller.record_result(False, "ERROR: HTTP Error 429: Too Many Requests")
+    assert controller.step() == 2
+    controller.record_result(True)
+    assert controller.step() == 3
+    assert controller.step() == 1
+    assert scheduler.limit == 1
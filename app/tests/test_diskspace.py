@@ -0,0 +1,72 @@
+"""Tests for ``diskspace`` size estimates and admission."""
+
+from __future__ import annotations
+
+import types
+
+import pytest
+
+from diskspace import HOLD_PREFIX, DiskAdmission, estimate_size, parse_size
+
+MB = 1024 * 1024
+
+
+def test_estimate_prefers_extractor_sizes_then_duration_then_type():
+    assert estimate_size({"filesize_approx": 5 * MB}, "video") == (5 * MB, True)
+    assert estimate_size({"requested_formats": [{"filesize": MB}, {"filesize_approx": 2 * MB}]}, "video") == (3 * MB, True)
+    assert estimate_size({"duration": 100}, "audio") == (100 * 24 * 1024, False)
+    assert estimate_size(None, "captions") == (MB, False)
+    assert estimate_size({"requested_formats": [{"filesize": MB}, {}]}, "video")[1] is False
+
+
+def test_sizes_parse_with_units_and_empty_disables():
+    assert parse_size("1G") == 1024 * MB and parse_size(500) == 500
+    assert parse_size("") is None and parse_size("0") is None
+    with pytest.raises(ValueError, match="not a size"):
+        parse_size("lots")
+
+
+def test_claims_count_against_free_space_until_released(tmp_path, monkeypatch):
+    monkeypatch.setattr("diskspace.shutil.disk_usage", lambda path: types.SimpleNamespace(free=1000 * MB))
+    disk = DiskAdmission(reserve=100 * MB)
+    paths = [str(tmp_path), str(tmp_path)]
+    written = {"a": 0}
+
+    # Alone on the filesystem, only the reserve is checked.
+    assert disk.claim("a", paths, 2000 * MB, lambda: written["a"]) is None
+    reason = disk.claim("b", paths, 10 * MB, lambda: 0)
+    assert reason.startswith(HOLD_PREFIX) and disk.held == {"b"}
+
+    # What "a" has written is already counted in the free space.
+    written["a"] = 1500 * MB
+    assert disk.claim("b", paths, 10 * MB, lambda: 0) is None
+    assert disk.held == set() and disk.stats()["claimed_bytes"] == 510 * MB
+    disk.release("a")
+    disk.release("b")
+    assert disk.stats() == {"reserve_bytes": 100 * MB, "admitted": 2, "held": 0, "claimed_bytes": 0}
+
+
+def test_disabled_without_a_reserve(tmp_path):
+    assert DiskAdmission(None).claim("a", [str(tmp_path)], 10**15, lambda: 0) is None
+
+
+def test_one_snapshot_per_pass_and_later_claims_held_without_a_look(tmp_path, monkeypatch):
+    calls = []
+
+    def disk_usage(path):
+        calls.append(path)
+        return types.SimpleNamespace(free=1000 * MB)
+
+    monkeypatch.setattr("diskspace.shutil.disk_usage", disk_usage)
+    disk = DiskAdmission(reserve=100 * MB)
+    paths = [str(tmp_path)]
+    snapshot = {}
+    assert disk.claim("a", paths, 800 * MB, lambda: 0, snapshot) is None
+    first = disk.claim("b", paths, 500 * MB, lambda: 0, snapshot)
+    # Would fit on its own, but stays behind "b" on the same filesystem.
+    assert disk.claim("c", paths, MB, lambda: 0, snapshot) is not None
+    assert len(calls) == 1 and disk.held == {"b", "c"}
+
+    # The message does not change with the free space, so it is not re-sent.
+    monkeypatch.setattr("diskspace.shutil.disk_usage", lambda path: types.SimpleNamespace(free=990 * MB))
+    assert disk.claim("b", paths, 500 * MB, lambda: 0) == first
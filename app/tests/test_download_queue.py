@@ -3,14 +3,20 @@
 from __future__ import annotations
 
 import asyncio
+import datetime
+import multiprocessing
 import os
+import subprocess
 import tempfile
+import time
 import types
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
+import yt_dlp
 
 import ytdl as ytdl_module
+from extraction import RateLimiter
 from ytdl import DownloadQueue
 
 
@@ -44,6 +50,35 @@ def dq_env():
         cfg.OUTPUT_TEMPLATE_CHAPTER = "%(title)s.%(ext)s"
         cfg.OUTPUT_TEMPLATE_PLAYLIST = ""
         cfg.OUTPUT_TEMPLATE_CHANNEL = ""
+        cfg.STREAM_PLAYLIST_EXPANSION = False
+        cfg.PLAYLIST_STREAM_CHUNK_SIZE = "50"
+        cfg.EXTRACTION_WORKERS = "2"
+        cfg.EXTRACTION_TIMEOUT_SECONDS = "30"
+        cfg.EXTRACTION_CACHE_SIZE = "16"
+        cfg.EXTRACTION_CACHE_TTL_SECONDS = "600"
+        cfg.EXTRACTION_MODE = "thread"
+        cfg.EXTRACTION_RATE_LIMITS = "{}"
+        cfg.DOWNLOAD_POOLS = "{}"
+        cfg.DOWNLOAD_SOURCE_WEIGHTS = "{}"
+        cfg.ADAPTIVE_CONCURRENCY = False
+        cfg.DOWNLOAD_STALL_TIMEOUT_SECONDS = "0"
+        cfg.DOWNLOAD_HARD_TIMEOUT_SECONDS = "0"
+        cfg.DOWNLOAD_MAX_RESTARTS = "3"
+        cfg.DOWNLOAD_RESTART_BACKOFF_SECONDS = "30"
+        cfg.DOWNLOAD_RETRY_ATTEMPTS = "3"
+        cfg.DOWNLOAD_RETRY_BACKOFF_SECONDS = "30"
+        cfg.DOWNLOAD_RETRY_MAX_BACKOFF_SECONDS = "1800"
+        cfg.HOST_COOLDOWN_SECONDS = "300"
+        cfg.CIRCUIT_BREAKER_FAILURE_RATIO = "0.5"
+        cfg.CIRCUIT_BREAKER_WINDOW = "20"
+        cfg.CIRCUIT_BREAKER_OPEN_SECONDS = "300"
+        cfg.DISK_SPACE_RESERVE = ""
+        cfg.MAX_QUEUED_ITEMS = "10000"
+        cfg.QUEUE_SOURCE_LIMITS = "{}"
+        cfg.BANDWIDTH_LIMIT = ""
+        cfg.BANDWIDTH_SCHEDULE = "[]"
+        cfg.PRERESOLVE_AHEAD = "0"
+        cfg.PRERESOLVE_TTL_SECONDS = "1800"
         yield cfg
 
 
@@ -527,3 +562,783 @@ async def test_failed_download_does_not_trigger_jellyfin_refresh(dq_env):
         await asyncio.sleep(0.05)
 
     refresh.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_playlist_entries_are_ingested_as_one_batch(dq_env):
+    notifier = AsyncMock()
+
+    def fake_extract(self, url, ytdl_options_presets=None, ytdl_options_overrides=None):
+        return {
+            "_type": "playlist",
+            "id": "pl1",
+            "title": "Playlist",
+            "entries": [
+                {"id": f"v{i}", "title": f"Video {i}", "url": f"https://example.com/watch?v={i}"}
+                for i in (1, 2, 3, 2)
+            ],
+        }
+
+    dq = DownloadQueue(dq_env, notifier)
+    start = AsyncMock()
+    with patch.object(DownloadQueue, "_DownloadQueue__extract_info", fake_extract), \
+         patch.object(DownloadQueue, "_DownloadQueue__start_download", start), \
+         patch.object(dq.queue.store, "save", wraps=dq.queue.store.save) as save:
+        result = await dq.add("https://example.com/playlist", "video", "auto", "any", "best", "", "", 0)
+        await asyncio.sleep(0)
+
+    assert result["status"] == "ok"
+    assert save.call_count == 1
+    notifier.added.assert_not_awaited()
+    (batch,), _ = notifier.added_batch.await_args
+    assert [dl.url for dl in batch] == [f"https://example.com/watch?v={i}" for i in (1, 2, 3)]
+    assert batch[0].entry["playlist_index"] == "1" and batch[0].entry["playlist_count"] == 4
+    assert start.await_count == 3
+
+
+@pytest.mark.asyncio
+async def test_add_entries_reports_folder_errors_without_queueing(dq_env):
+    dq_env.CUSTOM_DIRS = False
+    notifier = AsyncMock()
+    dq = DownloadQueue(dq_env, notifier)
+    entries = [{"_type": "video", "id": "v1", "url": "https://example.com/v1"}]
+
+    result = await dq.add_entries(entries, "video", "auto", "any", "best", "sub", "", 0, auto_start=False)
+
+    assert result["status"] == "error"
+    assert not dq.pending.exists("https://example.com/v1")
+    notifier.added.assert_not_awaited()
+
+
+def _streamed_playlist(count, started, cancel_after=None, dq=None):
+    def items():
+        for i in range(1, count + 1):
+            if cancel_after is not None and i == cancel_after + 1:
+                dq.cancel_add()
+            yield i, {"id": f"v{i}", "title": f"Video {i}", "url": f"https://example.com/watch?v={i}"}
+        started.append("exhausted")
+
+    entry = {"_type": "playlist", "id": "pl1", "title": "Playlist"}
+    return lambda self, url, presets=None, overrides=None: (entry, items())
+
+
+@pytest.mark.asyncio
+async def test_streaming_expansion_starts_downloads_before_listing_finishes(dq_env):
+    dq_env.STREAM_PLAYLIST_EXPANSION = True
+    dq_env.PLAYLIST_STREAM_CHUNK_SIZE = "2"
+    notifier = AsyncMock()
+    dq = DownloadQueue(dq_env, notifier)
+    events = []
+
+    async def fake_start(self, download):
+        events.append(download.info.url)
+
+    with patch.object(DownloadQueue, "_DownloadQueue__extract_info_streaming", _streamed_playlist(5, events)), \
+         patch.object(DownloadQueue, "_DownloadQueue__start_download", fake_start):
+        result = await dq.add("https://example.com/playlist", "video", "auto", "any", "best", "", "", 0, auto_start=False)
+        assert result["status"] == "ok"
+        await asyncio.gather(*dq._stream_tasks)
+
+    keys = [k for k, _ in dq.pending.items()]
+    assert keys == [f"https://example.com/watch?v={i}" for i in range(1, 6)]
+    assert notifier.added_batch.await_count == 2 and notifier.added.await_count == 1
+    first = dq.pending.get(keys[0]).info.entry
+    assert first["playlist_index"] == "1" and first["playlist_count"] == 5 and first["n_entries"] == 5
+
+
+@pytest.mark.asyncio
+async def test_streaming_expansion_honors_cancel_add(dq_env):
+    dq_env.STREAM_PLAYLIST_EXPANSION = True
+    dq_env.PLAYLIST_STREAM_CHUNK_SIZE = "2"
+    dq = DownloadQueue(dq_env, AsyncMock())
+    seen = []
+
+    with patch.object(DownloadQueue, "_DownloadQueue__extract_info_streaming", _streamed_playlist(10, seen, cancel_after=3, dq=dq)):
+        await dq.add("https://example.com/playlist", "video", "auto", "any", "best", "", "", 0, auto_start=False)
+        await asyncio.gather(*dq._stream_tasks)
+
+    assert len(dq.pending.dict) == 2
+    assert "exhausted" not in seen
+    assert dq.pending.get("https://example.com/watch?v=1").info.entry["playlist_count"] == 2
+
+
+def test_streamed_playlists_honour_the_date_range():
+    playlist = {"_type": "playlist", "id": "pl1", "title": "List", "entries": [
+        {"id": "old", "title": "Old", "upload_date": "20231231"},
+        {"id": "new", "title": "New", "upload_date": "20240102"},
+        {"id": "undated", "title": "Undated"},
+    ]}
+    params = {"quiet": True, **ytdl_module._playlist_extract_params(0, {"dateafter": "20240101"})}
+    with yt_dlp.YoutubeDL(params) as ydl:
+        items = yt_dlp.utils.PlaylistEntries(ydl, playlist).get_requested_items()
+        # Undated flat entries are kept, as in yt-dlp's own playlist processing.
+        assert [e["id"] for _, e in ytdl_module._matching_items(ydl, items)] == ["new", "undated"]
+
+
+@pytest.mark.asyncio
+async def test_add_job_reports_progress_and_finishes(dq_env):
+    notifier = AsyncMock()
+
+    def fake_extract(self, url, ytdl_options_presets=None, ytdl_options_overrides=None):
+        return {
+            "_type": "playlist",
+            "id": "pl1",
+            "entries": [{"id": f"v{i}", "url": f"https://example.com/watch?v={i}"} for i in (1, 2)],
+        }
+
+    dq = DownloadQueue(dq_env, notifier)
+    with patch.object(DownloadQueue, "_DownloadQueue__extract_info", fake_extract):
+        job = dq.start_add_job("https://example.com/playlist", "video", "auto", "any", "best", "", "", 0, False)
+        assert job.status == "running" and dq.get_add_job(job.id) is job
+        for _ in range(10):
+            await asyncio.sleep(0)
+
+    assert job.to_dict()["status"] == "completed"
+    assert (job.discovered, job.queued, job.failed) == (2, 2, 0)
+    assert notifier.add_job_progress.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_add_job_is_checked_against_its_own_source_limit(dq_env):
+    dq_env.QUEUE_SOURCE_LIMITS = '{"ui": 1}'
+
+    def fake_extract(self, url, ytdl_options_presets=None, ytdl_options_overrides=None):
+        return {"_type": "video", "id": url[-1], "title": "Video", "url": url}
+
+    dq = DownloadQueue(dq_env, AsyncMock())
+    with patch.object(DownloadQueue, "_DownloadQueue__extract_info", fake_extract):
+        await dq.add("https://example.com/watch?v=1", "video", "auto", "any", "best", "", "", 0, False, source="ui")
+        assert dq.queue_room("ui") == 0
+        job = dq.start_add_job("https://example.com/watch?v=2", "video", "auto", "any", "best", "", "", 0, False,
+                               source="api", priority=3)
+        await asyncio.wait_for(_wait_until(lambda: job.status != "running"), 2)
+
+    assert job.status == "completed"
+    info = dq.pending.get("https://example.com/watch?v=2").info
+    assert info.source == "api" and info.priority == 3
+    assert dq.queue_limit_stats()["rejected"] == 0
+
+
+@pytest.mark.asyncio
+async def test_cancel_add_job_stops_only_that_job(dq_env):
+    dq_env.STREAM_PLAYLIST_EXPANSION = True
+    dq_env.PLAYLIST_STREAM_CHUNK_SIZE = "1"
+    dq = DownloadQueue(dq_env, AsyncMock())
+
+    def items(prefix):
+        for i in range(1, 4):
+            yield i, {"id": f"{prefix}{i}", "url": f"https://example.com/{prefix}{i}"}
+
+    def fake_streaming(self, url, presets=None, overrides=None):
+        return {"_type": "playlist", "id": url}, items(url[-1])
+
+    with patch.object(DownloadQueue, "_DownloadQueue__extract_info_streaming", fake_streaming):
+        job_a = dq.start_add_job("https://example.com/a", "video", "auto", "any", "best", "", "", 0, False)
+        job_b = dq.start_add_job("https://example.com/b", "video", "auto", "any", "best", "", "", 0, False)
+        assert dq.cancel_add_job(job_a.id)
+        while job_a.status == "running" or job_b.status == "running":
+            await asyncio.sleep(0.01)
+
+    assert job_a.status == "canceled" and job_a.queued == 0
+    assert job_b.status == "completed" and job_b.queued == 3
+    assert not dq.cancel_add_job("missing")
+
+
+@pytest.mark.asyncio
+async def test_add_pushes_item_limit_into_extraction(dq_env):
+    captured = {}
+
+    def fake_extract(self, url, ytdl_options_presets=None, ytdl_options_overrides=None, playlist_params=None):
+        captured.update(playlist_params or {})
+        return {
+            "_type": "playlist",
+            "id": "pl1",
+            "requested_entries": [11, 12],
+            "entries": [{"id": f"v{i}", "url": f"https://example.com/watch?v={i}"} for i in (11, 12)],
+        }
+
+    dq = DownloadQueue(dq_env, AsyncMock())
+    with patch.object(DownloadQueue, "_DownloadQueue__extract_info", fake_extract):
+        await dq.add("https://example.com/playlist", "video", "auto", "any", "best", "", "", 2,
+                     auto_start=False, playlist_range={"start": 11})
+
+    assert captured == {"playliststart": 11, "playlistend": 12}
+    entry = dq.pending.get("https://example.com/watch?v=12").info.entry
+    assert entry["playlist_index"] == "12" and entry["playlist_autonumber"] == 2
+
+
+@pytest.mark.asyncio
+async def test_limited_playlists_keep_the_full_count_and_padding(dq_env):
+    def fake_extract(self, url, ytdl_options_presets=None, ytdl_options_overrides=None, playlist_params=None):
+        # yt-dlp stopped after the limit but still knows the playlist size.
+        return {
+            "_type": "playlist",
+            "id": "pl1",
+            "playlist_count": 120,
+            "entries": [{"id": f"v{i}", "url": f"https://example.com/watch?v={i}"} for i in (1, 2)],
+        }
+
+    dq = DownloadQueue(dq_env, AsyncMock())
+    with patch.object(DownloadQueue, "_DownloadQueue__extract_info", fake_extract):
+        await dq.add("https://example.com/playlist", "video", "auto", "any", "best", "", "", 2, auto_start=False)
+
+    entry = dq.pending.get("https://example.com/watch?v=2").info.entry
+    assert entry["playlist_index"] == "002" and entry["playlist_autonumber"] == 2
+    assert entry["playlist_count"] == entry["n_entries"] == entry["__last_playlist_index"] == 120
+
+
+@pytest.mark.asyncio
+async def test_concurrent_adds_of_same_url_share_one_extraction(dq_env):
+    calls = []
+
+    def fake_extract(self, url, ytdl_options_presets=None, ytdl_options_overrides=None):
+        calls.append(url)
+        time.sleep(0.05)
+        return {"_type": "video", "id": "v1", "title": "Video", "url": url}
+
+    dq = DownloadQueue(dq_env, AsyncMock())
+    with patch.object(DownloadQueue, "_DownloadQueue__extract_info", fake_extract):
+        results = await asyncio.gather(*(
+            dq.add("https://example.com/watch?v=1", "video", "auto", "any", "best", "", "", 0, auto_start=False)
+            for _ in range(3)
+        ))
+
+    assert [r["status"] for r in results] == ["ok"] * 3
+    assert calls == ["https://example.com/watch?v=1"]
+    assert dq.extraction.stats()["deduplicated"] == 2
+    assert dq.pending.exists("https://example.com/watch?v=1")
+
+
+@pytest.mark.asyncio
+async def test_readding_a_playlist_reuses_the_cached_extraction(dq_env):
+    calls = []
+
+    def fake_extract(self, url, ytdl_options_presets=None, ytdl_options_overrides=None):
+        calls.append(url)
+        return {
+            "_type": "playlist",
+            "id": "pl1",
+            "entries": [{"id": f"v{i}", "url": f"https://example.com/watch?v={i}"} for i in (1, 2)],
+        }
+
+    dq = DownloadQueue(dq_env, AsyncMock())
+    with patch.object(DownloadQueue, "_DownloadQueue__extract_info", fake_extract):
+        await dq.add("https://example.com/playlist", "video", "auto", "any", "best", "", "", 0, auto_start=False)
+        await dq.add("https://example.com/playlist#again", "video", "auto", "any", "best", "", "", 0, auto_start=False)
+        dq.extraction.cache.invalidate("https://example.com/playlist")
+        await dq.add("https://example.com/playlist", "video", "auto", "any", "best", "", "", 0, auto_start=False)
+
+    assert len(calls) == 2
+    assert dq.extraction.stats()["cache"]["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_cancel_add_abandons_in_flight_extraction(dq_env):
+    def fake_extract(self, url, ytdl_options_presets=None, ytdl_options_overrides=None):
+        time.sleep(0.3)
+        return {"_type": "playlist", "id": "pl", "entries": [{"id": "v1", "url": "https://example.com/watch?v=1"}]}
+
+    dq = DownloadQueue(dq_env, AsyncMock())
+    with patch.object(DownloadQueue, "_DownloadQueue__extract_info", fake_extract):
+        add = asyncio.create_task(
+            dq.add("https://example.com/playlist", "video", "auto", "any", "best", "", "", 0, auto_start=False)
+        )
+        await asyncio.sleep(0.05)
+        dq.cancel_add()
+        result = await add
+
+    assert result == {"status": "ok", "msg": "Canceled before any items were added"}
+    assert not dq.pending.exists("https://example.com/watch?v=1")
+    assert dq._extractions == {}
+
+
+@pytest.mark.asyncio
+async def test_waiting_downloads_are_preresolved_and_stale_results_dropped(dq_env):
+    dq_env.MAX_CONCURRENT_DOWNLOADS = "1"
+    dq_env.PRERESOLVE_AHEAD = "1"
+    dq_env.PRERESOLVE_TTL_SECONDS = "60"
+    gate = asyncio.Event()
+    started = {}
+    resolved = []
+
+    def fake_extract(self, url, ytdl_options_presets=None, ytdl_options_overrides=None):
+        return {"_type": "video", "id": url[-1], "title": "Video", "url": url}
+
+    def fake_resolve(url, params, ydl_pool=None):
+        resolved.append(url)
+        return {"id": url[-1], "formats": [{"url": "https://cdn.example/v"}]}
+
+    async def fake_start(self, notifier):
+        started[self.info.url] = self.resolved_info
+        if self.info.url.endswith("1"):
+            await gate.wait()
+
+    dq = DownloadQueue(dq_env, AsyncMock())
+    with patch.object(DownloadQueue, "_DownloadQueue__extract_info", fake_extract), \
+         patch.object(ytdl_module, "_resolve_info", fake_resolve), \
+         patch.object(ytdl_module.Download, "start", fake_start):
+        for i in (1, 2, 3):
+            await dq.add(f"https://example.com/watch?v={i}", "video", "auto", "any", "best", "", "", 0)
+        while dq.preresolve_stats()["resolved"] < 1 or dq.preresolve_stats()["in_flight"]:
+            await asyncio.sleep(0.01)
+        # Only the next download in line is resolved ahead of time.
+        assert resolved == ["https://example.com/watch?v=2"]
+        dq.queue.get("https://example.com/watch?v=2").resolved_at -= 120
+        gate.set()
+        while len(started) < 3:
+            await asyncio.sleep(0.01)
+
+    assert started["https://example.com/watch?v=1"] is None
+    assert started["https://example.com/watch?v=2"] is None
+    assert started["https://example.com/watch?v=3"] == {"id": "3", "formats": [{"url": "https://cdn.example/v"}]}
+    stats = dq.preresolve_stats()
+    assert stats["expired"] == 1 and stats["used"] == 1 and stats["waiting"] == 0
+
+
+@pytest.mark.asyncio
+async def test_preresolve_still_queued_for_a_token_is_dropped_when_the_slot_comes(dq_env):
+    dq_env.MAX_CONCURRENT_DOWNLOADS = "1"
+    dq_env.PRERESOLVE_AHEAD = "1"
+    gate = asyncio.Event()
+    started = {}
+
+    async def fake_start(self, notifier):
+        started[self.info.url] = self.resolved_info
+        if self.info.url.endswith("1"):
+            await gate.wait()
+
+    dq = DownloadQueue(dq_env, AsyncMock())
+    limiter = RateLimiter({"example.com": {"per_minute": 1, "burst": 1}})
+    dq.extraction.rate_limiter = limiter
+    await limiter.acquire("https://example.com/")
+    entries = [{"_type": "video", "id": f"v{i}", "title": f"V{i}", "url": f"https://example.com/watch?v={i}",
+                "webpage_url": f"https://example.com/watch?v={i}"} for i in (1, 2)]
+    with patch.object(ytdl_module.Download, "start", fake_start):
+        for entry in entries:
+            await dq.add_entries([entry], "video", "auto", "any", "best", "", "", 0)
+        await asyncio.wait_for(_wait_until(lambda: limiter.stats()["example.com"]["waiting"]), 2)
+        gate.set()
+        # The next token is a minute away; the download must not wait for it.
+        await asyncio.wait_for(_wait_until(lambda: len(started) == 2), 2)
+        await asyncio.sleep(0.01)
+
+    assert started["https://example.com/watch?v=2"] is None
+    assert dq.preresolve_stats()["abandoned"] == 1 and dq.preresolve_stats()["in_flight"] == 0
+    assert limiter.stats()["example.com"]["waiting"] == 0
+
+
+async def _wait_until(predicate):
+    while not predicate():
+        await asyncio.sleep(0.01)
+
+
+def test_worker_downloads_from_the_resolved_info_file(tmp_path):
+    download = types.SimpleNamespace(resolved_info={"id": "v1", "webpage_url": "https://example.com/v1"}, temp_dir=str(tmp_path))
+    seen = {}
+
+    class FakeYDL:
+        def download_with_info_file(self, path):
+            with open(path, encoding="utf-8") as f:
+                seen["info"] = f.read()
+            return 0
+
+    assert ytdl_module.Download._download_resolved(download, FakeYDL()) == 0
+    assert '"webpage_url": "https://example.com/v1"' in seen["info"]
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.asyncio
+async def test_add_entries_tags_source_and_reorder_updates_priority(dq_env):
+    dq = DownloadQueue(dq_env, AsyncMock())
+    entries = [{"_type": "video", "id": f"v{i}", "title": f"V{i}", "url": f"https://example.com/watch?v={i}",
+                "webpage_url": f"https://example.com/watch?v={i}"} for i in (1, 2)]
+    await dq.add_entries(entries, "video", "auto", "any", "best", "", "", 0, auto_start=False, source="subscription")
+
+    info = dq.pending.get("https://example.com/watch?v=2").info
+    assert info.source == "subscription" and info.priority == 0
+    result = await dq.reorder(["https://example.com/watch?v=2", "https://example.com/missing"], priority=5)
+
+    assert result == {"status": "ok", "updated": 1}
+    assert info.priority == 5
+    dq.notifier.updated.assert_awaited_once_with(info)
+
+    # Pending downloads have no place in line to move to.
+    result = await dq.reorder(["https://example.com/watch?v=2"], position="front")
+    assert result["status"] == "error" and result["unmoved"] == ["https://example.com/watch?v=2"]
+
+
+@pytest.mark.asyncio
+async def test_reorder_persists_all_changed_downloads_in_one_write(dq_env):
+    dq = DownloadQueue(dq_env, AsyncMock())
+    entries = [{"_type": "video", "id": f"v{i}", "title": f"V{i}", "url": f"https://example.com/watch?v={i}",
+                "webpage_url": f"https://example.com/watch?v={i}"} for i in (1, 2, 3)]
+    await dq.add_entries(entries, "video", "auto", "any", "best", "", "", 0, auto_start=False)
+
+    urls = [f"https://example.com/watch?v={i}" for i in (1, 2, 3)]
+    with patch.object(dq.pending, "_save_dict", wraps=dq.pending._save_dict) as save:
+        result = await dq.reorder(urls, priority=7)
+
+    assert result == {"status": "ok", "updated": 3}
+    assert save.call_count == 1
+    assert all(dq.pending.get(url).info.priority == 7 for url in urls)
+    assert dq.notifier.updated.await_count == 3
+
+
+@pytest.mark.asyncio
+async def test_stalled_download_is_killed_and_requeued_until_it_gives_up(dq_env):
+    dq_env.DOWNLOAD_STALL_TIMEOUT_SECONDS = "60"
+    dq_env.DOWNLOAD_MAX_RESTARTS = "1"
+    dq_env.DOWNLOAD_RESTART_BACKOFF_SECONDS = "0"
+    attempts = []
+
+    def fake_extract(self, url, ytdl_options_presets=None, ytdl_options_overrides=None):
+        return {"_type": "video", "id": "v1", "title": "Video", "url": url}
+
+    async def fake_start(self, notifier):
+        attempts.append(self)
+        self.tmpfilename = os.path.join(dq_env.DOWNLOAD_DIR, "Video.mp4.part")
+        open(self.tmpfilename, "w").close()
+        self.info.status = "downloading"
+        self.started_at = time.monotonic() - 120
+        self.last_progress_at = time.monotonic() - 90
+        while self.stalled is None:
+            await asyncio.sleep(0.01)
+
+    dq = DownloadQueue(dq_env, AsyncMock())
+    dq.concurrency = MagicMock()
+    url = "https://example.com/watch?v=1"
+    with patch.object(DownloadQueue, "_DownloadQueue__extract_info", fake_extract), \
+         patch.object(ytdl_module.Download, "start", fake_start):
+        await dq.add(url, "video", "auto", "any", "best", "", "", 0)
+        for expected in (1, 2):
+            while len(attempts) < expected:
+                await asyncio.sleep(0.01)
+            dq._DownloadQueue__check_stalled()
+            await asyncio.sleep(0.05)
+            if expected == 1:
+                # The partial file survives for the next attempt to resume.
+                assert os.path.isfile(attempts[0].tmpfilename)
+                assert dq.scheduler.stats()["active"] <= 1
+
+    assert attempts[0] is not attempts[1]
+    info = dq.done.get(url).info
+    assert info.status == "error" and info.restart_count == 1
+    assert "gave up after 1 restart" in info.msg
+    assert not os.path.exists(attempts[1].tmpfilename)
+    stats = dq.watchdog_stats()
+    assert stats["stalled"] == 2 and stats["restarted"] == 1 and stats["gave_up"] == 1
+    # Both stalls count as failures, the restarted one included.
+    assert [c.args[0] for c in dq.concurrency.record_result.call_args_list] == [False, False]
+    assert sum(e["failures"] for e in dq.health.stats()["extractors"].values()) == 2
+
+
+@pytest.mark.asyncio
+async def test_downloads_show_why_they_wait_for_a_host_to_cool_down(dq_env):
+    started = []
+
+    async def fake_start(self, notifier):
+        started.append(self.info.url)
+        self.info.status = "finished"
+
+    dq_env.HOST_COOLDOWN_SECONDS = "0.2"
+    dq = DownloadQueue(dq_env, AsyncMock())
+    dq.retry_policy.decide("HTTP Error 429: Too Many Requests", 1, "example.com")
+    url = "https://example.com/watch?v=1"
+    entry = {"_type": "video", "id": "v1", "title": "V1", "url": url, "webpage_url": url}
+    with patch.object(ytdl_module.Download, "start", fake_start):
+        await dq.add_entries([entry], "video", "auto", "any", "best", "", "", 0)
+        await asyncio.sleep(0.05)
+        info = dq.queue.get(url).info
+        assert info.status == "waiting" and info.msg.startswith("example.com is cooling down")
+        await asyncio.wait_for(_wait_until(lambda: dq.done.exists(url)), 2)
+
+    assert started == [url] and dq.done.get(url).info.msg is None
+
+
+@pytest.mark.asyncio
+async def test_hard_timeout_spares_post_processing_and_restarts_show_as_retrying(dq_env):
+    dq_env.DOWNLOAD_HARD_TIMEOUT_SECONDS = "60"
+    gate = asyncio.Event()
+    statuses = {"https://example.com/watch?v=1": "finished", "https://example.com/watch?v=2": "downloading"}
+    attempts = []
+
+    def fake_extract(self, url, ytdl_options_presets=None, ytdl_options_overrides=None):
+        return {"_type": "video", "id": url[-1], "title": "Video", "url": url}
+
+    async def fake_start(self, notifier):
+        attempts.append(self)
+        self.info.status = statuses[self.info.url]
+        self.started_at = self.last_progress_at = time.monotonic() - 120
+        await gate.wait()
+
+    dq = DownloadQueue(dq_env, AsyncMock())
+    with patch.object(DownloadQueue, "_DownloadQueue__extract_info", fake_extract), \
+         patch.object(ytdl_module.Download, "start", fake_start):
+        for url in statuses:
+            await dq.add(url, "video", "auto", "any", "best", "", "", 0)
+        await asyncio.wait_for(_wait_until(lambda: len(attempts) == 2), 2)
+        dq._DownloadQueue__check_stalled()
+        gate.set()
+        await asyncio.wait_for(_wait_until(lambda: dq.done.exists("https://example.com/watch?v=1")), 2)
+        await asyncio.sleep(0.01)
+
+    # Post-processing runs past the limit; the download itself is restarted after its backoff.
+    assert [a.stalled is None for a in attempts] == [True, False]
+    assert dq.queue.get("https://example.com/watch?v=2").info.status == "retrying"
+    await dq.cancel(["https://example.com/watch?v=2"])
+
+
+@pytest.mark.asyncio
+async def test_transient_errors_are_retried_and_permanent_ones_are_not(dq_env):
+    dq_env.DOWNLOAD_RETRY_BACKOFF_SECONDS = "0"
+    outcomes = {
+        "https://example.com/watch?v=1": ["HTTP Error 503: Service Unavailable", None],
+        "https://example.com/watch?v=2": ["ERROR: [youtube] 2: Private video"],
+    }
+    attempts = []
+
+    def fake_extract(self, url, ytdl_options_presets=None, ytdl_options_overrides=None):
+        return {"_type": "video", "id": url[-1], "title": "Video", "url": url}
+
+    async def fake_start(self, notifier):
+        attempts.append(self.info.url)
+        error = outcomes[self.info.url].pop(0)
+        self.info.status, self.info.msg = ("error", error) if error else ("finished", None)
+
+    dq = DownloadQueue(dq_env, AsyncMock())
+    with patch.object(DownloadQueue, "_DownloadQueue__extract_info", fake_extract), \
+         patch.object(ytdl_module.Download, "start", fake_start):
+        for url in outcomes:
+            await dq.add(url, "video", "auto", "any", "best", "", "", 0)
+        while len(dq.done.saved_items()) < 2:
+            await asyncio.sleep(0.01)
+
+    assert attempts.count("https://example.com/watch?v=1") == 2
+    assert attempts.count("https://example.com/watch?v=2") == 1
+    retried = dq.done.get("https://example.com/watch?v=1").info
+    assert retried.status == "finished" and retried.retry_count == 1
+    failed = dq.done.get("https://example.com/watch?v=2").info
+    assert failed.status == "error" and failed.retry_count == 0
+    assert dq.retry_stats()["retried"] == 1
+
+
+@pytest.mark.asyncio
+async def test_open_circuit_breaker_holds_downloads_until_a_probe_succeeds(dq_env):
+    dq_env.DOWNLOAD_RETRY_ATTEMPTS = "0"
+    dq_env.CIRCUIT_BREAKER_WINDOW = "4"
+    dq_env.CIRCUIT_BREAKER_OPEN_SECONDS = "0.2"
+    started = []
+
+    def fake_extract(self, url, ytdl_options_presets=None, ytdl_options_overrides=None):
+        return {"_type": "video", "id": url[-1], "title": url[-1], "url": url, "extractor": "youtube"}
+
+    async def fake_start(self, notifier):
+        started.append(self.info.url[-1])
+        if self.info.url.endswith("1"):
+            self.info.status, self.info.msg = "error", "HTTP Error 503: Service Unavailable"
+        else:
+            self.info.status = "finished"
+
+    dq = DownloadQueue(dq_env, AsyncMock())
+    with patch.object(DownloadQueue, "_DownloadQueue__extract_info", fake_extract), \
+         patch.object(ytdl_module.Download, "start", fake_start):
+        await dq.add("https://example.com/watch?v=1", "video", "auto", "any", "best", "", "", 0)
+        while not dq.health.blocked("youtube"):
+            await asyncio.sleep(0.01)
+        for i in (2, 3):
+            await dq.add(f"https://example.com/watch?v={i}", "video", "auto", "any", "best", "", "", 0)
+        await asyncio.sleep(0.05)
+        assert started == ["1"]
+        assert dq.queue.get("https://example.com/watch?v=2").info.status == "waiting"
+        while len(dq.done.saved_items()) < 3:
+            await asyncio.sleep(0.01)
+
+    assert sorted(started) == ["1", "2", "3"]
+    assert not dq.health.blocked("youtube")
+    assert dq.notifier.health_changed.await_count >= 2
+
+
+@pytest.mark.asyncio
+async def test_downloads_are_held_while_they_would_not_fit_on_disk(dq_env, monkeypatch):
+    dq_env.DISK_SPACE_RESERVE = "100M"
+    free = {"bytes": 50 * 1024 * 1024}
+    monkeypatch.setattr("diskspace.shutil.disk_usage", lambda path: types.SimpleNamespace(free=free["bytes"]))
+    started = []
+
+    def fake_extract(self, url, ytdl_options_presets=None, ytdl_options_overrides=None):
+        return {"_type": "video", "id": "v1", "title": "Video", "url": url, "filesize": 10 * 1024 * 1024}
+
+    async def fake_start(self, notifier):
+        started.append(self.info.url)
+        self.info.status = "finished"
+
+    dq = DownloadQueue(dq_env, AsyncMock())
+    url = "https://example.com/watch?v=1"
+    with patch.object(DownloadQueue, "_DownloadQueue__extract_info", fake_extract), \
+         patch.object(ytdl_module.Download, "start", fake_start):
+        await dq.add(url, "video", "auto", "any", "best", "", "", 0)
+        await asyncio.sleep(0.05)
+        assert started == []
+        assert dq.queue.get(url).info.msg.startswith("Waiting for disk space")
+        free["bytes"] = 5 * 1024 ** 3
+        dq.scheduler.kick()
+        while not dq.done.exists(url):
+            await asyncio.sleep(0.01)
+
+    assert started == [url]
+    assert dq.done.get(url).info.msg is None
+    assert dq.disk.stats()["held"] == 0 and dq.disk.stats()["claimed_bytes"] == 0
+
+
+def _worker_with_child(pid_file):
+    os.setpgrp()
+    child = subprocess.Popen(["sleep", "30"])
+    with open(pid_file, "w") as f:
+        f.write(str(child.pid))
+    child.wait()
+
+
+@pytest.mark.skipif(not hasattr(os, "killpg"), reason="needs process groups")
+def test_killing_a_worker_also_kills_the_programs_it_started(tmp_path):
+    pid_file = tmp_path / "child.pid"
+    proc = multiprocessing.Process(target=_worker_with_child, args=(str(pid_file),))
+    proc.start()
+    deadline = time.monotonic() + 5
+    while not pid_file.exists() or not pid_file.read_text():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    child = int(pid_file.read_text())
+
+    ytdl_module.Download._kill_worker(types.SimpleNamespace(proc=proc))
+    proc.join(5)
+    deadline = time.monotonic() + 5
+    while _is_running(child):
+        assert time.monotonic() < deadline, "external program survived its worker"
+        time.sleep(0.01)
+
+
+def _is_running(pid):
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except FileNotFoundError:
+        return False
+
+
+def test_external_downloaders_are_left_out_of_the_bandwidth_budget():
+    def download(extractor="youtube", **opts):
+        return types.SimpleNamespace(info=types.SimpleNamespace(entry={"extractor": extractor}), ytdl_opts=opts)
+
+    assert DownloadQueue._follows_bandwidth_budget(download())
+    assert DownloadQueue._follows_bandwidth_budget(download(external_downloader={"default": "native"}))
+    assert not DownloadQueue._follows_bandwidth_budget(download(external_downloader={"m3u8": "ffmpeg"}))
+    assert not DownloadQueue._follows_bandwidth_budget(download(external_downloader="aria2c"))
+    assert not DownloadQueue._follows_bandwidth_budget(download("StreamingCommunity"))
+
+
+@pytest.mark.asyncio
+async def test_disk_claim_is_released_when_canceled_as_the_slot_comes(dq_env, monkeypatch):
+    dq_env.DISK_SPACE_RESERVE = "100M"
+    dq_env.MAX_CONCURRENT_DOWNLOADS = "1"
+    monkeypatch.setattr("diskspace.shutil.disk_usage", lambda path: types.SimpleNamespace(free=5 * 1024 ** 3))
+    dq = DownloadQueue(dq_env, AsyncMock())
+    entries = [{"_type": "video", "id": f"v{i}", "title": f"V{i}", "url": f"https://example.com/watch?v={i}",
+                "webpage_url": f"https://example.com/watch?v={i}"} for i in (1, 2)]
+    await dq.add_entries(entries, "video", "auto", "any", "best", "", "", 0, auto_start=False)
+    url = "https://example.com/watch?v=1"
+    download = dq.pending.get(url)
+    pool = dq.scheduler.pool_for(url)
+    blocker = dq.pending.get("https://example.com/watch?v=2")
+    blocker.canceled = True  # takes the only slot without claiming space
+    await dq.scheduler.acquire(blocker, pool)
+
+    task = asyncio.create_task(dq._DownloadQueue__run_download(download, None, "example.com", False))
+    await asyncio.wait_for(_wait_until(lambda: dq.scheduler.stats()["waiting"] == 1), 2)
+    # The slot is granted, and the disk space claimed, but the task is canceled before it runs.
+    dq.scheduler.release(pool)
+    assert dq.disk.stats()["claimed_bytes"] > 0
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert dq.disk.stats()["claimed_bytes"] == 0 and dq.scheduler.stats()["active"] == 0
+
+
+@pytest.mark.asyncio
+async def test_queue_caps_reject_adds_and_cut_off_playlists(dq_env):
+    dq_env.MAX_QUEUED_ITEMS = "3"
+    dq_env.QUEUE_SOURCE_LIMITS = '{"subscription": 1}'
+    dq = DownloadQueue(dq_env, AsyncMock())
+    entries = [{"_type": "video", "id": f"v{i}", "title": f"V{i}", "url": f"https://example.com/watch?v={i}",
+                "webpage_url": f"https://example.com/watch?v={i}"} for i in range(5)]
+
+    result = await dq.add_entries(entries[:2], "video", "auto", "any", "best", "", "", 0, auto_start=False, source="subscription")
+    assert "1 item(s) were not added" in result["msg"] and "retry_after" not in result
+    assert result["added"] == ["v0"]
+    assert dq.queue_room("subscription") == 0 and dq.queue_room("api") == 2
+    assert (await dq.add_entries(entries[2:3], "video", "auto", "any", "best", "", "", 0, source="subscription"))["retry_after"] == 60
+
+    await dq.add_entries(entries[2:4], "video", "auto", "any", "best", "", "", 0, auto_start=False)
+    full = await dq.add("https://example.com/watch?v=9", "video", "auto", "any", "best", "", "", 0)
+    assert full["status"] == "error" and full["retry_after"] == 60
+    stats = dq.queue_limit_stats()
+    assert stats["items"] == 3 and stats["sources"]["subscription"] == {"limit": 1, "items": 1}
+    assert stats["rejected"] == 2
+
+
+@pytest.mark.asyncio
+async def test_scheduled_downloads_wait_outside_the_scheduler_until_due(dq_env):
+    started = []
+    release = asyncio.Event()
+
+    async def fake_start(self, notifier):
+        started.append(self.info.url)
+        if self.info.url.endswith("=0"):
+            await release.wait()
+        self.info.status = "finished"
+
+    dq_env.MAX_CONCURRENT_DOWNLOADS = 1
+    dq = DownloadQueue(dq_env, AsyncMock())
+    entries = [{"_type": "video", "id": f"v{i}", "title": f"V{i}", "url": f"https://example.com/watch?v={i}",
+                "webpage_url": f"https://example.com/watch?v={i}"} for i in range(3)]
+    with patch.object(ytdl_module.Download, "start", fake_start):
+        # The only slot is busy, and the scheduled downloads still show why they wait.
+        await dq.add_entries(entries[:1], "video", "auto", "any", "best", "", "", 0)
+        await dq.add_entries(entries[1:2], "video", "auto", "any", "best", "", "", 0, start_at=time.time() + 0.3)
+        closed = [{"from": "00:00", "to": "00:01"}] if datetime.datetime.now().hour else [{"from": "12:00", "to": "12:01"}]
+        await dq.add_entries(entries[2:], "video", "auto", "any", "best", "", "", 0, window=closed)
+        await asyncio.sleep(0.05)
+        first, later, windowed = (dq.queue.get(e["url"]).info for e in entries)
+        assert later.status == "waiting" and later.msg.startswith("Scheduled to start at ")
+        assert windowed.msg.startswith("Scheduled for its time window, which opens ")
+        assert dq.scheduler.stats()["waiting"] == 0 and dq.scheduled.stats()["held"] == 2
+
+        release.set()
+        while not dq.done.exists(entries[1]["url"]):
+            await asyncio.sleep(0.01)
+        assert started == [entries[0]["url"], entries[1]["url"]]
+        assert dq.done.get(entries[1]["url"]).info.msg is None
+
+        await dq.cancel([entries[2]["url"]])
+        await asyncio.sleep(0.01)
+    assert dq.scheduled.stats()["held"] == 0 and entries[2]["url"] not in started
+
+
+@pytest.mark.asyncio
+async def test_playlists_in_an_entry_batch_keep_its_time_window(dq_env):
+    started = []
+
+    async def fake_start(self, notifier):
+        started.append(self.info.url)
+
+    dq = DownloadQueue(dq_env, AsyncMock())
+    url = "https://example.com/watch?v=1"
+    playlist = {"_type": "playlist", "id": "pl1", "title": "List",
+                "entries": [{"_type": "video", "id": "v1", "title": "V1", "url": url, "webpage_url": url}]}
+    closed = [{"from": "00:00", "to": "00:01"}] if datetime.datetime.now().hour else [{"from": "12:00", "to": "12:01"}]
+    with patch.object(ytdl_module.Download, "start", fake_start):
+        await dq.add_entries([playlist], "video", "auto", "any", "best", "", "", 0, source="subscription", window=closed)
+        await asyncio.sleep(0.05)
+        info = dq.queue.get(url).info
+        assert info.window == closed and info.status == "waiting" and started == []
+        await dq.cancel([url])
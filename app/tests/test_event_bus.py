@@ -0,0 +1,105 @@
+"""Tests for ``event_bus`` queueing, coalescing and backpressure."""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+
+import pytest
+
+from event_bus import EventBus
+
+
+def _recording_bus(**options):
+    bus = EventBus()
+    received = []
+
+    async def handler(event, payload):
+        received.append((event, payload))
+
+    consumer = bus.subscribe("test", handler, **options)
+    return bus, consumer, received
+
+
+@pytest.mark.asyncio
+async def test_publish_does_not_wait_for_slow_consumers():
+    bus = EventBus()
+    release = asyncio.Event()
+    fast = []
+
+    async def slow(event, payload):
+        await release.wait()
+
+    async def record(event, payload):
+        fast.append(payload)
+
+    bus.subscribe("slow", slow)
+    bus.subscribe("fast", record)
+    await bus.start()
+    bus.publish("added", 1)
+    bus.publish("added", 2)
+    for _ in range(20):
+        await asyncio.sleep(0)
+
+    assert fast == [1, 2]
+    assert bus.stats()["slow"]["queued"] == 1
+    release.set()
+    await bus.stop()
+    assert bus.stats()["slow"]["delivered"] == 2
+
+
+@pytest.mark.asyncio
+async def test_updates_coalesce_per_key_without_reordering():
+    bus, consumer, received = _recording_bus(coalesce=("updated",))
+    bus.publish("updated", "a1", key="a")
+    bus.publish("updated", "b1", key="b")
+    bus.publish("updated", "a2", key="a")
+    bus.publish("completed", "a-done", key="a")
+    bus.publish("updated", "a3", key="a")
+    await bus.drain()
+
+    assert received == [
+        ("updated", "a2"),
+        ("updated", "b1"),
+        ("completed", "a-done"),
+        ("updated", "a3"),
+    ]
+    assert consumer.stats()["coalesced"] == 1
+
+
+@pytest.mark.asyncio
+async def test_full_queue_drops_only_droppable_events():
+    bus, consumer, received = _recording_bus(maxsize=1, droppable=("updated",), events=("added", "updated"))
+    bus.publish("added", "a", key="a")
+    bus.publish("updated", "a1", key="a")
+    bus.publish("added", "b", key="b")
+    bus.publish("cleared", "c")
+    await bus.drain()
+
+    assert received == [("added", "a"), ("added", "b")]
+    assert consumer.stats()["dropped"] == 1
+
+
+@pytest.mark.asyncio
+async def test_handlers_run_in_publisher_context_and_errors_are_counted():
+    var = contextvars.ContextVar("var", default=None)
+    bus = EventBus()
+    seen = []
+
+    async def handler(event, payload):
+        if payload == "boom":
+            raise RuntimeError(payload)
+        seen.append(var.get())
+
+    consumer = bus.subscribe("ctx", handler)
+    token = var.set(42)
+    try:
+        bus.publish("added", "x")
+    finally:
+        var.reset(token)
+    bus.publish("added", "boom")
+    bus.publish("added", "y")
+    await bus.drain()
+
+    assert seen == [42, None]
+    assert consumer.stats()["errors"] == 1
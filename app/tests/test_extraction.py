@@ -0,0 +1,356 @@
+"""Tests for ``extraction.ExtractionPool`` deduplication and timeouts."""
+
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+
+import pytest
+import yt_dlp
+
+from extraction import (
+    ExtractionCache,
+    ExtractionPool,
+    ExtractionTimeout,
+    RateLimiter,
+    TokenBucket,
+    YoutubeDLPool,
+    normalize_url,
+)
+
+
+def _gated(result):
+    gate = threading.Event()
+    calls = []
+
+    def extract(url):
+        calls.append(url)
+        gate.wait(5)
+        if isinstance(result, Exception):
+            raise result
+        return {"url": url, "entries": [{"id": "a"}]}
+
+    return extract, gate, calls
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_requests_share_one_extraction():
+    pool = ExtractionPool(max_workers=2)
+    extract, gate, calls = _gated(None)
+    first = asyncio.ensure_future(pool.run("k", extract, "u"))
+    second = asyncio.ensure_future(pool.run("k", extract, "u"))
+    other = asyncio.ensure_future(pool.run("other", extract, "v"))
+    await asyncio.sleep(0.05)
+    gate.set()
+    a, b, c = await asyncio.gather(first, second, other)
+
+    assert sorted(calls) == ["u", "v"]
+    assert a == b and a is not b
+    assert a["entries"] is not b["entries"]
+    assert c["url"] == "v"
+    assert pool.stats()["deduplicated"] == 1
+    assert pool.stats()["in_flight"] == 0
+    pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_timed_out_waiter_does_not_abort_shared_extraction():
+    pool = ExtractionPool(max_workers=1, timeout=0.05)
+    extract, gate, calls = _gated(None)
+    patient = asyncio.ensure_future(pool.run("k", extract, "u", timeout=5))
+    with pytest.raises(ExtractionTimeout):
+        await pool.run("k", extract, "u")
+    gate.set()
+
+    assert (await patient)["url"] == "u"
+    assert calls == ["u"]
+    assert pool.stats()["timeouts"] == 1
+    pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_failures_reach_every_waiter_and_are_not_cached():
+    pool = ExtractionPool(max_workers=1)
+    extract, gate, calls = _gated(RuntimeError("boom"))
+    waiters = [asyncio.ensure_future(pool.run("k", extract, "u")) for _ in range(2)]
+    await asyncio.sleep(0.05)
+    gate.set()
+    results = await asyncio.gather(*waiters, return_exceptions=True)
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+    with pytest.raises(RuntimeError):
+        await pool.run("k", extract, "u")
+    assert calls == ["u", "u"]
+    assert pool.stats()["failures"] == 2
+    pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_cached_results_are_copies_until_they_expire(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("extraction.time.monotonic", lambda: now[0])
+    cache = ExtractionCache(maxsize=4, ttl=60)
+    pool = ExtractionPool(max_workers=1, cache=cache)
+    calls = []
+
+    def extract(url):
+        calls.append(url)
+        return {"_type": "playlist", "entries": [{"_type": "url", "url": "https://x/1"}]}
+
+    first = await pool.run(("https://x/pl", "opts"), extract, "https://x/pl")
+    first["entries"][0]["playlist_index"] = 1
+    second = await pool.run(("https://x/pl", "opts"), extract, "https://x/pl")
+    assert calls == ["https://x/pl"]
+    assert "playlist_index" not in second["entries"][0]
+
+    await pool.run(("https://x/pl", "opts"), extract, "https://x/pl", fresh=True)
+    now[0] += 61
+    await pool.run(("https://x/pl", "opts"), extract, "https://x/pl")
+    assert len(calls) == 3
+    assert cache.stats()["hits"] == 1
+    pool.shutdown()
+
+
+def test_cache_skips_media_urls_and_invalidates_by_normalized_url():
+    cache = ExtractionCache(maxsize=2, ttl=60)
+    assert not cache.store(("https://x/v", ""), {"id": "v", "formats": [{"url": "https://cdn/v?expire=1"}]})
+    assert cache.store((normalize_url("HTTPS://X.com/pl?utm_source=tg#top"), "a"), {"_type": "playlist"})
+    assert cache.store((normalize_url("https://x.com/pl"), "b"), {"_type": "playlist"})
+    assert cache.store(("https://x.com/other", "a"), {"_type": "playlist"})
+
+    assert cache.stats()["size"] == 2 and cache.stats()["skipped"] == 1
+    assert cache.invalidate("https://x.com/pl#frag") == 1
+    assert cache.lookup(("https://x.com/other", "a"))[0]
+
+
+class _FakeYDL:
+    instances = []
+
+    def __init__(self, params=None):
+        self.params = params
+        self.closed = False
+        _FakeYDL.instances.append(self)
+
+    def close(self):
+        self.closed = True
+
+
+def test_ydl_pool_reuses_instances_until_options_or_cookies_change(tmp_path, monkeypatch):
+    monkeypatch.setattr("extraction.yt_dlp.YoutubeDL", _FakeYDL)
+    _FakeYDL.instances = []
+    cookies = tmp_path / "cookies.txt"
+    cookies.write_text("# Netscape HTTP Cookie File\n")
+    params = {"quiet": True, "cookiefile": str(cookies)}
+    pool = YoutubeDLPool(max_idle=2)
+
+    with pool.acquire(params) as first:
+        pass
+    with pool.acquire(dict(params)) as second:
+        pass
+    assert second is first
+
+    with pool.acquire({**params, "quiet": False}) as other:
+        assert other is not first
+    os.utime(cookies, ns=(0, 0))
+    with pool.acquire(params) as after_cookies:
+        assert after_cookies is not first
+
+    assert pool.stats()["created"] == 3 and pool.stats()["reused"] == 1
+    pool.clear()
+    assert all(ydl.closed for ydl in _FakeYDL.instances)
+
+
+def test_ydl_pool_resets_per_call_state_between_checkouts():
+    pool = YoutubeDLPool()
+    with pool.acquire({"quiet": True}) as first:
+        first._playlist_level = 2
+        first._playlist_urls.add("https://example.com/list")
+        first._num_downloads = 3
+        first._download_retcode = 1
+        first.params["ratelimit"] = 1024
+        first.params["quiet"] = False
+    with pool.acquire({"quiet": True}) as second:
+        assert second is first
+        assert second._playlist_level == 0 and second._playlist_urls == set()
+        assert second._num_downloads == 0 and second._download_retcode == 0
+        assert "ratelimit" not in second.params and second.params["quiet"] is True
+    pool.clear()
+
+
+def test_ydl_pool_discards_instances_after_unexpected_errors(monkeypatch):
+    monkeypatch.setattr("extraction.yt_dlp.YoutubeDL", _FakeYDL)
+    pool = YoutubeDLPool()
+
+    with pytest.raises(yt_dlp.utils.DownloadError):
+        with pool.acquire({}) as ydl:
+            raise yt_dlp.utils.DownloadError("unavailable")
+    with pool.acquire({}) as again:
+        assert again is ydl
+    with pytest.raises(RuntimeError):
+        with pool.acquire({}) as again:
+            raise RuntimeError("half way through a playlist")
+    assert again.closed
+    with pool.acquire({}) as fresh:
+        assert fresh is not ydl
+
+
+def _slow_extract(url, delay):
+    time.sleep(delay)
+    return {"url": url}
+
+
+def _failing_extract(url):
+    raise yt_dlp.utils.DownloadError(f"ERROR: {url} is private")
+
+
+def _paged_listing(count):
+    return {"_type": "playlist", "id": "pl"}, ((i, {"id": f"v{i}"}) for i in range(1, count + 1))
+
+
+@pytest.mark.asyncio
+async def test_process_mode_returns_results_and_yt_dlp_errors():
+    pool = ExtractionPool(max_workers=2, mode="process")
+
+    assert await pool.run("k", _slow_extract, "https://x/v", 0) == {"url": "https://x/v"}
+    with pytest.raises(yt_dlp.utils.DownloadError, match="is private"):
+        await pool.run("e", _failing_extract, "https://x/private")
+    assert pool.stats()["killed"] == 0
+    pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_process_mode_kills_worker_when_every_waiter_gives_up():
+    pool = ExtractionPool(max_workers=1, timeout=0.5, mode="process")
+
+    with pytest.raises(ExtractionTimeout):
+        await pool.run("k", _slow_extract, "https://x/v", 30)
+    waiter = asyncio.ensure_future(pool.run("c", _slow_extract, "https://x/w", 30))
+    await asyncio.sleep(0.2)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    for _ in range(20):
+        await asyncio.sleep(0)
+
+    assert pool.stats()["killed"] == 2
+    # Both slots were released, so a new extraction still runs.
+    assert await pool.run("n", _slow_extract, "https://x/n", 0) == {"url": "https://x/n"}
+    pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_process_mode_closes_the_pipe_of_every_extraction(monkeypatch):
+    readers = []
+    pipe = multiprocessing.Pipe
+
+    def recording_pipe(duplex=True):
+        reader, writer = pipe(duplex)
+        readers.append(reader)
+        return reader, writer
+
+    monkeypatch.setattr("extraction.multiprocessing.Pipe", recording_pipe)
+    pool = ExtractionPool(max_workers=1, timeout=0.3, mode="process")
+    # Kept alive here, so only an explicit close shuts their descriptors.
+    assert await pool.run("ok", _slow_extract, "https://x/v", 0) == {"url": "https://x/v"}
+    with pytest.raises(ExtractionTimeout):
+        await pool.run("slow", _slow_extract, "https://x/v", 30)
+    for _ in range(50):
+        if all(reader.closed for reader in readers):
+            break
+        await asyncio.sleep(0.02)
+
+    assert len(readers) == 2 and all(reader.closed for reader in readers)
+    pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_process_mode_streams_pages_and_kills_abandoned_listings():
+    pool = ExtractionPool(max_workers=1, mode="process", page_size=3)
+
+    entry, items = await pool.run_streaming(_paged_listing, 7)
+    assert entry["id"] == "pl"
+    assert [index for index, _ in items] == list(range(1, 8))
+
+    entry, items = await pool.run_streaming(_paged_listing, 10**9)
+    assert next(items) == (1, {"id": "v1"})
+    items.close()
+    assert pool.stats()["killed"] == 1
+    pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_serves_waiters_in_arrival_order():
+    bucket = TokenBucket(per_minute=1200, burst=1)
+    order = []
+
+    async def caller(name):
+        await bucket.acquire()
+        order.append(name)
+
+    tasks = [asyncio.ensure_future(caller(name)) for name in "abcd"]
+    await asyncio.sleep(0)
+    tasks[1].cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    assert order == ["a", "c", "d"]
+    assert bucket.stats()["granted"] == 3 and bucket.stats()["waiting"] == 0
+
+
+def test_rate_limiter_matches_subdomains_and_defaults_per_host():
+    limiter = RateLimiter({"youtube.com": {"per_minute": 30, "burst": 2}, "default": {"per_minute": 60}})
+
+    assert limiter.bucket_for("https://www.youtube.com/watch?v=1") is limiter.bucket_for("https://music.youtube.com/x")
+    assert limiter.bucket_for("https://vimeo.com/1") is not limiter.bucket_for("https://example.com/1")
+    assert limiter.bucket_for("https://vimeo.com/1").burst == 1
+    assert RateLimiter({"youtube.com": {"per_minute": 30}}).bucket_for("https://vimeo.com/1") is None
+    with pytest.raises(ValueError):
+        RateLimiter.parse_rules('{"youtube.com": 5}')
+    for rule in ({"per_minute": 0}, {"per_minute": -5}, {"per_minute": 10, "burst": 0}, {"burst": 3}):
+        with pytest.raises(ValueError, match="positive"):
+            RateLimiter.parse_rules({"youtube.com": rule})
+
+
+@pytest.mark.asyncio
+async def test_pool_takes_one_token_per_started_extraction():
+    limiter = RateLimiter({"x.com": {"per_minute": 1, "burst": 1}})
+    pool = ExtractionPool(max_workers=2, rate_limiter=limiter)
+    extract, gate, calls = _gated(None)
+    gate.set()
+
+    first, second = await asyncio.gather(
+        pool.run("k", extract, "u", url="https://x.com/a"),
+        pool.run("k", extract, "u", url="https://x.com/a"),
+    )
+    queued = asyncio.ensure_future(pool.run("other", extract, "v", url="https://x.com/b"))
+    await asyncio.sleep(0.05)
+    assert limiter.stats()["x.com"]["waiting"] == 1
+    queued.cancel()
+    await asyncio.gather(queued, return_exceptions=True)
+
+    assert calls == ["u"]
+    assert limiter.stats()["x.com"]["waiting"] == 0
+    assert limiter.stats()["x.com"]["granted"] == 1
+    pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_time_queued_for_a_token_does_not_count_against_the_timeout():
+    limiter = RateLimiter({"x.com": {"per_minute": 200, "burst": 1}})
+    pool = ExtractionPool(max_workers=2, timeout=0.2, rate_limiter=limiter)
+
+    def extract(url):
+        time.sleep(0.1)
+        return {"url": url}
+
+    started = time.monotonic()
+    results = await asyncio.gather(*(pool.run(None, extract, u, url=f"https://x.com/{u}") for u in "abc"))
+    # The last call queued ~0.6s for its token, well past the timeout, and still succeeded.
+    assert time.monotonic() - started > 0.5
+    assert [r["url"] for r in results] == ["a", "b", "c"] and pool.timeouts == 0
+
+    with pytest.raises(ExtractionTimeout):
+        await pool.run(None, lambda: time.sleep(0.3))
+    pool.shutdown()
@@ -0,0 +1,66 @@
+"""Tests for ``health.HealthTracker`` circuit breakers."""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from health import CLOSED, HALF_OPEN, OPEN, HealthTracker
+
+
+def test_key_for_prefers_extractor_over_host():
+    assert HealthTracker.key_for("https://www.youtube.com/playlist?list=x", "youtube:tab") == "youtube"
+    assert HealthTracker.key_for("https://www.example.com/v.mp4", "generic") == "example.com"
+    assert HealthTracker.key_for("", None) == "generic"
+
+
+def test_breaker_opens_on_failure_ratio_over_the_window():
+    changes = []
+    health = HealthTracker(window=8, failure_ratio=0.5, on_change=lambda key, state: changes.append((key, state)))
+    health.record("youtube", False)
+    assert not health.blocked("youtube")  # fewer than window // 4 results
+    for ok in (True, True, False):
+        health.record("youtube", ok)
+    assert health.blocked("youtube") and changes == [("youtube", OPEN)]
+    assert health.snapshot()["youtube"]["state"] == OPEN
+    assert health.stats()["extractors"]["youtube"]["trips"] == 1
+    assert not HealthTracker(failure_ratio=0).blocked("youtube")
+
+
+@pytest.mark.asyncio
+async def test_open_breaker_holds_downloads_and_lets_one_probe_through():
+    health = HealthTracker(window=4, failure_ratio=0.5, open_seconds=0.05)
+    health.record("youtube", False)
+    assert health.blocked("youtube")
+
+    waiters = [asyncio.ensure_future(health.admit("youtube")) for _ in range(3)]
+    await asyncio.sleep(0.01)
+    assert not any(w.done() for w in waiters)
+    assert health.stats()["extractors"]["youtube"]["waiting"] == 3
+
+    await asyncio.sleep(0.1)
+    probes = [w for w in waiters if w.done()]
+    assert len(probes) == 1 and probes[0].result() is True
+    assert health.snapshot()["youtube"]["state"] == HALF_OPEN
+
+    # A probe that ended without a verdict hands over to the next waiter.
+    health.abandon("youtube")
+    await asyncio.sleep(0.01)
+    assert sum(w.done() for w in waiters) == 2
+
+    health.record("youtube", True, probe=True)
+    results = await asyncio.gather(*waiters)
+    assert sorted(results) == [False, True, True]
+    assert not health.blocked("youtube") and health.snapshot() == {}
+    assert health.stats()["extractors"]["youtube"]["state"] == CLOSED
+
+
+@pytest.mark.asyncio
+async def test_failed_probe_opens_the_breaker_again():
+    health = HealthTracker(window=4, failure_ratio=0.5, open_seconds=0.01)
+    health.record("youtube", False)
+    await asyncio.sleep(0.02)
+    assert await health.admit("youtube") is True
+    health.record("youtube", False, probe=True)
+    assert health.snapshot()["youtube"]["state"] == OPEN
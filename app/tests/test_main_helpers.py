@@ -5,6 +5,7 @@ from __future__ import annotations
 import json
 import logging
 import unittest
+from unittest.mock import MagicMock
 
 import main
 
@@ -92,6 +93,49 @@ class ObjectSerializerTests(unittest.TestCase):
         self.assertEqual(json.loads(ser.encode("hello")), "hello")
 
 
+class StateSnapshotTests(unittest.TestCase):
+    def test_builds_once_per_version(self):
+        snap = main.StateSnapshot()
+        build = MagicMock(return_value="payload")
+        self.assertEqual(snap.get("all", build), "payload")
+        self.assertEqual(snap.get("all", build), "payload")
+        self.assertEqual(build.call_count, 1)
+        snap.invalidate()
+        snap.get("all", build)
+        self.assertEqual(build.call_count, 2)
+
+    def test_ttl_entries_survive_invalidation(self):
+        snap = main.StateSnapshot()
+        build = MagicMock(return_value="dirs")
+        snap.get("custom_dirs", build, ttl=60)
+        snap.invalidate()
+        snap.get("custom_dirs", build, ttl=60)
+        self.assertEqual(build.call_count, 1)
+
+
+class EventJournalTests(unittest.TestCase):
+    def test_replays_only_missed_events(self):
+        journal = main.EventJournal("epoch", 10)
+        for i in range(5):
+            journal.record("updated", f"payload-{i}")
+        self.assertEqual([seq for seq, _, _ in journal.since("epoch", 3)], [4, 5])
+        self.assertEqual(journal.since("epoch", 5), [])
+
+    def test_gap_outside_buffer_requires_full_snapshot(self):
+        journal = main.EventJournal("epoch", 3)
+        for i in range(6):
+            journal.record("updated", f"payload-{i}")
+        self.assertIsNone(journal.since("epoch", 1))
+        self.assertEqual([seq for seq, _, _ in journal.since("epoch", 3)], [4, 5, 6])
+
+    def test_other_epoch_or_future_seq_is_rejected(self):
+        journal = main.EventJournal("epoch", 3)
+        journal.record("added", "x")
+        self.assertIsNone(journal.since("previous-run", 1))
+        self.assertIsNone(journal.since("epoch", 7))
+        self.assertIsNone(journal.since("epoch", "1"))
+
+
 class FrontendSafeTests(unittest.TestCase):
     def test_only_expected_keys(self):
         safe = main.config.frontend_safe()
@@ -97,6 +97,22 @@ class PersistentQueueTests(unittest.TestCase):
             keys = [k for k, _ in pq.saved_items()]
             self.assertEqual(keys, ["http://first.example", "http://second.example"])
 
+    def test_put_many_writes_once_and_rolls_back_on_failure(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            pq = PersistentQueue("queue", os.path.join(tmp, "queue"))
+            pq.put(_FakeDownload(_make_info("http://a.example")))
+            batch = [_FakeDownload(_make_info(f"http://{n}.example")) for n in ("b", "c")]
+            with patch.object(pq.store, "save", wraps=pq.store.save) as save:
+                pq.put_many(batch)
+            self.assertEqual(save.call_count, 1)
+            self.assertEqual([k for k, _ in pq.items()], ["http://a.example", "http://b.example", "http://c.example"])
+
+            with patch.object(pq.store, "save", side_effect=OSError("disk full")):
+                with self.assertRaises(OSError):
+                    pq.put_many([_FakeDownload(_make_info("http://d.example"))])
+            self.assertFalse(pq.exists("http://d.example"))
+            self.assertEqual(len(pq.dict), 3)
+
     def test_load_restores_from_json(self):
         with tempfile.TemporaryDirectory() as tmp:
             path = os.path.join(tmp, "queue")
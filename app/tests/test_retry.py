@@ -0,0 +1,57 @@
+"""Tests for ``retry`` error classification and retry policy."""
+
+from __future__ import annotations
+
+import pytest
+
+from retry import PERMANENT, THROTTLED, TRANSIENT, RetryPolicy, classify, host_of
+
+
+@pytest.mark.parametrize(
+    "msg, kind",
+    [
+        ("ERROR: unable to download video data: HTTP Error 503: Service Unavailable", TRANSIENT),
+        ("ERROR: [Errno 104] Connection reset by peer", TRANSIENT),
+        ("ERROR: fragment 12 not found, unable to continue", TRANSIENT),
+        ("ERROR: unable to download video data: HTTP Error 429: Too Many Requests", THROTTLED),
+        ("ERROR: [youtube] abc: Sign in to confirm you're not a bot", THROTTLED),
+        ("ERROR: [youtube] abc: Sign in to confirm your age", PERMANENT),
+        ("ERROR: [youtube] abc: Private video", PERMANENT),
+        ("ERROR: HTTP Error 404: Not Found", PERMANENT),
+        ("something nobody has seen before", PERMANENT),
+        (None, PERMANENT),
+    ],
+)
+def test_classify(msg, kind):
+    assert classify(msg) == kind
+
+
+def test_host_of_drops_www():
+    assert host_of("https://www.YouTube.com/watch?v=1") == "youtube.com"
+    assert host_of("not a url") == ""
+
+
+def test_policy_backs_off_exponentially_and_gives_up():
+    policy = RetryPolicy(max_attempts=3, base_delay=10, max_delay=25, jitter=0)
+    transient = "HTTP Error 502: Bad Gateway"
+
+    assert [policy.decide(transient, attempt, "x.com") for attempt in (1, 2, 3, 4)] == [10, 20, 25, None]
+    assert policy.decide("Video unavailable", 1, "x.com") is None
+    stats = policy.stats()
+    assert stats["retried"] == 3 and stats["gave_up"] == 1
+    assert stats["classified"] == {PERMANENT: 1, TRANSIENT: 4, THROTTLED: 0}
+
+
+def test_throttling_cools_down_the_whole_host(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("retry.time.monotonic", lambda: now[0])
+    policy = RetryPolicy(max_attempts=0, base_delay=10, cooldown=300, jitter=0)
+
+    # Out of retries, but the host still cools down for everyone else.
+    assert policy.decide("HTTP Error 429: Too Many Requests", 1, "x.com") is None
+    assert policy.cooldown_remaining("x.com") == 300
+    assert policy.cooldown_remaining("y.com") == 0
+    now[0] += 100
+    assert policy.stats()["cooldowns"] == {"x.com": 200}
+    now[0] += 200
+    assert policy.cooldown_remaining("x.com") == 0 and policy.stats()["cooldowns"] == {}
@@ -0,0 +1,106 @@
+"""Tests for ``scheduler.DownloadScheduler`` slot pools."""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from scheduler import DownloadScheduler
+
+
+def test_pools_match_extractors_then_hosts():
+    scheduler = DownloadScheduler(3, {"youtube": 2, "vimeo.com": 1, "default": 2})
+
+    assert scheduler.pool_for("https://www.youtube.com/watch?v=1", "youtube:tab") == "youtube"
+    assert scheduler.pool_for("https://player.vimeo.com/video/1", "generic") == "vimeo.com"
+    assert scheduler.pool_for("https://example.com/v.mp4") == "default"
+    with pytest.raises(ValueError):
+        DownloadScheduler.parse_pools('{"youtube": 0}')
+
+
+@pytest.mark.asyncio
+async def test_downloads_waiting_on_a_full_pool_do_not_block_other_pools():
+    scheduler = DownloadScheduler(2, {"sc": 1})
+    await scheduler.acquire("sc-1", "sc")
+    blocked = asyncio.ensure_future(scheduler.acquire("sc-2", "sc"))
+    other = asyncio.ensure_future(scheduler.acquire("yt-1", "default"))
+    queued = asyncio.ensure_future(scheduler.acquire("yt-2", "default"))
+    await asyncio.sleep(0)
+
+    assert other.done() and not blocked.done() and not queued.done()
+    assert scheduler.waiting() == ["sc-2", "yt-2"]
+    scheduler.release("sc")
+    await asyncio.sleep(0)
+    # The global slot goes to the download next in line whose pool has room.
+    assert blocked.done() and not queued.done()
+
+    queued.cancel()
+    await asyncio.gather(queued, return_exceptions=True)
+    stats = scheduler.stats()
+    assert stats["active"] == 2 and stats["waiting"] == 0
+    assert stats["pools"]["sc"]["granted"] == 2 and stats["pools"]["sc"]["wait_max_seconds"] >= 0
+
+
+@pytest.mark.asyncio
+async def test_sources_share_slots_by_weight_and_priority_goes_first():
+    scheduler = DownloadScheduler(1, weights={"ui": 4, "subscription": 1})
+    await scheduler.acquire("running", "default", "subscription")
+    for i in range(6):
+        asyncio.ensure_future(scheduler.acquire(f"sub-{i}", "default", "subscription"))
+    await asyncio.sleep(0)
+    for i in range(3):
+        asyncio.ensure_future(scheduler.acquire(f"ui-{i}", "default", "ui"))
+    await asyncio.sleep(0)
+
+    # A UI request arriving behind a subscription sweep is next in line.
+    assert scheduler.waiting()[:4] == ["ui-0", "ui-1", "ui-2", "sub-0"]
+    assert scheduler.reorder("sub-5", priority=1)
+    assert scheduler.reorder("sub-4", position="front")
+    assert not scheduler.reorder("missing", priority=1)
+    assert scheduler.waiting()[:3] == ["sub-5", "ui-0", "ui-1"]
+    assert scheduler.waiting().index("sub-4") < scheduler.waiting().index("sub-0")
+    assert scheduler.stats()["sources"]["subscription"]["waiting"] == 6
+    with pytest.raises(ValueError):
+        DownloadScheduler.parse_weights('{"cron": 1}')
+
+
+@pytest.mark.asyncio
+async def test_rejected_downloads_wait_without_blocking_others_until_kicked():
+    fits = {"big": False, "small": True}
+    scheduler = DownloadScheduler(2, admission=lambda item, context: fits[item])
+    big = asyncio.ensure_future(scheduler.acquire("big", "default"))
+    small = asyncio.ensure_future(scheduler.acquire("small", "default"))
+    await asyncio.sleep(0)
+
+    assert small.done() and not big.done()
+    assert scheduler.waiting() == ["big"]
+    fits["big"] = True
+    scheduler.kick()
+    await asyncio.sleep(0)
+    assert big.done()
+    assert scheduler.stats()["rejected"] >= 1
+
+
+@pytest.mark.asyncio
+async def test_held_downloads_are_not_asked_again_until_a_release_or_kick():
+    asked = []
+
+    def admission(item, context):
+        asked.append(item)
+        return item != "held"
+
+    scheduler = DownloadScheduler(2, admission=admission)
+    held = asyncio.ensure_future(scheduler.acquire("held", "default"))
+    await asyncio.sleep(0)
+    first = asyncio.ensure_future(scheduler.acquire("a", "default"))
+    await asyncio.sleep(0)
+    assert asked == ["held", "a"] and first.done()
+    assert scheduler.waiting() == ["held"] and scheduler.stats()["waiting"] == 1
+
+    scheduler.release("default")
+    await asyncio.sleep(0)
+    assert asked == ["held", "a", "held"] and not held.done()
+    held.cancel()
+    await asyncio.sleep(0)
+    assert scheduler.waiting() == []
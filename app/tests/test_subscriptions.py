@@ -45,16 +45,31 @@ class _Queue:
     def __init__(self):
         self.entries = []
         self.fail = False
+        self.room = None
+        self.accept = None
 
     async def add(self, *args, **kwargs):
         return None
 
+    def queue_room(self, source=None):
+        return self.room
+
     async def add_entry(self, entry, *args, **kwargs):
         if self.fail:
             return {"status": "error", "msg": "queue failed"}
         self.entries.append((entry, args, kwargs))
         return {"status": "ok"}
 
+    async def add_entries(self, entries, *args, **kwargs):
+        if self.fail:
+            return {"status": "error", "msg": "queue failed"}
+        taken = entries if self.accept is None else entries[: self.accept]
+        self.entries.extend((entry, args, kwargs) for entry in taken)
+        added = [entry["id"] for entry in taken]
+        if len(taken) < len(entries):
+            return {"status": "error", "msg": "queue full", "added": added}
+        return {"status": "ok", "added": added}
+
 
 class _Notifier:
     async def subscription_added(self, sub):
@@ -386,6 +401,90 @@ class SubscriptionPersistenceTests(unittest.IsolatedAsyncioTestCase):
             self.assertEqual(sub.seen_ids[:2], ["v2", "v1"])
             self.assertEqual([entry["webpage_url"] for entry, _, _ in queue.entries], ["https://example.com/v2"])
 
+    async def test_check_now_defers_entries_beyond_queue_room_without_marking_them_seen(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            queue = _Queue()
+            mgr = SubscriptionManager(_Config(tmp), queue, _Notifier())
+
+            with patch(
+                "subscriptions.extract_flat_playlist",
+                side_effect=[
+                    ({"_type": "channel", "title": "Channel"}, []),
+                    (
+                        {"_type": "channel", "title": "Channel"},
+                        [
+                            {"id": "v2", "title": "Two", "webpage_url": "https://example.com/v2"},
+                            {"id": "v1", "title": "One", "webpage_url": "https://example.com/v1"},
+                        ],
+                    ),
+                ],
+            ):
+                result = await mgr.add_subscription(
+                    "https://example.com/channel",
+                    check_interval_minutes=60,
+                    download_type="video",
+                    codec="auto",
+                    format="any",
+                    quality="best",
+                    folder="",
+                    custom_name_prefix="",
+                    auto_start=True,
+                    playlist_item_limit=0,
+                    split_by_chapters=False,
+                    chapter_template="",
+                    subtitle_language="en",
+                    subtitle_mode="prefer_manual",
+                )
+                queue.room = 1
+                await mgr.check_now([result["subscription"]["id"]])
+
+            sub = mgr.list_all()[0]
+            self.assertEqual(sub.seen_ids, ["v2"])
+            self.assertIn("1 new entries deferred", sub.error)
+            self.assertEqual([entry["id"] for entry, _, _ in queue.entries], ["v2"])
+
+    async def test_check_now_marks_only_the_entries_the_queue_took_as_seen(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            queue = _Queue()
+            mgr = SubscriptionManager(_Config(tmp), queue, _Notifier())
+
+            with patch(
+                "subscriptions.extract_flat_playlist",
+                side_effect=[
+                    ({"_type": "channel", "title": "Channel"}, []),
+                    (
+                        {"_type": "channel", "title": "Channel"},
+                        [
+                            {"id": "v2", "title": "Two", "webpage_url": "https://example.com/v2"},
+                            {"id": "v1", "title": "One", "webpage_url": "https://example.com/v1"},
+                        ],
+                    ),
+                ],
+            ):
+                result = await mgr.add_subscription(
+                    "https://example.com/channel",
+                    check_interval_minutes=60,
+                    download_type="video",
+                    codec="auto",
+                    format="any",
+                    quality="best",
+                    folder="",
+                    custom_name_prefix="",
+                    auto_start=True,
+                    playlist_item_limit=0,
+                    split_by_chapters=False,
+                    chapter_template="",
+                    subtitle_language="en",
+                    subtitle_mode="prefer_manual",
+                )
+                # Room ran out between the check and the batch being queued.
+                queue.accept = 1
+                await mgr.check_now([result["subscription"]["id"]])
+
+            sub = mgr.list_all()[0]
+            self.assertEqual(sub.seen_ids, ["v2"])
+            self.assertEqual(sub.error, "queue full")
+
     async def test_update_subscription_parses_string_false_enabled(self):
         with tempfile.TemporaryDirectory() as tmp:
             queue = _Queue()
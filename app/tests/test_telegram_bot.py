@@ -54,6 +54,7 @@ async def test_telegram_single_video_queues_download(tmp_path, monkeypatch):
         "prefer_manual",
         [],
         {},
+        source="telegram",
     )
     bot._send_message.assert_awaited_once_with(123, "Queued 1 link(s) with current chat config.")
 
@@ -78,3 +79,24 @@ async def test_telegram_batch_video_message_queues_each_url(tmp_path, monkeypatc
         "https://streamingcommunityz.ooo/it/watch/6119?e=39896",
     ]
     bot._send_message.assert_awaited_once_with(123, "Queued 2 link(s) with current chat config.")
+
+
+@pytest.mark.asyncio
+async def test_telegram_full_queue_replies_with_backpressure_message(tmp_path, monkeypatch):
+    full = {"status": "error", "msg": "The download queue is full", "retry_after": 60}
+    dqueue = SimpleNamespace(add=AsyncMock(side_effect=[{"status": "ok"}, full]))
+    bot = _make_bot(tmp_path, monkeypatch, dqueue)
+    bot._send_message = AsyncMock()
+    text = (
+        "https://youtu.be/Mb6H7trzMfI\n"
+        "https://youtu.be/aaaaaaaaaaa\n"
+        "https://youtu.be/bbbbbbbbbbb"
+    )
+
+    await bot._text_message_handler(_make_update(text), None)
+
+    # Links after the first rejection are not even tried.
+    assert dqueue.add.await_count == 2
+    messages = [call.args[1] for call in bot._send_message.await_args_list]
+    assert messages[0] == "Queued 1 link(s) with current chat config."
+    assert "2 link(s) were not queued" in messages[1] and "60 seconds" in messages[1]
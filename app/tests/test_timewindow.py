@@ -0,0 +1,72 @@
+"""Tests for ``timewindow`` parsing and opening times."""
+
+from __future__ import annotations
+
+import asyncio
+import datetime
+import time
+
+import pytest
+
+from timewindow import ScheduledHolds, due_at, is_open, next_opening, parse_start_at, parse_windows
+
+
+def test_windows_are_normalized_and_validated():
+    assert parse_windows('{"from": "1:00", "to": "6:30", "days": ["Sunday", "sat"]}') == [
+        {"from": "01:00", "to": "06:30", "days": ["sat", "sun"]}
+    ]
+    assert parse_windows(None) == [] and parse_windows("") == []
+    for bad in ('{"from": "01:00"}', '{"from": "01:00", "to": "01:00"}', "[1]", "{not json",
+                {"from": "01:00", "to": "02:00", "days": ["someday"]}):
+        with pytest.raises(ValueError):
+            parse_windows(bad)
+
+
+def test_next_opening_handles_midnight_wrap_and_days():
+    nightly = parse_windows({"from": "23:00", "to": "06:00"})
+    assert is_open(nightly, datetime.datetime(2026, 1, 1, 2, 0))
+    assert next_opening(nightly, datetime.datetime(2026, 1, 1, 2, 0)) is None
+    assert next_opening(nightly, datetime.datetime(2026, 1, 1, 12, 0)) == datetime.datetime(2026, 1, 1, 23, 0)
+
+    # 2026-01-02 is a Friday: a Saturday-night window wrapping into Sunday.
+    weekend = parse_windows({"from": "22:00", "to": "04:00", "days": ["sat"]})
+    assert next_opening(weekend, datetime.datetime(2026, 1, 2, 23, 0)) == datetime.datetime(2026, 1, 3, 22, 0)
+    assert is_open(weekend, datetime.datetime(2026, 1, 4, 3, 0))
+    assert not is_open(weekend, datetime.datetime(2026, 1, 5, 3, 0))
+
+
+def test_start_at_accepts_epoch_and_iso_times():
+    assert parse_start_at(1700000000) == 1700000000.0
+    assert parse_start_at("2026-01-01T02:30:00+00:00") == datetime.datetime(
+        2026, 1, 1, 2, 30, tzinfo=datetime.timezone.utc
+    ).timestamp()
+    assert parse_start_at("") is None
+    with pytest.raises(ValueError):
+        parse_start_at("tomorrow")
+
+
+def test_due_at_waits_for_the_start_time_then_the_window():
+    noon = datetime.datetime(2026, 1, 1, 12, 0).timestamp()
+    nightly = parse_windows({"from": "23:00", "to": "06:00"})
+    assert due_at(nightly, None, noon) == datetime.datetime(2026, 1, 1, 23, 0).timestamp()
+    assert due_at(None, noon + 60, noon) == noon + 60
+    assert due_at(None, noon - 60, noon) is None
+
+
+@pytest.mark.asyncio
+async def test_holds_wake_in_due_order_and_can_be_released_early():
+    holds = ScheduledHolds()
+    woken = []
+
+    async def hold(key, delay):
+        await holds.wait(key, time.time() + delay)
+        woken.append(key)
+
+    tasks = [asyncio.create_task(hold("late", 60)), asyncio.create_task(hold("soon", 0.05))]
+    await asyncio.sleep(0.01)
+    assert holds.stats()["held"] == 2
+    await asyncio.sleep(0.1)
+    assert woken == ["soon"]
+    holds.release("late")
+    await asyncio.gather(*tasks)
+    assert woken == ["soon", "late"] and holds.stats() == {"held": 0, "released": 1, "next_due_in_seconds": None}
@@ -43,6 +43,7 @@ from ytdl import (
     _calculate_progress_percent,
     _compact_persisted_entry,
     _convert_srt_to_txt_file,
+    _playlist_extract_params,
     _resolve_outtmpl_fields,
     _sanitize_entry_for_pickle,
     _sanitize_path_component,
@@ -222,6 +223,25 @@ class ProgressPercentTests(unittest.TestCase):
         self.assertEqual(_calculate_progress_percent({"status": "finished"}), 100.0)
 
 
+class PlaylistExtractParamsTests(unittest.TestCase):
+    def test_no_limit_or_range_adds_nothing(self):
+        self.assertEqual(_playlist_extract_params(0), {})
+
+    def test_item_limit_becomes_playlistend(self):
+        self.assertEqual(_playlist_extract_params(10), {"playlistend": 10})
+
+    def test_limit_counts_from_start_and_never_extends_end(self):
+        self.assertEqual(_playlist_extract_params(10, {"start": 21}), {"playliststart": 21, "playlistend": 30})
+        self.assertEqual(
+            _playlist_extract_params(10, {"start": 21, "end": 25}),
+            {"playliststart": 21, "playlistend": 25},
+        )
+
+    def test_step_and_explicit_items_use_playlist_items(self):
+        self.assertEqual(_playlist_extract_params(0, {"start": 5, "step": 2}), {"playlist_items": "5::2"})
+        self.assertEqual(_playlist_extract_params(3, {"items": "1,4:6"}), {"playlist_items": "1,4:6"})
+
+
 class DownloadInfoSetstateTests(unittest.TestCase):
     def _base_state(self, **kwargs):
         base = {
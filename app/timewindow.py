@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import datetime
+import heapq
+import itertools
+import json
+import time
+from typing import Any, Hashable, Optional
+
+DAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+# Prefix of the msg shown on a download waiting for its scheduled time.
+HOLD_PREFIX = "Scheduled"
+
+
+def parse_clock(value: Any) -> int:
+    """Minutes after midnight of ``"HH:MM"``."""
+    try:
+        hours, minutes = str(value).split(":")
+        hours, minutes = int(hours), int(minutes)
+    except ValueError:
+        raise ValueError(f'"{value}" is not a time of day such as 08:30') from None
+    if not (0 <= hours < 24 and 0 <= minutes < 60):
+        raise ValueError(f'"{value}" is not a time of day such as 08:30')
+    return hours * 60 + minutes
+
+
+def in_window(start: int, end: int, minute: int) -> bool:
+    """Whether ``minute`` of the day falls in ``[start, end)``, which may wrap past midnight."""
+    return start <= minute < end if start <= end else (minute >= start or minute < end)
+
+
+def parse_windows(spec: Any) -> list[dict[str, Any]]:
+    """Normalize ``{"from": "01:00", "to": "06:00", "days": ["sat", "sun"]}``, a
+    list of those, or their JSON, into a list of windows. ``days`` is
+    optional and names the days a window starts on."""
+    if spec is None or spec == "":
+        return []
+    if isinstance(spec, str):
+        try:
+            spec = json.loads(spec)
+        except json.JSONDecodeError as exc:
+            raise ValueError(f"time window is not valid JSON: {exc}") from None
+    if isinstance(spec, dict):
+        spec = [spec]
+    if not isinstance(spec, list):
+        raise ValueError("time window must be an object or a list of objects")
+    windows = []
+    for window in spec:
+        if not isinstance(window, dict) or not {"from", "to"} <= window.keys():
+            raise ValueError('every time window needs "from" and "to"')
+        start, end = parse_clock(window["from"]), parse_clock(window["to"])
+        if start == end:
+            raise ValueError("a time window must not be empty")
+        normalized = {"from": f"{start // 60:02d}:{start % 60:02d}", "to": f"{end // 60:02d}:{end % 60:02d}"}
+        if window.get("days") is not None:
+            days = window["days"]
+            if not isinstance(days, list) or not days or any(str(d).lower()[:3] not in DAYS for d in days):
+                raise ValueError(f'"days" must be a list of {", ".join(DAYS)}')
+            normalized["days"] = sorted({str(d).lower()[:3] for d in days}, key=DAYS.index)
+        windows.append(normalized)
+    return windows
+
+
+def _starts_on(window: dict[str, Any], day: datetime.date) -> bool:
+    return "days" not in window or DAYS[day.weekday()] in window["days"]
+
+
+def is_open(windows: list[dict[str, Any]], now: datetime.datetime) -> bool:
+    if not windows:
+        return True
+    minute = now.hour * 60 + now.minute
+    yesterday = now.date() - datetime.timedelta(days=1)
+    for window in windows:
+        start, end = parse_clock(window["from"]), parse_clock(window["to"])
+        if start <= end:
+            if _starts_on(window, now.date()) and in_window(start, end, minute):
+                return True
+        elif (_starts_on(window, now.date()) and minute >= start) or (_starts_on(window, yesterday) and minute < end):
+            return True
+    return False
+
+
+def next_opening(windows: list[dict[str, Any]], now: datetime.datetime) -> Optional[datetime.datetime]:
+    """When the next window opens, or None if one is open at ``now``."""
+    if is_open(windows, now):
+        return None
+    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    candidates = []
+    for offset in range(8):
+        day = midnight + datetime.timedelta(days=offset)
+        for window in windows:
+            opens = day + datetime.timedelta(minutes=parse_clock(window["from"]))
+            if opens > now and _starts_on(window, day.date()):
+                candidates.append(opens)
+    return min(candidates)
+
+
+def parse_start_at(value: Any) -> Optional[float]:
+    """Epoch seconds from a number or an ISO 8601 time (local time if it has no offset)."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, bool):
+        raise ValueError("start_at must be an ISO 8601 time or epoch seconds")
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return datetime.datetime.fromisoformat(str(value).strip()).timestamp()
+    except ValueError:
+        raise ValueError(f'"{value}" is not an ISO 8601 time such as 2024-05-01T02:30') from None
+
+
+def due_at(windows: Optional[list[dict[str, Any]]], start_at: Optional[float], now: Optional[float] = None) -> Optional[float]:
+    """Epoch time at which something with ``windows`` and ``start_at`` may start, or None if it may start now."""
+    now = time.time() if now is None else now
+    if start_at and start_at > now:
+        return start_at
+    if windows:
+        opens = next_opening(windows, datetime.datetime.fromtimestamp(now))
+        if opens is not None:
+            return opens.timestamp()
+    return None
+
+
+class ScheduledHolds:
+    """Items waiting for the time they are due, in a heap keyed by that time.
+
+    One timer wakes the earliest, so holding many items costs nothing until
+    they come due. The timer never sleeps longer than ``max_sleep`` seconds,
+    so a jump of the wall clock delays an item by at most that much.
+    """
+
+    def __init__(self, max_sleep: float = 60.0):
+        self.max_sleep = max_sleep
+        self._heap: list[tuple[float, int, Hashable, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._changed: Optional[asyncio.Event] = None
+        self._timer: Optional[asyncio.Task] = None
+        self.released = 0
+
+    def __len__(self) -> int:
+        return sum(1 for *_, future in self._heap if not future.done())
+
+    async def wait(self, key: Hashable, due: float) -> None:
+        """Return once ``due`` (epoch seconds) has passed, or ``key`` is ``release``-d."""
+        future = asyncio.get_running_loop().create_future()
+        earliest = self._heap[0][0] if self._heap else None
+        heapq.heappush(self._heap, (due, next(self._seq), key, future))
+        if self._timer is None or self._timer.done():
+            self._changed = asyncio.Event()
+            self._timer = asyncio.create_task(self._run())
+        elif earliest is None or due < earliest:
+            self._changed.set()
+        try:
+            await future
+        finally:
+            future.cancel()
+
+    def release(self, key: Hashable) -> None:
+        """Let ``key`` go before it is due, e.g. because it was canceled."""
+        for *_, waiting, future in self._heap:
+            if waiting == key and not future.done():
+                future.set_result(None)
+        if self._changed is not None:
+            # Let the timer drop it, and stop if nothing else is held.
+            self._changed.set()
+
+    async def _run(self) -> None:
+        while self._heap:
+            while self._heap and self._heap[0][3].done():
+                heapq.heappop(self._heap)
+            now = time.time()
+            while self._heap and self._heap[0][0] <= now:
+                *_, future = heapq.heappop(self._heap)
+                if not future.done():
+                    future.set_result(None)
+                    self.released += 1
+            if not self._heap:
+                break
+            self._changed.clear()
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._changed.wait(), min(self.max_sleep, self._heap[0][0] - now))
+
+    def stats(self) -> dict[str, Any]:
+        waiting = [due for due, *_, future in self._heap if not future.done()]
+        return {
+            "held": len(waiting),
+            "released": self.released,
+            "next_due_in_seconds": round(max(0.0, min(waiting) - time.time()), 1) if waiting else None,
+        }
@@ -3,8 +3,10 @@ import shutil
 import yt_dlp
 import collections
 import collections.abc
+import contextlib
 import copy
 import glob
+import itertools
 import json
 import pickle
 from collections import OrderedDict
@@ -12,20 +14,30 @@ import time
 import asyncio
 import multiprocessing
 import subprocess
+import tempfile
 import threading
-from functools import partial
+from functools import lru_cache, partial
 import logging
 import re
+import signal
 import types
+import uuid
 from typing import Any, Optional
 
 import yt_dlp.networking.impersonate
 from yt_dlp.utils import STR_FORMAT_RE_TMPL, STR_FORMAT_TYPES
 from dl_formats import get_format, get_opts, AUDIO_FORMATS
+from bandwidth import BandwidthBudget, follow_shared_rate_limit
+from concurrency import AdaptiveConcurrency, Sample, disk_queue_depth
+from diskspace import HOLD_PREFIX, DiskAdmission, estimate_size, parse_size
+from health import HealthTracker
+from retry import PERMANENT, RetryPolicy, classify, host_of
+from extraction import ExtractionCache, ExtractionPool, ExtractionTimeout, RateLimiter, YoutubeDLPool, normalize_url
 from jellyfin_sync import JellyfinSyncError, refresh_jellyfin_library
 from datetime import datetime
 from state_store import AtomicJsonStore, from_json_compatible, read_legacy_shelf, to_json_compatible
-from subscriptions import _entry_id
+from scheduler import SOURCES, DownloadScheduler
+from timewindow import HOLD_PREFIX as SCHEDULED_PREFIX, ScheduledHolds, due_at
 
 log = logging.getLogger('ytdl')
 
@@ -34,6 +46,22 @@ log = logging.getLogger('ytdl')
 # sanitised when substituting playlist/channel titles into output templates so
 # that downloads do not fail on NTFS-mounted volumes or Windows Docker hosts.
 _WINDOWS_INVALID_PATH_CHARS = re.compile(r'[\\:*?"<>|]')
+# How often downloads held for disk space are reconsidered.
+_DISK_RECHECK_SECONDS = 10
+# Retry-After hint for adds rejected because the queue is full.
+_QUEUE_FULL_RETRY_AFTER_SECONDS = 60
+
+
+def entry_video_url(entry: dict) -> Optional[str]:
+    return entry.get("webpage_url") or entry.get("url")
+
+
+def entry_id(entry: dict) -> Optional[str]:
+    """The id of a playlist entry, falling back to its URL."""
+    eid = entry.get("id")
+    if eid is not None:
+        return str(eid)
+    return entry_video_url(entry)
 
 
 def _sanitize_path_component(value: Any) -> Any:
@@ -113,7 +141,18 @@ _OUTTMPL_FIELD_RE = re.compile(
 )
 
 
-def _resolve_outtmpl_fields(template: str, info_dict: dict, prefixes: tuple[str, ...]) -> str:
+@lru_cache(maxsize=64)
+def _outtmpl_references(template: str, prefixes: tuple[str, ...]) -> bool:
+    """Return whether *template* references any field starting with one of *prefixes*."""
+    for match in _OUTTMPL_FIELD_RE.finditer(template):
+        key = match.group('key')
+        root = re.match(r'\w+', key) if key is not None else None
+        if root is not None and root.group(0).startswith(prefixes):
+            return True
+    return False
+
+
+def _resolve_outtmpl_fields(template: str, info_dict: dict, prefixes: tuple[str, ...], ydl=None) -> str:
     """Resolve specific fields in an output template using yt-dlp's template engine.
 
     Only field references whose root name starts with one of *prefixes* are
@@ -123,24 +162,240 @@ def _resolve_outtmpl_fields(template: str, info_dict: dict, prefixes: tuple[str,
     This delegates to ``YoutubeDL.evaluate_outtmpl`` for each targeted field
     reference, giving access to the full yt-dlp template syntax (defaults,
     conditional formatting, math operations, datetime formatting, etc.).
+    Callers resolving many entries can pass a shared *ydl* instance.
     """
     matches = list(_OUTTMPL_FIELD_RE.finditer(template))
     if not matches:
         return template
 
-    with yt_dlp.YoutubeDL({'quiet': True}) as ydl:
-        for match in reversed(matches):
-            key = match.group('key')
-            if key is None:
-                continue
-            root = re.match(r'\w+', key)
-            if root is None or not root.group(0).startswith(prefixes):
-                continue
-            resolved = ydl.evaluate_outtmpl(match.group(0), info_dict)
-            template = template[:match.start()] + resolved + template[match.end():]
+    if ydl is None:
+        with yt_dlp.YoutubeDL({'quiet': True}) as ydl:
+            return _resolve_outtmpl_fields(template, info_dict, prefixes, ydl)
+
+    for match in reversed(matches):
+        key = match.group('key')
+        if key is None:
+            continue
+        root = re.match(r'\w+', key)
+        if root is None or not root.group(0).startswith(prefixes):
+            continue
+        resolved = ydl.evaluate_outtmpl(match.group(0), info_dict)
+        template = template[:match.start()] + resolved + template[match.end():]
 
     return template
 
+class _OuttmplResolver:
+    """Resolve playlist/channel template fields for many entries with one YoutubeDL.
+
+    With a *ydl_pool* the instance is borrowed from the pool and returned on
+    ``close`` instead of being built for every batch.
+    """
+
+    def __init__(self, ydl_pool=None):
+        self._ydl_pool = ydl_pool
+        self._ydl = None
+        self._release = None
+
+    def __call__(self, template: str, entry: dict, prefix: str) -> str:
+        if not _outtmpl_references(template, (prefix,)):
+            return template
+        if self._ydl is None:
+            if self._ydl_pool is not None:
+                self._release = contextlib.ExitStack()
+                self._ydl = self._release.enter_context(self._ydl_pool.acquire({'quiet': True}))
+            else:
+                self._ydl = yt_dlp.YoutubeDL({'quiet': True})
+        sanitized = {k: _sanitize_path_component(v) for k, v in entry.items()}
+        return _resolve_outtmpl_fields(template, sanitized, (prefix,), self._ydl)
+
+    def close(self):
+        if self._release is not None:
+            self._release.close()
+            self._release = None
+        elif self._ydl is not None:
+            self._ydl.close()
+        self._ydl = None
+
+
+def _playlist_extract_params(playlist_item_limit: int, playlist_range: Optional[dict] = None) -> dict:
+    """Translate an item limit and requested range into yt-dlp playlist params.
+
+    Passing these to extraction lets yt-dlp stop paginating once the requested
+    items are known instead of listing the whole playlist or channel.
+    """
+    playlist_range = playlist_range or {}
+    params = {}
+    start = playlist_range.get('start')
+    end = playlist_range.get('end')
+    step = playlist_range.get('step')
+    if playlist_range.get('items'):
+        params['playlist_items'] = playlist_range['items']
+    elif step and step != 1:
+        params['playlist_items'] = f"{start or 1}:{end or ''}:{step}"
+    else:
+        if start:
+            params['playliststart'] = start
+        if end:
+            params['playlistend'] = end
+    if playlist_item_limit > 0 and 'playlist_items' not in params:
+        limit_end = params.get('playliststart', 1) + playlist_item_limit - 1
+        params['playlistend'] = min(params.get('playlistend', limit_end), limit_end)
+    if playlist_range.get('dateafter') or playlist_range.get('datebefore'):
+        params['daterange'] = yt_dlp.utils.DateRange(playlist_range.get('dateafter'), playlist_range.get('datebefore'))
+    return params
+
+
+def _needs_strict_extract_retry(entry):
+    if not isinstance(entry, dict):
+        return False
+    etype = entry.get('_type') or 'video'
+    if etype != 'video':
+        return False
+    formats = entry.get('formats')
+    if formats is None or formats:
+        return False
+    return bool(entry.get('id') or entry.get('url') or entry.get('webpage_url'))
+
+
+def _acquire_ydl(params, ydl_pool=None):
+    return ydl_pool.acquire(params) if ydl_pool is not None else yt_dlp.YoutubeDL(params=params)
+
+
+def _strict_extract_info(url, params, ydl_pool=None):
+    strict_params = {
+        **params,
+        'extract_flat': False,
+        'ignore_no_formats_error': False,
+    }
+    with _acquire_ydl(strict_params, ydl_pool) as ydl:
+        return ydl.extract_info(url, download=False)
+
+
+def _extract_info(url, params, ydl_pool=None):
+    """Flat-extract ``url`` with ``params``, retrying strictly when flat mode hid an error."""
+    from extractors.streamingcommunity import StreamingCommunityExtractor
+
+    if StreamingCommunityExtractor.can_extract(url):
+        entry = StreamingCommunityExtractor.extract_info(url)
+        if entry:
+            return entry
+
+    with _acquire_ydl(params, ydl_pool) as ydl:
+        entry = ydl.extract_info(url, download=False)
+    if _needs_strict_extract_retry(entry):
+        return _strict_extract_info(url, params, ydl_pool)
+    return entry
+
+
+def _extract_info_streaming(url, params, ydl_pool=None):
+    """Extract ``url`` without resolving playlist entries up front.
+
+    Returns ``(entry, items)``. For playlists ``items`` is a lazy iterator
+    of ``(playlist_index, entry)`` pairs that fetches further pages as it
+    is consumed; for anything else it is None and ``entry`` matches what
+    ``_extract_info`` returns.
+    """
+    from extractors.streamingcommunity import StreamingCommunityExtractor
+
+    if StreamingCommunityExtractor.can_extract(url):
+        return _extract_info(url, params, ydl_pool), None
+
+    with contextlib.ExitStack() as stack:
+        ydl = stack.enter_context(_acquire_ydl(params, ydl_pool))
+        ie_result = ydl.extract_info(url, download=False, process=False)
+        # Follow plain redirects (e.g. a channel URL pointing at its videos tab)
+        # without letting yt-dlp resolve the target playlist eagerly.
+        for _ in range(5):
+            if ie_result.get('_type') != 'url':
+                break
+            ie_result = ydl.extract_info(ie_result['url'], download=False, process=False, ie_key=ie_result.get('ie_key'))
+        if ie_result.get('_type') == 'playlist':
+            # The iterator keeps paging with this instance, so it is released
+            # (back to the pool) only once the listing has been consumed.
+            items = yt_dlp.utils.PlaylistEntries(ydl, ie_result).get_requested_items()
+            return ie_result, _release_after(stack.pop_all(), _matching_items(ydl, items))
+        entry = ydl.process_ie_result(ie_result, download=False)
+    if _needs_strict_extract_retry(entry):
+        return _strict_extract_info(url, params, ydl_pool), None
+    return entry, None
+
+
+def _resolve_info(url, params, ydl_pool=None):
+    """Fully extract a single video ahead of its download.
+
+    Returns the unprocessed info_dict in JSON-safe form, leaving format
+    selection to the download worker, or None when ``url`` is not a video.
+    """
+    with _acquire_ydl(params, ydl_pool) as ydl:
+        ie_result = ydl.extract_info(url, download=False, process=False)
+        for _ in range(5):
+            if ie_result.get('_type') != 'url':
+                break
+            ie_result = ydl.extract_info(ie_result['url'], download=False, process=False, ie_key=ie_result.get('ie_key'))
+    if ie_result.get('_type', 'video') != 'video':
+        return None
+    return yt_dlp.YoutubeDL.sanitize_info(ie_result)
+
+
+# Bulky info_dict fields that adding to the queue never reads; the download
+# worker extracts them again anyway.
+_COMPACT_DROP_KEYS = frozenset((
+    'formats', 'requested_formats', 'requested_downloads', 'thumbnails', 'subtitles',
+    'automatic_captions', 'heatmap', 'http_headers', 'fragments',
+))
+
+
+def _compact_info(info):
+    """Strip ``info`` down to what queueing needs, in a form that pickles."""
+    if not isinstance(info, dict):
+        return _sanitize_entry_for_pickle(info)
+    compact = {k: v for k, v in info.items() if k not in _COMPACT_DROP_KEYS}
+    if isinstance(compact.get('entries'), collections.abc.Iterable):
+        compact['entries'] = [_compact_info(e) for e in compact['entries']]
+    return _sanitize_entry_for_pickle(compact)
+
+
+def _extract_info_compact(url, params):
+    """``_extract_info`` for extraction worker processes."""
+    return _compact_info(_extract_info(url, params))
+
+
+def _extract_info_streaming_compact(url, params):
+    """``_extract_info_streaming`` for extraction worker processes."""
+    entry, items = _extract_info_streaming(url, params)
+    if items is not None:
+        items = ((index, _compact_info(etr)) for index, etr in items)
+        entry = {k: v for k, v in entry.items() if k != 'entries'}
+    return _compact_info(entry), items
+
+
+def _matching_items(ydl, items):
+    """Yield the playlist *items* that pass yt-dlp's entry filters.
+
+    yt-dlp applies ``daterange``, the title and view count filters and the
+    download archive while it processes a playlist; a listing read lazily
+    never gets there, so the same check runs here.
+    """
+    for index, entry in items:
+        if isinstance(entry, dict):
+            try:
+                if ydl._match_entry(entry, incomplete=True, silent=True) is not None:
+                    continue
+            except (yt_dlp.utils.ExistingVideoReached, yt_dlp.utils.RejectedVideoReached):
+                return
+        yield index, entry
+
+
+def _release_after(stack: contextlib.ExitStack, items):
+    """Yield from *items*, closing *stack* once they are exhausted or abandoned."""
+    with stack:
+        yield from items
+
+
+def _take(iterator, count: int) -> list:
+    return list(itertools.islice(iterator, count))
+
+
 _MAX_ENTRY_SANITIZE_DEPTH = 64
 
 
@@ -231,6 +486,16 @@ class DownloadQueueNotifier:
     async def cleared(self, id):
         raise NotImplementedError
 
+    async def added_batch(self, dls):
+        for dl in dls:
+            await self.added(dl)
+
+    async def add_job_progress(self, job):
+        pass
+
+    async def health_changed(self, breakers):
+        pass
+
 class DownloadInfo:
     def __init__(
         self,
@@ -252,6 +517,8 @@ class DownloadInfo:
         subtitle_mode="prefer_manual",
         ytdl_options_presets=None,
         ytdl_options_overrides=None,
+        source="ui",
+        priority=0,
     ):
         self.id = id if len(custom_name_prefix) == 0 else f'{custom_name_prefix}.{id}'
         self.title = title if len(custom_name_prefix) == 0 else f'{custom_name_prefix}.{title}'
@@ -282,6 +549,14 @@ class DownloadInfo:
         self.ytdl_options_presets = list(ytdl_options_presets or [])
         self.ytdl_options_overrides = dict(ytdl_options_overrides or {})
         self.subtitle_files = []
+        self.source = source
+        self.priority = priority
+        self.restart_count = 0
+        self.retry_count = 0
+        # Normalized time windows (timewindow.parse_windows) the download may
+        # start in, and the epoch time it may start at, if scheduled.
+        self.window = None
+        self.start_at = None
 
     def __setstate__(self, state):
         """BACKWARD COMPATIBILITY: migrate old DownloadInfo from persistent queue files."""
@@ -359,6 +634,18 @@ class DownloadInfo:
             self.fragment_index = None
         if not hasattr(self, "fragment_count"):
             self.fragment_count = None
+        if not hasattr(self, "source"):
+            self.source = "ui"
+        if not hasattr(self, "priority"):
+            self.priority = 0
+        if not hasattr(self, "restart_count"):
+            self.restart_count = 0
+        if not hasattr(self, "retry_count"):
+            self.retry_count = 0
+        if not hasattr(self, "window"):
+            self.window = None
+        if not hasattr(self, "start_at"):
+            self.start_at = None
 
 
 _PERSISTED_DOWNLOAD_FIELDS = (
@@ -385,6 +672,12 @@ _PERSISTED_DOWNLOAD_FIELDS = (
     "filename",
     "size",
     "chapter_files",
+    "source",
+    "priority",
+    "restart_count",
+    "retry_count",
+    "window",
+    "start_at",
 )
 
 
@@ -473,6 +766,10 @@ class Download:
         )
         if "impersonate" in self.ytdl_opts:
             self.ytdl_opts["impersonate"] = yt_dlp.networking.impersonate.ImpersonateTarget.from_str(self.ytdl_opts["impersonate"])
+        self._reset()
+
+    def _reset(self):
+        """Initialize the state of one run of the worker process."""
         self.canceled = False
         self.tmpfilename = None
         self.status_queue = None
@@ -480,6 +777,63 @@ class Download:
         self.loop = None
         self.notifier = None
         self._progress_source = None
+        # Unprocessed info_dict extracted ahead of time by DownloadQueue while
+        # this download waited for a slot, and when (time.time()) it was taken.
+        self.resolved_info = None
+        self.resolved_at = None
+        # Shared multiprocessing.Value with this download's share of the
+        # global bandwidth limit, when one is configured.
+        self.rate_limit = None
+        # time.monotonic() of the start and of the last sign of progress, and
+        # why the stall watchdog killed the worker, if it did.
+        self.started_at = None
+        self.last_progress_at = None
+        self.stalled = None
+
+    def restarted(self):
+        """A fresh, unstarted copy of this download; a worker process cannot be started twice."""
+        clone = copy.copy(self)
+        clone._reset()
+        return clone
+
+    def ytdl_params(self):
+        """yt-dlp params for this download, without the progress hooks."""
+        debug_logging = logging.getLogger().isEnabledFor(logging.DEBUG)
+        params = {
+            'quiet': not debug_logging,
+            'verbose': debug_logging,
+            'no_color': True,
+            'paths': {"home": self.download_dir, "temp": self.temp_dir},
+            'outtmpl': { "default": self.output_template, "chapter": self.output_template_chapter },
+            'format': self.format,
+            'socket_timeout': 30,
+            'ignore_no_formats_error': True,
+            **self.ytdl_opts,
+        }
+
+        # Add chapter splitting options if enabled
+        if self.info.split_by_chapters:
+            params['outtmpl']['chapter'] = self.info.chapter_template
+            params['postprocessors'] = [
+                *params.get('postprocessors', []),
+                {'key': 'FFmpegSplitChapters', 'force_keyframes': False},
+            ]
+        return params
+
+    def _download_resolved(self, ydl):
+        """Download from ``resolved_info`` instead of extracting the URL again.
+
+        yt-dlp falls back to the URL itself if the stored info no longer works
+        (e.g. its format URLs have expired).
+        """
+        with tempfile.NamedTemporaryFile(
+            'w', encoding='utf-8', suffix='.info.json', dir=self.temp_dir or None, delete=False,
+        ) as f:
+            json.dump(self.resolved_info, f)
+        try:
+            return ydl.download_with_info_file(f.name)
+        finally:
+            os.remove(f.name)
 
     def _download_streamingcommunity(self):
         is_streamingcommunity = (
@@ -816,9 +1170,14 @@ class Download:
         return 1
 
     def _download(self):
+        if hasattr(os, 'setpgrp'):
+            # Lead a process group, so that killing the worker also stops the
+            # ffmpeg or N_m3u8DL-RE processes it started.
+            os.setpgrp()
         log.info(f"Starting download for: {self.info.title} ({self.info.url})")
         try:
-            debug_logging = logging.getLogger().isEnabledFor(logging.DEBUG)
+            if self.rate_limit is not None:
+                follow_shared_rate_limit(self.rate_limit, self.ytdl_opts.get('ratelimit'))
             def put_status(st):
                 self.status_queue.put({k: v for k, v in st.items() if k in (
                     'tmpfilename',
@@ -864,32 +1223,18 @@ class Download:
                         log.warning("SplitChapters finished but no chapter files found in info_dict")
 
             ytdl_params = {
-                'quiet': not debug_logging,
-                'verbose': debug_logging,
-                'no_color': True,
-                'paths': {"home": self.download_dir, "temp": self.temp_dir},
-                'outtmpl': { "default": self.output_template, "chapter": self.output_template_chapter },
-                'format': self.format,
-                'socket_timeout': 30,
-                'ignore_no_formats_error': True,
+                **self.ytdl_params(),
                 'progress_hooks': [put_status],
                 'postprocessor_hooks': [put_status_postprocessor],
-                **self.ytdl_opts,
             }
 
-            # Add chapter splitting options if enabled
-            if self.info.split_by_chapters:
-                ytdl_params['outtmpl']['chapter'] = self.info.chapter_template
-                if 'postprocessors' not in ytdl_params:
-                    ytdl_params['postprocessors'] = []
-                ytdl_params['postprocessors'].append({
-                    'key': 'FFmpegSplitChapters',
-                    'force_keyframes': False
-                })
-
             ret = self._download_streamingcommunity()
             if ret is None:
-                ret = yt_dlp.YoutubeDL(params=ytdl_params).download([self.info.url])
+                ydl = yt_dlp.YoutubeDL(params=ytdl_params)
+                if self.resolved_info is not None:
+                    ret = self._download_resolved(ydl)
+                else:
+                    ret = ydl.download([self.info.url])
                 self.status_queue.put({'status': 'finished' if ret == 0 else 'error'})
             elif ret == 0:
                 self.status_queue.put({'status': 'finished'})
@@ -908,6 +1253,7 @@ class Download:
         self.status_queue = Download.manager.Queue()
         self.proc = multiprocessing.Process(target=self._download)
         self.proc.start()
+        self.started_at = self.last_progress_at = time.monotonic()
         self.loop = asyncio.get_running_loop()
         self.notifier = notifier
         self.info.status = 'preparing'
@@ -921,11 +1267,29 @@ class Download:
             self.status_queue.put(None)
         await self.status_task
 
+    def kill_stalled(self, reason):
+        """Kill the worker but keep the partial file so the next attempt can resume it."""
+        log.warning(f"Killing stalled download {self.info.title}: {reason}")
+        self.stalled = reason
+        if self.running():
+            try:
+                self._kill_worker()
+            except Exception as e:
+                log.error(f"Error killing process for {self.info.title}: {e}")
+
+    def _kill_worker(self):
+        """Kill the worker and the external downloaders it runs."""
+        try:
+            os.killpg(self.proc.pid, signal.SIGKILL)
+        except (AttributeError, OSError):
+            # No process groups here, or the worker has not set up its own yet.
+            self.proc.kill()
+
     def cancel(self):
         log.info(f"Cancelling download: {self.info.title}")
         if self.running():
             try:
-                self.proc.kill()
+                self._kill_worker()
             except Exception as e:
                 log.error(f"Error killing process for {self.info.title}: {e}")
         self.canceled = True
@@ -955,6 +1319,8 @@ class Download:
             if self.canceled:
                 log.info(f"Download {self.info.title} is canceled; stopping status updates.")
                 return
+            if status.get('status') != 'downloading' or status.get('downloaded_bytes') != self.info.downloaded_bytes:
+                self.last_progress_at = time.monotonic()
             self.tmpfilename = status.get('tmpfilename')
             if 'filename' in status:
                 fileName = status.get('filename')
@@ -1143,6 +1509,17 @@ class PersistentQueue:
                 self.dict[key] = old
             raise
 
+    def put_many(self, values):
+        """Insert several downloads with a single write of the state file."""
+        previous = OrderedDict(self.dict)
+        for value in values:
+            self.dict[value.info.url] = value
+        try:
+            self._save_dict()
+        except Exception:
+            self.dict = previous
+            raise
+
     def delete(self, key):
         if key in self.dict:
             old = self.dict[key]
@@ -1160,7 +1537,59 @@ class PersistentQueue:
     def empty(self):
         return not bool(self.dict)
 
+class AddJob:
+    """Progress of one add request: extraction and playlist expansion.
+
+    Jobs are cancelled individually through ``canceled``; ``cancel_add``
+    still stops every job started before it by bumping the generation.
+    """
+
+    def __init__(self, url, generation, source='ui', priority=0, window=None, start_at=None):
+        self.id = uuid.uuid4().hex
+        self.url = url
+        self.generation = generation
+        # Stamped on every download the job queues, for the scheduler.
+        self.source = source
+        self.priority = priority
+        self.window = window
+        self.start_at = start_at
+        self.status = 'running'
+        self.msg = None
+        self.discovered = 0
+        self.queued = 0
+        self.failed = 0
+        self.canceled = False
+        self.created_at = time.time()
+        self.finished_at = None
+        self.stream_task = None
+
+    def finish(self, result):
+        if self.canceled:
+            self.status = 'canceled'
+        elif result.get('status') == 'error':
+            self.status = 'failed'
+        else:
+            self.status = 'completed'
+        self.msg = result.get('msg')
+        self.finished_at = time.time()
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'url': self.url,
+            'status': self.status,
+            'msg': self.msg,
+            'discovered': self.discovered,
+            'queued': self.queued,
+            'failed': self.failed,
+            'created_at': self.created_at,
+            'finished_at': self.finished_at,
+        }
+
+
 class DownloadQueue:
+    MAX_FINISHED_ADD_JOBS = 100
+
     def __init__(self, config, notifier):
         self.config = config
         self.notifier = notifier
@@ -1168,61 +1597,538 @@ class DownloadQueue:
         self.done = PersistentQueue("completed", self.config.STATE_DIR + '/completed')
         self.pending = PersistentQueue("pending", self.config.STATE_DIR + '/pending')
         self.active_downloads = set()
-        self.semaphore = asyncio.Semaphore(int(self.config.MAX_CONCURRENT_DOWNLOADS))
         # StreamingCommunity downloads each spawn N_m3u8DL-RE with SC_THREAD_COUNT
         # worker threads. Running several at once saturates CPU/disk/network and
         # makes N_m3u8DL-RE's mux step fail, which silently falls back to a lossy
-        # remux. Gate SC downloads with a dedicated, smaller semaphore (default 1).
-        self.sc_semaphore = asyncio.Semaphore(
-            max(1, int(self.config.SC_MAX_CONCURRENT_DOWNLOADS))
+        # remux, so they get a smaller pool of their own (default 1) unless
+        # DOWNLOAD_POOLS says otherwise.
+        self.disk = DiskAdmission(parse_size(self.config.DISK_SPACE_RESERVE))
+        # Downloads waiting for their start time or time window, kept out of
+        # the scheduler until they are due.
+        self.scheduled = ScheduledHolds()
+        self.scheduler = DownloadScheduler(
+            int(self.config.MAX_CONCURRENT_DOWNLOADS),
+            {
+                'streamingcommunity': max(1, int(self.config.SC_MAX_CONCURRENT_DOWNLOADS)),
+                **DownloadScheduler.parse_pools(self.config.DOWNLOAD_POOLS),
+            },
+            self.config.DOWNLOAD_SOURCE_WEIGHTS,
+            admission=self.__admit,
+        )
+        # Extractions get their own workers so a burst of adds cannot starve
+        # the default executor used by status readers and Jellyfin refreshes.
+        self.extraction = ExtractionPool(
+            int(self.config.EXTRACTION_WORKERS),
+            float(self.config.EXTRACTION_TIMEOUT_SECONDS),
+            ExtractionCache(
+                int(self.config.EXTRACTION_CACHE_SIZE),
+                float(self.config.EXTRACTION_CACHE_TTL_SECONDS),
+            ),
+            mode=self.config.EXTRACTION_MODE,
+            page_size=int(self.config.PLAYLIST_STREAM_CHUNK_SIZE),
+            rate_limiter=RateLimiter(self.config.EXTRACTION_RATE_LIMITS),
+        )
+        self.bandwidth = BandwidthBudget(self.config.BANDWIDTH_LIMIT, self.config.BANDWIDTH_SCHEDULE)
+        self.retry_policy = RetryPolicy(
+            int(self.config.DOWNLOAD_RETRY_ATTEMPTS),
+            float(self.config.DOWNLOAD_RETRY_BACKOFF_SECONDS),
+            float(self.config.DOWNLOAD_RETRY_MAX_BACKOFF_SECONDS),
+            float(self.config.HOST_COOLDOWN_SECONDS),
         )
+        self.health = HealthTracker(
+            int(self.config.CIRCUIT_BREAKER_WINDOW),
+            float(self.config.CIRCUIT_BREAKER_FAILURE_RATIO),
+            float(self.config.CIRCUIT_BREAKER_OPEN_SECONDS),
+            on_change=self.__health_changed,
+        )
+        self.concurrency = None
+        if self.config.ADAPTIVE_CONCURRENCY:
+            # Starts from MAX_CONCURRENT_DOWNLOADS and moves within the bounds.
+            self.concurrency = AdaptiveConcurrency(
+                self.scheduler,
+                self.__concurrency_sample,
+                int(self.config.ADAPTIVE_CONCURRENCY_MIN),
+                int(self.config.ADAPTIVE_CONCURRENCY_MAX),
+                float(self.config.ADAPTIVE_CONCURRENCY_INTERVAL_SECONDS),
+            )
+        # Long-lived YoutubeDL instances shared by extraction and template resolution.
+        self.ydl_pool = YoutubeDLPool(max_idle=int(self.config.EXTRACTION_WORKERS))
         self.done.load()
         self._add_generation = 0
         self._canceled_urls = set()  # URLs canceled during current playlist add
+        self._stream_tasks = set()  # background streaming playlist expansions
+        self._extractions = {}  # extraction task -> AddJob, for cancellation
+        self._add_jobs = OrderedDict()
+        # The first PRERESOLVE_AHEAD downloads waiting for a slot are fully
+        # extracted while they wait.
+        self._preresolving = {}  # url -> pre-resolution task
+        self._preresolve_started = set()  # urls whose pre-resolution got past the rate limiter
+        self._preresolve_counts = {'resolved': 0, 'used': 0, 'expired': 0, 'failed': 0, 'abandoned': 0}
+        self._watchdog_counts = {'stalled': 0, 'timed_out': 0, 'restarted': 0, 'gave_up': 0}
+        self._source_queue_limits = DownloadScheduler.parse_source_limits(self.config.QUEUE_SOURCE_LIMITS)
+        self._queue_full_rejections = 0
 
     def cancel_add(self):
         self._add_generation += 1
+        for extraction in self._extractions:
+            extraction.cancel()
         log.info('Playlist add operation canceled by user')
 
+    async def __cancellable(self, extraction, job):
+        """Await *extraction* so that canceling the add (or its job) abandons it.
+
+        In process extraction mode abandoning it also kills the worker.
+        """
+        task = asyncio.ensure_future(extraction)
+        self._extractions[task] = job
+        try:
+            return await task
+        finally:
+            del self._extractions[task]
+
+    def __add_canceled(self, job):
+        return job is not None and (job.canceled or job.generation != self._add_generation)
+
+    def get_add_job(self, job_id):
+        return self._add_jobs.get(job_id)
+
+    def cancel_add_job(self, job_id):
+        job = self._add_jobs.get(job_id)
+        if job is None:
+            return False
+        if job.status == 'running':
+            job.canceled = True
+            for extraction, owner in self._extractions.items():
+                if owner is job:
+                    extraction.cancel()
+            log.info(f'Add job {job_id} for {job.url} canceled by user')
+        return True
+
+    def start_add_job(self, url, *args, source='ui', priority=0, window=None, start_at=None, **kwargs):
+        """Run ``add`` in the background and return its ``AddJob`` right away."""
+        job = AddJob(url, self._add_generation, source, priority, window, start_at)
+        self._add_jobs[job.id] = job
+        finished = [k for k, j in self._add_jobs.items() if j.status != 'running']
+        for job_id in finished[:max(0, len(finished) - self.MAX_FINISHED_ADD_JOBS)]:
+            del self._add_jobs[job_id]
+
+        async def run():
+            try:
+                result = await self.add(url, *args, _add_job=job, source=source, priority=priority,
+                                        window=window, start_at=start_at, **kwargs)
+                if job.stream_task is not None:
+                    await job.stream_task
+            except Exception as exc:
+                log.exception(f'Add job {job.id} for {url} failed')
+                result = {'status': 'error', 'msg': str(exc)}
+            if self.__add_canceled(job):
+                job.canceled = True
+            job.finish(result)
+            await self.notifier.add_job_progress(job)
+
+        asyncio.create_task(run())
+        return job
+
     async def __import_queue(self):
-        for k, v in self.queue.saved_items():
-            await self.__add_download(v, True)
+        await self.__add_downloads([v for k, v in self.queue.saved_items()], True, enforce_cap=False)
 
     async def __import_pending(self):
-        for k, v in self.pending.saved_items():
-            await self.__add_download(v, False)
+        await self.__add_downloads([v for k, v in self.pending.saved_items()], False, enforce_cap=False)
+
+    def __queued_counts(self):
+        counts = collections.Counter(dl.info.source for dl in itertools.chain(self.queue.dict.values(), self.pending.dict.values()))
+        return sum(counts.values()), counts
+
+    def queue_room(self, source=None):
+        """How many more downloads may be queued or pending, overall and from
+        ``source``; None when neither is capped."""
+        limits = []
+        total, counts = self.__queued_counts()
+        if int(self.config.MAX_QUEUED_ITEMS) > 0:
+            limits.append(int(self.config.MAX_QUEUED_ITEMS) - total)
+        if source in self._source_queue_limits:
+            limits.append(self._source_queue_limits[source] - counts[source])
+        return max(0, min(limits)) if limits else None
+
+    def queue_full(self, source=None):
+        """The error status to answer an add with while the queue is full, else None."""
+        if self.queue_room(source) != 0:
+            return None
+        self._queue_full_rejections += 1
+        return {
+            'status': 'error',
+            'msg': f'The download queue is full; try again in {_QUEUE_FULL_RETRY_AFTER_SECONDS} seconds',
+            'retry_after': _QUEUE_FULL_RETRY_AFTER_SECONDS,
+        }
+
+    def queue_limit_stats(self):
+        total, counts = self.__queued_counts()
+        return {
+            'max_items': int(self.config.MAX_QUEUED_ITEMS),
+            'items': total,
+            'sources': {
+                source: {'limit': self._source_queue_limits.get(source), 'items': counts[source]}
+                for source in SOURCES
+            },
+            'rejected': self._queue_full_rejections,
+        }
 
     async def initialize(self):
         log.info("Initializing DownloadQueue")
         asyncio.create_task(self.__import_queue())
         asyncio.create_task(self.__import_pending())
+        if self.bandwidth.enabled:
+            asyncio.create_task(self.bandwidth.run())
+        if self.concurrency is not None:
+            asyncio.create_task(self.concurrency.run())
+        if self.disk.enabled:
+            asyncio.create_task(self.__watch_disk_space())
+        if float(self.config.DOWNLOAD_STALL_TIMEOUT_SECONDS) or float(self.config.DOWNLOAD_HARD_TIMEOUT_SECONDS):
+            asyncio.create_task(self.__watch_stalls())
+
+    def __concurrency_sample(self):
+        depths = [
+            depth for depth in (disk_queue_depth(path) for path in {self.config.TEMP_DIR, self.config.DOWNLOAD_DIR})
+            if depth is not None
+        ]
+        return Sample(
+            throughput=sum(download.info.speed or 0 for download in self.active_downloads),
+            active=self.scheduler.active,
+            waiting=len(self.scheduler.waiting()),
+            disk_queue=max(depths, default=None),
+        )
 
     @staticmethod
     def _is_streamingcommunity(download):
         entry = getattr(download.info, "entry", None)
         return bool(entry and "streamingcommunity" in str(entry.get("extractor", "")).lower())
 
+    @classmethod
+    def _follows_bandwidth_budget(cls, download):
+        """Whether the worker throttles through yt-dlp's own downloaders.
+
+        External programs (N_m3u8DL-RE and ffmpeg for StreamingCommunity, or an
+        ``external_downloader`` from the yt-dlp options) ignore the shared
+        limit, so they are left out of the budget instead of taking a share of
+        it that the others could use.
+        """
+        if cls._is_streamingcommunity(download):
+            return False
+        external = download.ytdl_opts.get('external_downloader')
+        if isinstance(external, dict):
+            return all(name == 'native' for name in external.values())
+        return not external or external == 'native'
+
     async def __start_download(self, download):
         if download.canceled:
             log.info(f"Download {download.info.title} was canceled, skipping start.")
             return
-        # Throttle StreamingCommunity downloads separately from the global pool.
-        # The SC semaphore is acquired OUTSIDE the global one so a waiting SC
-        # download does not hold a global slot while queued behind another SC
-        # download (which would block unrelated downloads).
-        if self._is_streamingcommunity(download):
-            async with self.sc_semaphore:
-                await self.__run_download(download)
-        else:
-            await self.__run_download(download)
-
-    async def __run_download(self, download):
-        async with self.semaphore:
+        entry = download.info.entry or {}
+        extractor = entry.get('extractor') or entry.get('ie_key')
+        health_key = self.health.key_for(download.info.url, extractor)
+        if not await self.__wait_for_schedule(download):
+            return
+        probe = await self.__wait_for_health(download, health_key)
+        if probe is None:
+            return
+        try:
+            await self.__run_download(download, extractor, health_key, probe)
+        finally:
+            # No-op once the probe's result was recorded.
+            if probe:
+                self.health.abandon(health_key)
+
+    async def __wait_for_schedule(self, download):
+        """Hold ``download`` until its start time and inside its time window.
+        Returns False if it was canceled meanwhile."""
+        info = download.info
+        held = False
+        while (due := due_at(info.window, info.start_at)) is not None:
+            held = True
+            info.status = 'waiting'
+            if due == info.start_at:
+                info.msg = f'{SCHEDULED_PREFIX} to start at {datetime.fromtimestamp(due):%Y-%m-%d %H:%M}'
+            else:
+                info.msg = f'{SCHEDULED_PREFIX} for its time window, which opens {datetime.fromtimestamp(due):%a %H:%M}'
+            await self.notifier.updated(info)
+            await self.scheduled.wait(download, due)
+            if download.canceled:
+                return False
+        if held:
+            info.status = 'pending'
+            info.msg = None
+            await self.notifier.updated(info)
+        return True
+
+    async def __wait_for_health(self, download, key):
+        """Hold ``download`` while the circuit breaker for its extractor is open.
+        Returns whether it goes as the probe, or None if it was canceled meanwhile."""
+        if not self.health.blocked(key):
+            return await self.health.admit(key)
+        info = download.info
+        info.status = 'waiting'
+        info.msg = f'Downloads from {key} are failing; waiting for it to recover'
+        await self.notifier.updated(info)
+        probe = await self.health.admit(key)
+        if download.canceled:
+            if probe:
+                self.health.abandon(key)
+            return None
+        info.status = 'pending'
+        info.msg = f'Checking whether {key} has recovered' if probe else None
+        await self.notifier.updated(info)
+        return probe
+
+    async def __run_download(self, download, extractor, health_key, probe):
+        pool = self.scheduler.pool_for(download.info.url, extractor)
+        host = host_of(download.info.url)
+        info = download.info
+        cooled_down = False
+        while (cooldown := self.retry_policy.cooldown_remaining(host)) > 0:
+            # The site throttled us recently; don't hold a slot while it cools down.
+            cooled_down = True
+            info.status = 'waiting'
+            info.msg = f'{host} is cooling down after rate limiting; retrying in {cooldown:.0f}s'
+            await self.notifier.updated(info)
+            await asyncio.sleep(cooldown)
             if download.canceled:
-                log.info(f"Download {download.info.title} was canceled, skipping start.")
                 return
-            await download.start(self.notifier)
-            self._post_download_cleanup(download)
+        if cooled_down:
+            info.status = 'pending'
+            info.msg = None
+            await self.notifier.updated(info)
+        # Deferred so that a download which gets a slot right away is never pre-resolved.
+        asyncio.get_running_loop().call_soon(self.__preresolve_ahead)
+        try:
+            async with self.scheduler.slot(download, pool, download.info.source, download.info.priority):
+                try:
+                    self.__preresolve_ahead()
+                    if download.canceled:
+                        log.info(f"Download {download.info.title} was canceled, skipping start.")
+                        return
+                    await self.__take_preresolved(download)
+                    if self.bandwidth.enabled and self._follows_bandwidth_budget(download):
+                        download.rate_limit = self.bandwidth.add(download, lambda: download.info.speed)
+                    self.active_downloads.add(download)
+                    try:
+                        await download.start(self.notifier)
+                    finally:
+                        self.active_downloads.discard(download)
+                        self.bandwidth.remove(download)
+                finally:
+                    # Before the slot goes, so held downloads see the space.
+                    self.disk.release(download)
+                if not download.canceled:
+                    self.__record_health(download, health_key, probe)
+                    if download.stalled is not None:
+                        if self.__restart_stalled(download):
+                            return
+                    elif download.info.status == 'error' and self.__retry_failed(download):
+                        return
+                self._post_download_cleanup(download)
+        finally:
+            # The claim is made when the slot is granted; a task canceled
+            # while waiting for it, or just as it came, still holds one.
+            self.disk.release(download)
+
+    def __admit(self, download, context):
+        """Scheduler admission: hold downloads that would not fit on disk."""
+        if download.canceled or not self.disk.enabled:
+            return True
+        info = download.info
+        size, _ = estimate_size(download.resolved_info or info.entry, info.download_type)
+        paths = [p for p in (download.download_dir, download.temp_dir) if p]
+        reason = self.disk.claim(download, paths, size, lambda: info.downloaded_bytes, context)
+        if reason is None:
+            if info.msg and info.msg.startswith(HOLD_PREFIX):
+                info.msg = None
+            return True
+        if info.msg != reason:
+            info.msg = reason
+            asyncio.create_task(self.notifier.updated(info))
+        return False
+
+    async def __watch_disk_space(self):
+        # Held downloads are admitted as soon as space frees up, not only when
+        # another download finishes.
+        while True:
+            await asyncio.sleep(_DISK_RECHECK_SECONDS)
+            if self.disk.held:
+                self.scheduler.kick()
+
+    def __record_health(self, download, key, probe):
+        status = download.info.status
+        if download.stalled is not None:
+            self.health.record(key, False, probe)
+        elif status == 'finished':
+            self.health.record(key, True, probe)
+        elif status == 'error' and classify(download.info.msg) != PERMANENT:
+            # A private or removed video says nothing about the extractor.
+            self.health.record(key, False, probe)
+
+    def __restart_stalled(self, download):
+        """Re-queue a download killed by the watchdog after a backoff, keeping its
+        partial file. Returns False once it has used up its restarts."""
+        info = download.info
+        if info.restart_count >= int(self.config.DOWNLOAD_MAX_RESTARTS):
+            info.msg = f'{download.stalled}; gave up after {info.restart_count} restart(s)'
+            self._watchdog_counts['gave_up'] += 1
+            return False
+        info.restart_count += 1
+        self._watchdog_counts['restarted'] += 1
+        if self.concurrency is not None:
+            self.concurrency.record_result(False, download.stalled)
+        delay = float(self.config.DOWNLOAD_RESTART_BACKOFF_SECONDS) * 2 ** (info.restart_count - 1)
+        self.__requeue(download, delay, f'{download.stalled}; restarting in {delay:g}s (attempt {info.restart_count})')
+        return True
+
+    def __retry_failed(self, download):
+        """Re-queue a download whose error looks transient. Returns False for
+        permanent errors and once the retries are used up."""
+        info = download.info
+        delay = self.retry_policy.decide(info.msg, info.retry_count + 1, host_of(info.url))
+        if delay is None:
+            return False
+        info.retry_count += 1
+        if self.concurrency is not None:
+            self.concurrency.record_result(False, info.msg)
+        log.info(f'Retrying {info.title} in {delay:.0f}s after: {info.msg}')
+        self.__requeue(download, delay, f'{info.msg}; retrying in {delay:.0f}s (attempt {info.retry_count} of {self.retry_policy.max_attempts})')
+        return True
+
+    def __requeue(self, download, delay, msg):
+        """Put a fresh copy of ``download`` back in the queue and start it after ``delay`` seconds."""
+        info = download.info
+        info.status = 'retrying'
+        info.msg = msg
+        info.percent = info.speed = info.eta = None
+        download.close()
+        retry = download.restarted()
+        self.queue.put(retry)
+        asyncio.create_task(self.notifier.updated(info))
+
+        partial = download.tmpfilename
+
+        async def restart():
+            await asyncio.sleep(delay)
+            if not retry.canceled and self.queue.exists(info.url) and self.queue.get(info.url) is retry:
+                info.status = 'pending'
+                await self.notifier.updated(info)
+                await self.__start_download(retry)
+            elif partial and os.path.isfile(partial):
+                # Canceled while backing off; nothing will resume the file.
+                try:
+                    os.remove(partial)
+                except OSError:
+                    pass
+
+        asyncio.create_task(restart())
+
+    def __check_stalled(self):
+        stall_timeout = float(self.config.DOWNLOAD_STALL_TIMEOUT_SECONDS)
+        hard_timeout = float(self.config.DOWNLOAD_HARD_TIMEOUT_SECONDS)
+        now = time.monotonic()
+        for download in list(self.active_downloads):
+            if download.started_at is None or download.stalled is not None or download.canceled:
+                continue
+            # Post-processing (merging, remuxing) reports no progress while it runs.
+            if stall_timeout and download.info.status in ('preparing', 'downloading') \
+                    and now - download.last_progress_at > stall_timeout:
+                download.kill_stalled(f'No progress for {int(now - download.last_progress_at)}s')
+                self._watchdog_counts['stalled'] += 1
+            # Once the file is downloaded ('finished'), only post-processing is left.
+            elif hard_timeout and download.info.status != 'finished' and now - download.started_at > hard_timeout:
+                download.kill_stalled(f'Still running after {int(now - download.started_at)}s')
+                self._watchdog_counts['timed_out'] += 1
+
+    async def __watch_stalls(self):
+        timeouts = [float(t) for t in (self.config.DOWNLOAD_STALL_TIMEOUT_SECONDS, self.config.DOWNLOAD_HARD_TIMEOUT_SECONDS) if float(t)]
+        while True:
+            await asyncio.sleep(min(15.0, min(timeouts) / 4))
+            self.__check_stalled()
+
+    def __preresolve_ahead(self):
+        """Start full extractions for the next PRERESOLVE_AHEAD downloads waiting for a slot."""
+        candidates = (
+            download for download in self.scheduler.waiting()
+            if not download.canceled and not self._is_streamingcommunity(download)
+        )
+        for download in itertools.islice(candidates, int(self.config.PRERESOLVE_AHEAD)):
+            url = download.info.url
+            if url not in self._preresolving and download.resolved_info is None:
+                self._preresolving[url] = asyncio.create_task(self.__preresolve(download))
+
+    async def __preresolve(self, download):
+        url = download.info.url
+        on_start = partial(self._preresolve_started.add, url)
+        try:
+            params = download.ytdl_params()
+            if self.extraction.mode == 'process':
+                info = await self.extraction.run(None, _resolve_info, url, params, url=url, on_start=on_start)
+            else:
+                info = await self.extraction.run(None, _resolve_info, url, params, self.ydl_pool, url=url, on_start=on_start)
+        except Exception as exc:
+            self._preresolve_counts['failed'] += 1
+            log.debug(f'Pre-resolving {url} failed, its download will extract it instead: {exc}')
+            return
+        finally:
+            if self._preresolving.get(url) is asyncio.current_task():
+                del self._preresolving[url]
+                self._preresolve_started.discard(url)
+        if info is not None and not download.canceled:
+            download.resolved_info = info
+            download.resolved_at = time.time()
+            self._preresolve_counts['resolved'] += 1
+
+    async def __take_preresolved(self, download):
+        """Keep ``download.resolved_info`` for the worker only while it is fresh.
+
+        An extraction already running for this download is awaited, since
+        finishing it is quicker than the worker starting over. One still
+        queued for a rate limit token is dropped instead, so the slot does not
+        sit idle through the wait.
+        """
+        url = download.info.url
+        task = self._preresolving.get(url)
+        limiter = self.extraction.rate_limiter
+        queued = url not in self._preresolve_started and limiter is not None and limiter.would_wait(url)
+        if task is not None and not queued:
+            await asyncio.wait({task})
+        elif task is not None:
+            task.cancel()
+            del self._preresolving[url]
+            self._preresolve_counts['abandoned'] += 1
+        if download.resolved_info is None:
+            return
+        if time.time() - download.resolved_at > float(self.config.PRERESOLVE_TTL_SECONDS):
+            # Format URLs expire; let the worker extract again.
+            download.resolved_info = download.resolved_at = None
+            self._preresolve_counts['expired'] += 1
+        else:
+            self._preresolve_counts['used'] += 1
+
+    def preresolve_stats(self):
+        return {
+            'ahead': int(self.config.PRERESOLVE_AHEAD),
+            'ttl_seconds': float(self.config.PRERESOLVE_TTL_SECONDS),
+            'waiting': len(self.scheduler.waiting()),
+            'in_flight': len(self._preresolving),
+            **self._preresolve_counts,
+        }
+
+    def watchdog_stats(self):
+        return {
+            'stall_timeout_seconds': float(self.config.DOWNLOAD_STALL_TIMEOUT_SECONDS),
+            'hard_timeout_seconds': float(self.config.DOWNLOAD_HARD_TIMEOUT_SECONDS),
+            'max_restarts': int(self.config.DOWNLOAD_MAX_RESTARTS),
+            **self._watchdog_counts,
+        }
+
+    def __health_changed(self, key, state):
+        asyncio.create_task(self.notifier.health_changed(self.health.snapshot()))
+
+    def retry_stats(self):
+        return self.retry_policy.stats()
 
     def _post_download_cleanup(self, download):
         if download.info.status != 'finished':
@@ -1232,7 +2138,10 @@ class DownloadQueue:
                 except OSError:
                     pass
             download.info.status = 'error'
+        if self.concurrency is not None and not download.canceled:
+            self.concurrency.record_result(download.info.status == 'finished', download.info.msg or download.info.error)
         download.close()
+        download.resolved_info = download.resolved_at = None
         if self.queue.exists(download.info.url):
             self.queue.delete(download.info.url)
             if download.canceled:
@@ -1313,30 +2222,26 @@ class DownloadQueue:
         opts.update(ytdl_options_overrides or {})
         return opts
 
-    @staticmethod
-    def __needs_strict_extract_retry(entry):
-        if not isinstance(entry, dict):
-            return False
-        etype = entry.get('_type') or 'video'
-        if etype != 'video':
-            return False
-        formats = entry.get('formats')
-        if formats is None or formats:
-            return False
-        return bool(entry.get('id') or entry.get('url') or entry.get('webpage_url'))
-
-    def __extract_info(self, url, ytdl_options_presets=None, ytdl_options_overrides=None):
-        from extractors.streamingcommunity import StreamingCommunityExtractor
-
-        if StreamingCommunityExtractor.can_extract(url):
-            entry = StreamingCommunityExtractor.extract_info(url)
-            if entry:
-                return entry
+    def __extract_info(self, url, ytdl_options_presets=None, ytdl_options_overrides=None, playlist_params=None):
+        params = self.__extract_params(ytdl_options_presets, ytdl_options_overrides, playlist_params)
+        return _extract_info(url, params, self.ydl_pool)
+
+    def __extraction_key(self, url, ytdl_options_presets, ytdl_options_overrides, playlist_params):
+        # Keyed on the merged options rather than preset names, so edits to
+        # YTDL_OPTIONS or a preset never serve results extracted under old options.
+        options = json.dumps(
+            [self._build_ytdl_options(ytdl_options_presets, ytdl_options_overrides), playlist_params or {}],
+            sort_keys=True,
+            default=str,
+        )
+        return normalize_url(url), options
 
+    def __extract_params(self, ytdl_options_presets=None, ytdl_options_overrides=None, playlist_params=None):
         debug_logging = logging.getLogger().isEnabledFor(logging.DEBUG)
         user_opts = self._build_ytdl_options(ytdl_options_presets, ytdl_options_overrides)
         params = {
             **user_opts,
+            **(playlist_params or {}),
             'quiet': not debug_logging,
             'verbose': debug_logging,
             'no_color': True,
@@ -1348,15 +2253,11 @@ class DownloadQueue:
         imp = user_opts.get('impersonate')
         if imp is not None:
             params['impersonate'] = yt_dlp.networking.impersonate.ImpersonateTarget.from_str(imp)
-        entry = yt_dlp.YoutubeDL(params=params).extract_info(url, download=False)
-        if self.__needs_strict_extract_retry(entry):
-            strict_params = {
-                **params,
-                'extract_flat': False,
-                'ignore_no_formats_error': False,
-            }
-            return yt_dlp.YoutubeDL(params=strict_params).extract_info(url, download=False)
-        return entry
+        return params
+
+    def __extract_info_streaming(self, url, ytdl_options_presets=None, ytdl_options_overrides=None, playlist_params=None):
+        params = self.__extract_params(ytdl_options_presets, ytdl_options_overrides, playlist_params)
+        return _extract_info_streaming(url, params, self.ydl_pool)
 
     def __calc_download_path(self, download_type, folder):
         base_directory = self.config.AUDIO_DOWNLOAD_DIR if download_type == 'audio' else self.config.DOWNLOAD_DIR
@@ -1375,42 +2276,121 @@ class DownloadQueue:
             dldirectory = base_directory
         return dldirectory, None
 
-    async def __add_download(self, dl, auto_start):
-        dldirectory, error_message = self.__calc_download_path(dl.download_type, dl.folder)
-        if error_message is not None:
-            return error_message
+    def __output_template(self, dl, resolve_outtmpl):
         output = self.config.OUTPUT_TEMPLATE if len(dl.custom_name_prefix) == 0 else f'{dl.custom_name_prefix}.{self.config.OUTPUT_TEMPLATE}'
-        output_chapter = self.config.OUTPUT_TEMPLATE_CHAPTER
         entry = getattr(dl, 'entry', None)
         if entry is not None and entry.get('playlist_index') is not None:
             if len(self.config.OUTPUT_TEMPLATE_PLAYLIST):
                 output = self.config.OUTPUT_TEMPLATE_PLAYLIST
-            sanitized = {k: _sanitize_path_component(v) for k, v in entry.items()}
-            output = _resolve_outtmpl_fields(output, sanitized, ('playlist',))
+            output = resolve_outtmpl(output, entry, 'playlist')
         if entry is not None and entry.get('channel_index') is not None:
             if len(self.config.OUTPUT_TEMPLATE_CHANNEL):
                 output = self.config.OUTPUT_TEMPLATE_CHANNEL
-            sanitized = {k: _sanitize_path_component(v) for k, v in entry.items()}
-            output = _resolve_outtmpl_fields(output, sanitized, ('channel',))
-        ytdl_options = self._build_ytdl_options(
-            getattr(dl, 'ytdl_options_presets', None),
-            getattr(dl, 'ytdl_options_overrides', {}) or {},
-        )
+            output = resolve_outtmpl(output, entry, 'channel')
+        return output
+
+    def __build_download(self, dl, dldirectory, ytdl_options, resolve_outtmpl):
+        output = self.__output_template(dl, resolve_outtmpl)
+        output_chapter = self.config.OUTPUT_TEMPLATE_CHAPTER
+        ytdl_options = dict(ytdl_options)
         playlist_item_limit = getattr(dl, 'playlist_item_limit', 0)
         if playlist_item_limit > 0:
             log.info(f'playlist limit is set. Processing only first {playlist_item_limit} entries')
             ytdl_options['playlistend'] = playlist_item_limit
-        download = Download(dldirectory, self.config.TEMP_DIR, output, output_chapter, dl.quality, dl.format, ytdl_options, dl)
+        return Download(dldirectory, self.config.TEMP_DIR, output, output_chapter, dl.quality, dl.format, ytdl_options, dl)
+
+    async def __add_download(self, dl, auto_start, job=None):
+        return await self.__add_downloads([dl], auto_start, job)
+
+    async def __add_downloads(self, dls, auto_start, job=None, enforce_cap=True):
+        """Build, persist and announce a batch of downloads.
+
+        Download paths and yt-dlp options are computed once per distinct
+        setting, output templates share one YoutubeDL instance, the state file
+        is written once and subscribers receive a single ``added_batch``.
+        Downloads beyond the queue caps are dropped with an error.
+        """
+        if not dls:
+            return None
+        requested = len(dls)
+        error_message = None
+        if enforce_cap:
+            room = self.queue_room(job.source if job is not None else dls[0].source)
+            if room is not None and requested > room:
+                dls = dls[:room]
+                error_message = {
+                    'status': 'error',
+                    'msg': f'The download queue is full; {requested - room} item(s) were not added',
+                }
+        paths = {}
+        options = {}
+        resolve_outtmpl = _OuttmplResolver(self.ydl_pool)
+        downloads = []
+        try:
+            for dl in dls:
+                if job is not None:
+                    dl.source, dl.priority = job.source, job.priority
+                    dl.window, dl.start_at = job.window, job.start_at
+                path_key = (dl.download_type, dl.folder)
+                if path_key not in paths:
+                    paths[path_key] = self.__calc_download_path(*path_key)
+                dldirectory, error = paths[path_key]
+                if error is not None:
+                    error_message = error_message or error
+                    continue
+                presets = getattr(dl, 'ytdl_options_presets', None)
+                overrides = getattr(dl, 'ytdl_options_overrides', {}) or {}
+                options_key = (tuple(presets or ()), json.dumps(overrides, sort_keys=True, default=str))
+                if options_key not in options:
+                    options[options_key] = self._build_ytdl_options(presets, overrides)
+                downloads.append(self.__build_download(dl, dldirectory, options[options_key], resolve_outtmpl))
+        finally:
+            resolve_outtmpl.close()
+        if job is not None:
+            job.queued += len(downloads)
+            job.failed += requested - len(downloads)
+            if job.id in self._add_jobs:
+                await self.notifier.add_job_progress(job)
+        if not downloads:
+            return error_message
+
         if auto_start is True:
-            self.queue.put(download)
-            asyncio.create_task(self.__start_download(download))
+            self.queue.put_many(downloads)
+            for download in downloads:
+                asyncio.create_task(self.__start_download(download))
+        else:
+            self.pending.put_many(downloads)
+        if len(downloads) == 1:
+            await self.notifier.added(downloads[0].info)
         else:
-            self.pending.put(download)
-        await self.notifier.added(dl)
+            await self.notifier.added_batch([download.info for download in downloads])
+        return error_message
 
-    async def __add_entry(
+    @staticmethod
+    def __stamp_playlist_entry(etr, parent, etype, index, autonumber, total_entries):
+        """Copy the playlist/channel context of ``parent`` onto one of its entries."""
+        if "id" not in etr:
+            etr["id"] = entry_id(etr)
+        etr["_type"] = "video"
+        etr[etype] = parent.get("id") or parent.get("channel_id") or parent.get("channel")
+        index_digits = len(str(total_entries)) if total_entries else 1
+        etr[f"{etype}_index"] = '{{0:0{0:d}d}}'.format(index_digits).format(index)
+        etr[f"{etype}_autonumber"] = autonumber
+        if total_entries:
+            etr[f"{etype}_count"] = total_entries
+            # n_entries: standard yt-dlp field for total count (used by template engine)
+            # __last_playlist_index: yt-dlp internal field for auto-padding autonumber
+            etr["n_entries"] = total_entries
+            etr["__last_playlist_index"] = total_entries
+        for property in ("id", "title", "uploader", "uploader_id"):
+            if property in parent:
+                etr[f"{etype}_{property}"] = parent[property]
+
+    async def __stream_playlist(
         self,
+        url,
         entry,
+        items,
         download_type,
         codec,
         format,
@@ -1425,12 +2405,112 @@ class DownloadQueue:
         subtitle_mode,
         ytdl_options_presets,
         ytdl_options_overrides,
-        already,
-        _add_gen=None,
+        _add_job,
     ):
-        if not entry:
-            return {'status': 'error', 'msg': "Invalid/empty data was given."}
-
+        """Queue playlist entries chunk by chunk while yt-dlp is still paging through them."""
+        etype = entry.get('_type') or 'playlist'
+        loop = asyncio.get_running_loop()
+        chunk_size = max(1, int(self.config.PLAYLIST_STREAM_CHUNK_SIZE))
+        known_total = entry.get('playlist_count')
+        added = []
+        count = 0
+        exhausted = False
+        try:
+            while playlist_item_limit <= 0 or count < playlist_item_limit:
+                size = chunk_size if playlist_item_limit <= 0 else min(chunk_size, playlist_item_limit - count)
+                chunk = await loop.run_in_executor(None, partial(_take, items, size))
+                if self.__add_canceled(_add_job):
+                    log.info(f'Playlist add canceled after streaming {count} entries')
+                    break
+                if not chunk:
+                    exhausted = True
+                    break
+                if _add_job is not None:
+                    _add_job.discovered += len(chunk)
+                dls = {}
+                for playlist_index, etr in chunk:
+                    count += 1
+                    if not etr:
+                        continue
+                    self.__stamp_playlist_entry(etr, entry, etype, playlist_index or count, count, known_total)
+                    dl = self.__video_download_info(
+                        etr,
+                        download_type,
+                        codec,
+                        format,
+                        quality,
+                        folder,
+                        custom_name_prefix,
+                        playlist_item_limit,
+                        split_by_chapters,
+                        chapter_template,
+                        subtitle_language,
+                        subtitle_mode,
+                        ytdl_options_presets,
+                        ytdl_options_overrides,
+                    )
+                    if dl is not None:
+                        dls.setdefault(dl.url, dl)
+                error_message = await self.__add_downloads(list(dls.values()), auto_start, _add_job)
+                if error_message is not None:
+                    log.warning(f'Streaming expansion of {url} stopped: {error_message["msg"]}')
+                    break
+                added.extend(dls.values())
+        except Exception:
+            log.exception(f'Streaming expansion of {url} failed after {count} entries')
+        finally:
+            # Stops paging early on cancel or limit (and kills a process-mode worker).
+            close = getattr(items, 'close', None)
+            if close is not None:
+                await loop.run_in_executor(None, close)
+        log.info(f'Streamed {len(added)} new entries from {etype} {url}')
+        total = count if exhausted else (known_total or count)
+        if added and total != known_total:
+            self.__backfill_playlist_count(added, etype, total)
+
+    def __backfill_playlist_count(self, dls, etype, total):
+        """Record the final entry count on streamed downloads that have not started yet."""
+        index_digits = len(str(total))
+        resolve_outtmpl = _OuttmplResolver(self.ydl_pool)
+        try:
+            for target in (self.queue, self.pending):
+                downloads = []
+                for dl in dls:
+                    if not target.exists(dl.url) or target.get(dl.url).info is not dl:
+                        continue
+                    download = target.get(dl.url)
+                    if download.started():
+                        continue
+                    entry = dl.entry
+                    entry[f"{etype}_count"] = total
+                    entry["n_entries"] = total
+                    entry["__last_playlist_index"] = total
+                    entry[f"{etype}_index"] = str(entry[f"{etype}_index"]).zfill(index_digits)
+                    download.output_template = self.__output_template(dl, resolve_outtmpl)
+                    downloads.append(download)
+                if downloads:
+                    target.put_many(downloads)
+        finally:
+            resolve_outtmpl.close()
+
+    def __video_download_info(
+        self,
+        entry,
+        download_type,
+        codec,
+        format,
+        quality,
+        folder,
+        custom_name_prefix,
+        playlist_item_limit,
+        split_by_chapters,
+        chapter_template,
+        subtitle_language,
+        subtitle_mode,
+        ytdl_options_presets,
+        ytdl_options_overrides,
+    ):
+        """Build the ``DownloadInfo`` for a video entry, or None if it is skipped."""
         error = None
         if "live_status" in entry and "release_timestamp" in entry and entry.get("live_status") == "is_upcoming":
             dt_ts = datetime.fromtimestamp(entry.get("release_timestamp")).strftime('%Y-%m-%d %H:%M:%S %z')
@@ -1438,6 +2518,56 @@ class DownloadQueue:
         else:
             if "msg" in entry:
                 error = entry["msg"]
+        key = entry.get('webpage_url') or entry['url']
+        if key in self._canceled_urls:
+            log.info(f'Skipping canceled URL: {entry.get("title") or key}')
+            return None
+        if self.queue.exists(key):
+            return None
+        return DownloadInfo(
+            id=entry['id'],
+            title=entry.get('title') or entry['id'],
+            url=key,
+            quality=quality,
+            download_type=download_type,
+            codec=codec,
+            format=format,
+            folder=folder,
+            custom_name_prefix=custom_name_prefix,
+            error=error,
+            entry=entry,
+            playlist_item_limit=playlist_item_limit,
+            split_by_chapters=split_by_chapters,
+            chapter_template=chapter_template,
+            subtitle_language=subtitle_language,
+            subtitle_mode=subtitle_mode,
+            ytdl_options_presets=ytdl_options_presets,
+            ytdl_options_overrides=ytdl_options_overrides,
+        )
+
+    async def __add_entry(
+        self,
+        entry,
+        download_type,
+        codec,
+        format,
+        quality,
+        folder,
+        custom_name_prefix,
+        playlist_item_limit,
+        auto_start,
+        split_by_chapters,
+        chapter_template,
+        subtitle_language,
+        subtitle_mode,
+        ytdl_options_presets,
+        ytdl_options_overrides,
+        already,
+        _add_job=None,
+        playlist_range=None,
+    ):
+        if not entry:
+            return {'status': 'error', 'msg': "Invalid/empty data was given."}
 
         etype = entry.get('_type') or 'video'
 
@@ -1460,7 +2590,8 @@ class DownloadQueue:
                 ytdl_options_presets,
                 ytdl_options_overrides,
                 already,
-                _add_gen,
+                _add_job,
+                playlist_range=playlist_range,
             )
         elif etype == 'playlist' or etype == 'channel':
             log.debug(f'Processing as a {etype}')
@@ -1468,83 +2599,73 @@ class DownloadQueue:
             # Convert generator to list if needed (for len() and slicing operations)
             if isinstance(entries, types.GeneratorType):
                 entries = list(entries)
-            total_entries = len(entries)
+            # A limit or range is applied during extraction, so ``entries`` may
+            # be cut short; the playlist's own count is its real size.
+            total_entries = entry.get('playlist_count') or len(entries)
             log.info(f'{etype} detected with {total_entries} entries')
-            index_digits = len(str(total_entries))
-            results = []
             if playlist_item_limit > 0:
                 log.info(f'Item limit is set. Processing only first {playlist_item_limit} entries')
                 entries = entries[:playlist_item_limit]
-            for index, etr in enumerate(entries, start=1):
-                if _add_gen is not None and self._add_generation != _add_gen:
-                    log.info(f'Playlist add canceled after processing {len(already)} entries')
-                    return {'status': 'ok', 'msg': f'Canceled - added {len(already)} items before cancel'}
-                if "id" not in etr:
-                    etr["id"] = _entry_id(etr)
-                etr["_type"] = "video"
-                etr[etype] = entry.get("id") or entry.get("channel_id") or entry.get("channel")
-                etr[f"{etype}_index"] = '{{0:0{0:d}d}}'.format(index_digits).format(index)
-                etr[f"{etype}_count"] = total_entries
-                etr[f"{etype}_autonumber"] = index
-                # n_entries: standard yt-dlp field for total count (used by template engine)
-                # __last_playlist_index: yt-dlp internal field for auto-padding autonumber
-                etr["n_entries"] = total_entries
-                etr["__last_playlist_index"] = total_entries
-                for property in ("id", "title", "uploader", "uploader_id"):
-                    if property in entry:
-                        etr[f"{etype}_{property}"] = entry[property]
-                results.append(
-                    await self.__add_entry(
-                        etr,
-                        download_type,
-                        codec,
-                        format,
-                        quality,
-                        folder,
-                        custom_name_prefix,
-                        playlist_item_limit,
-                        auto_start,
-                        split_by_chapters,
-                        chapter_template,
-                        subtitle_language,
-                        subtitle_mode,
-                        ytdl_options_presets,
-                        ytdl_options_overrides,
-                        already,
-                        _add_gen,
-                    )
+            if self.__add_canceled(_add_job):
+                log.info(f'Playlist add canceled after processing {len(already)} entries')
+                return {'status': 'ok', 'msg': f'Canceled - added {len(already)} items before cancel'}
+            if _add_job is not None:
+                _add_job.discovered += len(entries)
+            # Entries are flattened to videos and ingested as one batch: one
+            # state write and one event instead of one per entry.
+            # With a requested range yt-dlp reports which playlist positions it returned.
+            indices = entry.get('requested_entries')
+            if not indices or len(indices) != len(entries):
+                indices = range(1, len(entries) + 1)
+            dls = {}
+            for autonumber, (index, etr) in enumerate(zip(indices, entries), start=1):
+                self.__stamp_playlist_entry(etr, entry, etype, index, autonumber, total_entries)
+                dl = self.__video_download_info(
+                    etr,
+                    download_type,
+                    codec,
+                    format,
+                    quality,
+                    folder,
+                    custom_name_prefix,
+                    playlist_item_limit,
+                    split_by_chapters,
+                    chapter_template,
+                    subtitle_language,
+                    subtitle_mode,
+                    ytdl_options_presets,
+                    ytdl_options_overrides,
                 )
-            if any(res['status'] == 'error' for res in results):
-                return {'status': 'error', 'msg': ', '.join(res['msg'] for res in results if res['status'] == 'error' and 'msg' in res)}
+                if dl is not None:
+                    dls.setdefault(dl.url, dl)
+            error_message = await self.__add_downloads(list(dls.values()), auto_start, _add_job)
+            if error_message is not None:
+                return error_message
             return {'status': 'ok'}
         elif etype == 'video' or (etype.startswith('url') and 'id' in entry and 'title' in entry):
             log.debug('Processing as a video')
-            key = entry.get('webpage_url') or entry['url']
-            if key in self._canceled_urls:
-                log.info(f'Skipping canceled URL: {entry.get("title") or key}')
-                return {'status': 'ok'}
-            if not self.queue.exists(key):
-                dl = DownloadInfo(
-                    id=entry['id'],
-                    title=entry.get('title') or entry['id'],
-                    url=key,
-                    quality=quality,
-                    download_type=download_type,
-                    codec=codec,
-                    format=format,
-                    folder=folder,
-                    custom_name_prefix=custom_name_prefix,
-                    error=error,
-                    entry=entry,
-                    playlist_item_limit=playlist_item_limit,
-                    split_by_chapters=split_by_chapters,
-                    chapter_template=chapter_template,
-                    subtitle_language=subtitle_language,
-                    subtitle_mode=subtitle_mode,
-                    ytdl_options_presets=ytdl_options_presets,
-                    ytdl_options_overrides=ytdl_options_overrides,
-                )
-                await self.__add_download(dl, auto_start)
+            dl = self.__video_download_info(
+                entry,
+                download_type,
+                codec,
+                format,
+                quality,
+                folder,
+                custom_name_prefix,
+                playlist_item_limit,
+                split_by_chapters,
+                chapter_template,
+                subtitle_language,
+                subtitle_mode,
+                ytdl_options_presets,
+                ytdl_options_overrides,
+            )
+            if _add_job is not None:
+                _add_job.discovered += 1
+            if dl is not None:
+                error_message = await self.__add_download(dl, auto_start, _add_job)
+                if error_message is not None:
+                    return error_message
             return {'status': 'ok'}
         return {'status': 'error', 'msg': f'Unsupported resource "{etype}"'}
 
@@ -1566,17 +2687,26 @@ class DownloadQueue:
         ytdl_options_presets=None,
         ytdl_options_overrides=None,
         already=None,
-        _add_gen=None,
+        _add_job=None,
+        playlist_range=None,
+        source='ui',
+        priority=0,
+        window=None,
+        start_at=None,
     ):
         if ytdl_options_presets is None:
             ytdl_options_presets = []
         log.info(
             f'adding {url}: {download_type=} {codec=} {format=} {quality=} {already=} {folder=} {custom_name_prefix=} '
             f'{playlist_item_limit=} {auto_start=} {split_by_chapters=} {chapter_template=} '
-            f'{subtitle_language=} {subtitle_mode=} {ytdl_options_presets=}'
+            f'{subtitle_language=} {subtitle_mode=} {ytdl_options_presets=} {playlist_range=} {source=} {priority=}'
         )
         if already is None:
-            _add_gen = self._add_generation
+            full = self.queue_full(source)
+            if full is not None:
+                return full
+            if _add_job is None:
+                _add_job = AddJob(url, self._add_generation, source, priority, window, start_at)
             self._canceled_urls.clear()
         already = set() if already is None else already
         if url in already:
@@ -1584,16 +2714,72 @@ class DownloadQueue:
             return {'status': 'ok'}
         else:
             already.add(url)
+        items = None
+        playlist_params = _playlist_extract_params(playlist_item_limit, playlist_range)
+        if self.extraction.mode == 'process':
+            # Worker processes get module-level functions and plain params,
+            # and send back compact entries.
+            extract, extract_streaming = _extract_info_compact, _extract_info_streaming_compact
+            extract_args = (url, self.__extract_params(ytdl_options_presets, ytdl_options_overrides, playlist_params))
+            extract_kwargs = {}
+        else:
+            extract, extract_streaming = self.__extract_info, self.__extract_info_streaming
+            extract_args = (url, ytdl_options_presets, ytdl_options_overrides)
+            extract_kwargs = {'playlist_params': playlist_params} if playlist_params else {}
         try:
-            entry = await asyncio.get_running_loop().run_in_executor(
-                None,
-                partial(self.__extract_info, url, ytdl_options_presets, ytdl_options_overrides),
-            )
+            if self.config.STREAM_PLAYLIST_EXPANSION:
+                # The lazy entry iterator cannot be shared, so streaming
+                # extractions are never deduplicated.
+                entry, items = await self.__cancellable(
+                    self.extraction.run_streaming(extract_streaming, *extract_args, url=url, **extract_kwargs),
+                    _add_job,
+                )
+            else:
+                entry = await self.__cancellable(
+                    self.extraction.run(
+                        self.__extraction_key(url, ytdl_options_presets, ytdl_options_overrides, playlist_params),
+                        extract, *extract_args, url=url, **extract_kwargs,
+                    ),
+                    _add_job,
+                )
+        except asyncio.CancelledError:
+            if asyncio.current_task().cancelling():
+                raise
+            log.info(f'Extraction of {url} canceled')
+            return {'status': 'ok', 'msg': 'Canceled before any items were added'}
+        except ExtractionTimeout as exc:
+            return {'status': 'error', 'msg': str(exc)}
         except yt_dlp.utils.YoutubeDLError as exc:
             return {'status': 'error', 'msg': str(exc)}
         except Exception as exc:
             log.exception(f'Unexpected error while extracting {url}')
             return {'status': 'error', 'msg': str(exc)}
+        if items is not None:
+            task = asyncio.create_task(self.__stream_playlist(
+                url,
+                entry,
+                items,
+                download_type,
+                codec,
+                format,
+                quality,
+                folder,
+                custom_name_prefix,
+                playlist_item_limit,
+                auto_start,
+                split_by_chapters,
+                chapter_template,
+                subtitle_language,
+                subtitle_mode,
+                ytdl_options_presets,
+                ytdl_options_overrides,
+                _add_job,
+            ))
+            self._stream_tasks.add(task)
+            task.add_done_callback(self._stream_tasks.discard)
+            if _add_job is not None:
+                _add_job.stream_task = task
+            return {'status': 'ok'}
         return await self.__add_entry(
             entry,
             download_type,
@@ -1611,7 +2797,8 @@ class DownloadQueue:
             ytdl_options_presets,
             ytdl_options_overrides,
             already,
-            _add_gen,
+            _add_job,
+            playlist_range=playlist_range,
         )
 
     async def add_entry(
@@ -1631,11 +2818,22 @@ class DownloadQueue:
         subtitle_mode="prefer_manual",
         ytdl_options_presets=None,
         ytdl_options_overrides=None,
+        source='api',
+        priority=0,
+        window=None,
+        start_at=None,
     ):
+        full = self.queue_full(source)
+        if full is not None:
+            return full
         if ytdl_options_presets is None:
             ytdl_options_presets = []
         normalized_entry = copy.deepcopy(entry) if isinstance(entry, dict) else entry
         already = set()
+        job = None
+        if isinstance(normalized_entry, dict):
+            job = AddJob(normalized_entry.get('webpage_url') or normalized_entry.get('url'),
+                         self._add_generation, source, priority, window, start_at)
         return await self.__add_entry(
             normalized_entry,
             download_type,
@@ -1653,9 +2851,109 @@ class DownloadQueue:
             ytdl_options_presets,
             ytdl_options_overrides,
             already,
-            None,
+            job,
         )
 
+    async def add_entries(
+        self,
+        entries,
+        download_type,
+        codec,
+        format,
+        quality,
+        folder,
+        custom_name_prefix,
+        playlist_item_limit,
+        auto_start=True,
+        split_by_chapters=False,
+        chapter_template=None,
+        subtitle_language="en",
+        subtitle_mode="prefer_manual",
+        ytdl_options_presets=None,
+        ytdl_options_overrides=None,
+        source='api',
+        priority=0,
+        window=None,
+        start_at=None,
+    ):
+        """Queue already-extracted entries with the same options as one batch.
+
+        Video entries are persisted with a single write and announced with a
+        single ``added_batch`` event; any other entry (URLs, nested
+        playlists) goes through ``add_entry``. ``added`` in the result lists
+        the ids of the video entries that are now taken care of: queued, or
+        skipped because they already were or were canceled. Entries cut off
+        by the queue caps or an error are not in it.
+        """
+        full = self.queue_full(source)
+        if full is not None:
+            return full
+        if ytdl_options_presets is None:
+            ytdl_options_presets = []
+        dls = {}
+        skipped = []
+        errors = []
+        for entry in entries:
+            normalized_entry = copy.deepcopy(entry) if isinstance(entry, dict) else entry
+            if not normalized_entry:
+                errors.append("Invalid/empty data was given.")
+                continue
+            if (normalized_entry.get('_type') or 'video') != 'video':
+                result = await self.add_entry(
+                    normalized_entry,
+                    download_type,
+                    codec,
+                    format,
+                    quality,
+                    folder,
+                    custom_name_prefix,
+                    playlist_item_limit,
+                    auto_start,
+                    split_by_chapters,
+                    chapter_template,
+                    subtitle_language,
+                    subtitle_mode,
+                    ytdl_options_presets,
+                    ytdl_options_overrides,
+                    source=source,
+                    priority=priority,
+                    window=window,
+                    start_at=start_at,
+                )
+                if result.get('status') == 'error':
+                    errors.append(result.get('msg', ''))
+                continue
+            dl = self.__video_download_info(
+                normalized_entry,
+                download_type,
+                codec,
+                format,
+                quality,
+                folder,
+                custom_name_prefix,
+                playlist_item_limit,
+                split_by_chapters,
+                chapter_template,
+                subtitle_language,
+                subtitle_mode,
+                ytdl_options_presets,
+                ytdl_options_overrides,
+            )
+            if dl is not None:
+                dl.source, dl.priority = source, priority
+                dl.window, dl.start_at = window, start_at
+                dls.setdefault(dl.url, dl)
+            else:
+                skipped.append(normalized_entry.get('id'))
+        error_message = await self.__add_downloads(list(dls.values()), auto_start)
+        if error_message is not None:
+            errors.append(error_message['msg'])
+        store = self.queue if auto_start is True else self.pending
+        added = skipped + [dl.id for dl in dls.values() if store.exists(dl.url) and store.get(dl.url).info is dl]
+        if errors:
+            return {'status': 'error', 'msg': ', '.join(errors), 'added': added}
+        return {'status': 'ok', 'added': added}
+
     async def start_pending(self, ids):
         for id in ids:
             if not self.pending.exists(id):
@@ -1667,6 +2965,41 @@ class DownloadQueue:
             asyncio.create_task(self.__start_download(dl))
         return {'status': 'ok'}
 
+    async def reorder(self, ids, priority=None, position=None):
+        """Change the priority of queued or pending downloads and/or move them
+        to the front or back of the downloads from the same source.
+
+        Downloads that have already started are left alone. Only downloads
+        waiting for a slot have a place in line; asking to move any other
+        download is an error, though its priority is still updated.
+        """
+        changed = {self.queue: [], self.pending: []}
+        unmoved = []
+        for id in ids:
+            store = self.queue if self.queue.exists(id) else self.pending if self.pending.exists(id) else None
+            if store is None:
+                log.warning(f'requested reorder for non-existent download {id}')
+                continue
+            dl = store.get(id)
+            if dl.started():
+                continue
+            if priority is not None:
+                dl.info.priority = priority
+            moved = store is self.queue and self.scheduler.reorder(dl, priority, position)
+            if position is not None and not moved:
+                unmoved.append(id)
+            changed[store].append(dl)
+        for store, dls in changed.items():
+            if dls:
+                store.put_many(dls)
+        for dl in itertools.chain(*changed.values()):
+            await self.notifier.updated(dl.info)
+        updated = sum(len(dls) for dls in changed.values())
+        if unmoved:
+            return {'status': 'error', 'updated': updated, 'unmoved': unmoved,
+                    'msg': f'{len(unmoved)} download(s) are not waiting for a slot and cannot be moved'}
+        return {'status': 'ok', 'updated': updated}
+
     async def cancel(self, ids):
         for id in ids:
             # Track URL so playlist add loop won't re-queue it
@@ -1683,6 +3016,9 @@ class DownloadQueue:
                 dl.cancel()
             else:
                 dl.canceled = True
+                self.scheduled.release(dl)
+                if id in self._preresolving:
+                    self._preresolving.pop(id).cancel()
                 self.queue.delete(id)
                 await self.notifier.canceled(id)
         return {'status': 'ok'}
@@ -0,0 +1,78 @@
+"""Report bytes on the wire per socket event type for the json and deflate encodings.
+
+Run from the repository root::
+
+    python scripts/bench_socket_payloads.py [--downloads N]
+
+Payloads are built from synthetic ``DownloadInfo`` objects and encoded the way
+``main`` sends them; sizes are the socket.io payload only, before the
+transport adds its framing.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+_APP = Path(__file__).resolve().parents[1] / "app"
+sys.path[:0] = [str(_APP), str(_APP / "tests")]
+
+import conftest  # noqa: E402,F401  (prepares env and directories before importing main)
+import main  # noqa: E402
+from ytdl import DownloadInfo  # noqa: E402
+
+
+def _download(i):
+    info = DownloadInfo(
+        id=f'video{i:05d}',
+        title=f'Example upload number {i} - a reasonably long video title',
+        url=f'https://www.youtube.com/watch?v=video{i:05d}',
+        quality='best',
+        download_type='video',
+        codec='auto',
+        format='any',
+        folder='',
+        custom_name_prefix='',
+        error=None,
+        entry=None,
+        playlist_item_limit=0,
+        split_by_chapters=False,
+        chapter_template='%(title)s - %(section_number)s %(section_title)s.%(ext)s',
+    )
+    info.status = 'downloading'
+    info.percent = 42.5
+    info.speed = 1048576.0
+    info.eta = 30
+    return info
+
+
+def _payloads(count):
+    downloads = [_download(i) for i in range(count)]
+    encode = main.serializer.encode
+    half = count // 2
+    return {
+        'all': encode(([(d.url, d) for d in downloads[:half]], [(d.url, d) for d in downloads[half:]])),
+        'added': encode(downloads[0]),
+        'updated': encode(downloads[0]),
+        'completed': encode(downloads[-1]),
+        'canceled': encode(downloads[0].url),
+        'cleared': encode(downloads[-1].url),
+    }
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--downloads', type=int, default=500, help='downloads in the queue and history snapshot')
+    args = parser.parse_args(argv)
+
+    print(f"deflate threshold: {main.SOCKET_DEFLATE_MIN_BYTES} bytes")
+    print(f"{'event':<12} {'json':>10} {'deflate':>10} {'saved':>7}")
+    for event, data in _payloads(args.downloads).items():
+        before = len(data.encode('utf-8'))
+        after = len(main._wire(data, 'deflate'))
+        print(f"{event:<12} {before:>10} {after:>10} {1 - after / before:>7.1%}")
+
+
+if __name__ == '__main__':
+    main_cli()
@@ -18,6 +18,7 @@ class DownloadsServiceStub {
   customDirsChanged = new Subject<Record<string, string[]>>();
   ytdlOptionsChanged = new Subject<Record<string, unknown>>();
   updated = new Subject<void>();
+  setViews = vi.fn();
 
   getCookieStatus() {
     return of({ status: 'ok', has_cookies: false });
@@ -132,6 +133,24 @@ describe('App', () => {
     expect(app).toBeTruthy();
   });
 
+  it('stops following the lists of collapsed sections', () => {
+    const fixture = TestBed.createComponent(App);
+    const app = fixture.componentInstance;
+    expect(downloads.setViews).not.toHaveBeenCalled();
+
+    app.toggleView('done');
+    expect(downloads.setViews).toHaveBeenLastCalledWith(['queue', 'subscriptions']);
+    app.toggleView('subscriptions');
+    expect(downloads.setViews).toHaveBeenLastCalledWith(['queue']);
+    app.toggleView('done');
+    expect(downloads.setViews).toHaveBeenLastCalledWith(['queue', 'done']);
+
+    // The choice is remembered and sent again on the next visit.
+    downloads.setViews.mockClear();
+    TestBed.createComponent(App);
+    expect(downloads.setViews).toHaveBeenCalledWith(['queue', 'done']);
+  });
+
   it('hides manual override input when disabled', () => {
     const fixture = TestBed.createComponent(App);
     fixture.componentInstance.isAdvancedOpen = true;
@@ -11,6 +11,7 @@ import { faTrashAlt, faCheckCircle, faTimesCircle, faRedoAlt, faSun, faMoon, faC
 import { faGithub } from '@fortawesome/free-brands-svg-icons';
 import { CookieService } from 'ngx-cookie-service';
 import { AddDownloadPayload, DownloadsService } from './services/downloads.service';
+import { View } from './services/metube-socket.service';
 import { SubscriptionsService } from './services/subscriptions.service';
 import { SubscriptionRow } from './interfaces/subscription';
 import { Themes } from './theme';
@@ -118,6 +119,9 @@ export class App implements AfterViewInit, OnInit, OnDestroy {
   ytDlpVersion: string | null = null;
   metubeVersion: string | null = null;
   isAdvancedOpen = false;
+  // Collapsed sections; their lists are not followed over the socket.
+  collapsedViews = new Set<View>();
+  private readonly allViews: View[] = ['queue', 'done', 'subscriptions'];
   sortAscending = false;
   expandedErrors: Set<string> = new Set<string>();
   cachedSortedDone: [string, Download][] = [];
@@ -270,6 +274,11 @@ export class App implements AfterViewInit, OnInit, OnDestroy {
       this.checkIntervalMinutes = ci;
     }
     this.activeTheme = this.getPreferredTheme(this.cookieService);
+    const collapsed = (this.cookieService.get('metube_collapsed_views') || '').split(',');
+    this.collapsedViews = new Set(this.allViews.filter(view => collapsed.includes(view)));
+    if (this.collapsedViews.size > 0) {
+      this.downloads.setViews(this.visibleViews());
+    }
 
     // Subscribe to download updates
     this.downloads.queueChanged.pipe(takeUntilDestroyed(this.destroyRef)).subscribe(() => {
@@ -1357,6 +1366,18 @@ export class App implements AfterViewInit, OnInit, OnDestroy {
     this.isAdvancedOpen = !this.isAdvancedOpen;
   }
 
+  toggleView(view: View) {
+    if (!this.collapsedViews.delete(view)) {
+      this.collapsedViews.add(view);
+    }
+    this.cookieService.set('metube_collapsed_views', [...this.collapsedViews].join(','), { expires: this.settingsCookieExpiryDays });
+    this.downloads.setViews(this.visibleViews());
+  }
+
+  private visibleViews(): View[] {
+    return this.allViews.filter(view => !this.collapsedViews.has(view));
+  }
+
   toggleSortOrder() {
     this.sortAscending = !this.sortAscending;
     this.cookieService.set('metube_sort_ascending', this.sortAscending ? 'true' : 'false', { expires: this.settingsCookieExpiryDays });
@@ -1500,7 +1521,7 @@ export class App implements AfterViewInit, OnInit, OnDestroy {
         speed += download.speed || 0;
       } else if (download.status === 'preparing') {
         active++;
-      } else if (download.status === 'pending') {
+      } else if (download.status === 'pending' || download.status === 'waiting' || download.status === 'retrying') {
         queued++;
       }
     });
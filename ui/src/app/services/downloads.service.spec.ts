@@ -8,6 +8,7 @@ import { Download } from '../interfaces';
 
 class MeTubeSocketStub {
   private subjects: Record<string, Subject<string>> = {};
+  setViews = vi.fn();
 
   fromEvent(event: string) {
     if (!this.subjects[event]) {
@@ -16,6 +17,10 @@ class MeTubeSocketStub {
     return this.subjects[event].asObservable();
   }
 
+  fromPayload(event: string) {
+    return this.fromEvent(event);
+  }
+
   emit(event: string, data: string) {
     if (!this.subjects[event]) {
       this.subjects[event] = new Subject<string>();
@@ -83,6 +88,7 @@ describe('DownloadsService', () => {
         subtitle_mode: 'prefer_manual',
         ytdl_options_presets: [],
         ytdl_options_overrides: '',
+        source: 'ui',
       }),
     );
     req.flush({ status: 'ok' });
@@ -151,6 +157,11 @@ describe('DownloadsService', () => {
     expect((res as { msg?: string }).msg).toBe('bad');
   });
 
+  it('setViews() passes the shown views to the socket', () => {
+    service.setViews(['queue']);
+    expect(socket.setViews).toHaveBeenCalledWith(['queue']);
+  });
+
   it('socket all updates queue and done', () => {
     const row: Download = {
       id: '1',
@@ -177,6 +188,17 @@ describe('DownloadsService', () => {
     expect(service.queue.has('u1')).toBe(true);
   });
 
+  it('socket added_batch adds every entry with one change notification', () => {
+    let changes = 0;
+    service.queueChanged.subscribe(() => changes++);
+    socket.emit('added_batch', JSON.stringify([
+      { url: 'u1', title: 'a', status: 'pending' },
+      { url: 'u2', title: 'b', status: 'pending' },
+    ]));
+    expect([...service.queue.keys()]).toEqual(['u1', 'u2']);
+    expect(changes).toBe(1);
+  });
+
   it('socket updated preserves checked and deleting', () => {
     service.queue.set('u1', {
       id: '1',
@@ -2,7 +2,7 @@ import { inject, Injectable } from '@angular/core';
 import { HttpClient, HttpErrorResponse } from '@angular/common/http';
 import { of, Subject } from 'rxjs';
 import { catchError } from 'rxjs/operators';
-import { MeTubeSocket } from './metube-socket.service';
+import { MeTubeSocket, View } from './metube-socket.service';
 import { Download, Status, State } from '../interfaces';
 import { takeUntilDestroyed } from '@angular/core/rxjs-interop';
 
@@ -43,7 +43,7 @@ export class DownloadsService {
   customDirs: Record<string, string[]> = {};
 
   constructor() {
-    this.socket.fromEvent('all')
+    this.socket.fromPayload('all')
     .pipe(takeUntilDestroyed())
     .subscribe((strdata: string) => {
       this.loading = false;
@@ -55,14 +55,21 @@ export class DownloadsService {
       this.queueChanged.next();
       this.doneChanged.next();
     });
-    this.socket.fromEvent('added')
+    this.socket.fromPayload('added')
     .pipe(takeUntilDestroyed())
     .subscribe((strdata: string) => {
       const data: Download = JSON.parse(strdata);
       this.queue.set(data.url, data);
       this.queueChanged.next();
     });
-    this.socket.fromEvent('updated')
+    this.socket.fromPayload('added_batch')
+    .pipe(takeUntilDestroyed())
+    .subscribe((strdata: string) => {
+      const data: Download[] = JSON.parse(strdata);
+      data.forEach(dl => this.queue.set(dl.url, dl));
+      this.queueChanged.next();
+    });
+    this.socket.fromPayload('updated')
     .pipe(takeUntilDestroyed())
     .subscribe((strdata: string) => {
       const data: Download = JSON.parse(strdata);
@@ -72,7 +79,7 @@ export class DownloadsService {
       this.queue.set(data.url, data);
       this.updated.next();
     });
-    this.socket.fromEvent('completed')
+    this.socket.fromPayload('completed')
     .pipe(takeUntilDestroyed())
     .subscribe((strdata: string) => {
       const data: Download = JSON.parse(strdata);
@@ -81,14 +88,14 @@ export class DownloadsService {
       this.queueChanged.next();
       this.doneChanged.next();
     });
-    this.socket.fromEvent('canceled')
+    this.socket.fromPayload('canceled')
     .pipe(takeUntilDestroyed())
     .subscribe((strdata: string) => {
       const data: string = JSON.parse(strdata);
       this.queue.delete(data);
       this.queueChanged.next();
     });
-    this.socket.fromEvent('cleared')
+    this.socket.fromPayload('cleared')
     .pipe(takeUntilDestroyed())
     .subscribe((strdata: string) => {
       const data: string = JSON.parse(strdata);
@@ -145,6 +152,7 @@ export class DownloadsService {
       subtitle_mode: payload.subtitleMode,
       ytdl_options_presets: payload.ytdlOptionsPresets,
       ytdl_options_overrides: payload.ytdlOptionsOverrides,
+      source: 'ui',
     }).pipe(
       catchError(this.handleHTTPError)
     );
@@ -209,4 +217,9 @@ export class DownloadsService {
       catchError(this.handleHTTPError)
     );
   }
+
+  // Only the views shown are followed; the server sends a fresh list when one is shown again.
+  setViews(views: View[]) {
+    this.socket.setViews(views);
+  }
 }
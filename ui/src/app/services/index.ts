@@ -1,2 +1,3 @@
 export { DownloadsService } from './downloads.service';
-export { MeTubeSocket } from './metube-socket.service';
\ No newline at end of file
+export { MeTubeSocket } from './metube-socket.service';
+export type { View } from './metube-socket.service';
\ No newline at end of file
@@ -1,17 +1,80 @@
 import { Injectable, inject } from '@angular/core';
 import { ApplicationRef } from '@angular/core';
 import { Socket } from 'ngx-socket-io';
+import { Observable } from 'rxjs';
+
+interface ResumeState {
+  epoch: string | null;
+  lastSeq: number | null;
+}
+
+// Server-side rooms; a client only receives events for the views it joined.
+export type View = 'queue' | 'done' | 'subscriptions';
+
+// Large payloads arrive as zlib-compressed JSON when the deflate encoding was negotiated.
+function decodePayload(data: string | ArrayBuffer): Promise<string> {
+  if (typeof data === 'string') {
+    return Promise.resolve(data);
+  }
+  const stream = new Blob([data]).stream().pipeThrough(new DecompressionStream('deflate'));
+  return new Response(stream).text();
+}
 
 @Injectable(
   { providedIn: 'root' }
 )
 export class MeTubeSocket extends Socket {
+  private views: View[] = ['queue', 'done', 'subscriptions'];
+  private decoding: Promise<unknown> = Promise.resolve();
 
   constructor() {
     const appRef = inject(ApplicationRef);
 
     const path =
       document.location.pathname.replace(/share-target/, '') + 'socket.io';
-    super({ url: '', options: { path } }, appRef);
+    // Sent on every (re)connect so the server can replay only the events
+    // missed while disconnected instead of resending the full state.
+    const resume: ResumeState = { epoch: null, lastSeq: null };
+    let views: () => View[] = () => ['queue', 'done', 'subscriptions'];
+    // Browsers without DecompressionStream keep receiving plain JSON text.
+    const encodings = typeof DecompressionStream === 'undefined' ? [] : ['deflate'];
+    const auth = (cb: (data: object) => void) => cb({
+      views: views(),
+      encodings,
+      ...(resume.epoch === null ? {} : { epoch: resume.epoch, last_seq: resume.lastSeq }),
+    });
+    super({ url: '', options: { path, auth } }, appRef);
+    views = () => this.views;
+
+    this.ioSocket.on('sync', (strdata: string) => {
+      const data: { epoch: string; seq: number } = JSON.parse(strdata);
+      // A new epoch means the server restarted and its sequence was reset.
+      resume.lastSeq = resume.epoch === data.epoch ? Math.max(resume.lastSeq ?? 0, data.seq) : data.seq;
+      resume.epoch = data.epoch;
+    });
+    this.ioSocket.onAny((_event: string, _data: unknown, seq?: unknown) => {
+      if (typeof seq === 'number') {
+        resume.lastSeq = Math.max(resume.lastSeq ?? 0, seq);
+      }
+    });
+  }
+
+  // Like fromEvent, but always yields JSON text. Payloads are decoded one at a
+  // time so state events are still applied in the order they arrived.
+  fromPayload(eventName: string): Observable<string> {
+    return new Observable<string>(subscriber => {
+      const handler = (data: string | ArrayBuffer) => {
+        this.decoding = this.decoding
+          .then(() => decodePayload(data))
+          .then(text => subscriber.next(text), err => console.error(`Failed to decode ${eventName}`, err));
+      };
+      this.ioSocket.on(eventName, handler);
+      return () => this.ioSocket.off(eventName, handler);
+    });
+  }
+
+  setViews(views: View[]) {
+    this.views = views;
+    this.emit('set_views', views);
   }
 }
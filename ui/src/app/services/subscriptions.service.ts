@@ -33,7 +33,7 @@ export class SubscriptionsService {
 
   constructor() {
     this.socket
-      .fromEvent('subscriptions_all')
+      .fromPayload('subscriptions_all')
       .pipe(takeUntilDestroyed(this.destroyRef))
       .subscribe((strdata: string) => {
         const data: SubscriptionRow[] = JSON.parse(strdata);
@@ -41,7 +41,7 @@ export class SubscriptionsService {
       });
 
     this.socket
-      .fromEvent('subscription_added')
+      .fromPayload('subscription_added')
       .pipe(takeUntilDestroyed(this.destroyRef))
       .subscribe((strdata: string) => {
         const row: SubscriptionRow = JSON.parse(strdata);
@@ -50,7 +50,7 @@ export class SubscriptionsService {
       });
 
     this.socket
-      .fromEvent('subscription_updated')
+      .fromPayload('subscription_updated')
       .pipe(takeUntilDestroyed(this.destroyRef))
       .subscribe((strdata: string) => {
         const row: SubscriptionRow = JSON.parse(strdata);
@@ -59,7 +59,7 @@ export class SubscriptionsService {
       });
 
     this.socket
-      .fromEvent('subscription_removed')
+      .fromPayload('subscription_removed')
       .pipe(takeUntilDestroyed(this.destroyRef))
       .subscribe((strdata: string) => {
         const id: string = JSON.parse(strdata);